@@ -1,25 +1,71 @@
 import os
+import uuid
+from contextlib import closing
 import pdfplumber
+import numpy as np
 import pandas as pd
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from flask_cors import CORS
-from sqlalchemy import create_engine
 import json
 from datetime import datetime
 import re
 from bank_parsers import BankParserFactory
+from categorizer import UPLOAD_RULES, load_categorizer
+from cell_classifiers import DATE_PREFIX_RE, PLAIN_NUMBER_RE, reorder_date, date_cache_stats
+from pdf_extraction import PageAnalysis, iter_pages, extract_page_text, default_worker_count
+from upload_stream import NDJSON_MIMETYPE, ROWS_PER_CHUNK, wants_stream, iter_page_batches, iter_ndjson_upload
+from wire_format import encode_response, not_acceptable_message, response_mimetype
+from app_logging import get_logger
+from compression import compressor_from_env
+from etags import not_modified, strong_etag, tag
+from parse_cache import parse_cache_from_env, upload_key
+from storage import encode_cursor, invalid_value, missing_field, page_args, store_from_env
+from upload_jobs import JobCancelled, QueueFull, upload_job_queue_from_env
+
+log = get_logger('app')
 
 UPLOAD_FOLDER = "uploads"
 ALLOWED_EXTENSIONS = {"pdf", "xls", "xlsx"}
 
 app = Flask(__name__)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+# Processes used to extract PDF pages in parallel (1 = serial)
+app.config["PDF_EXTRACT_WORKERS"] = default_worker_count()
 
 # Enable CORS for React frontend
 CORS(app)
 
-# Database connection (SQLite for demo, replace with MySQL/Postgres if needed)
-engine = create_engine("sqlite:///parsed_data.db")
+# gzip/brotli for complete bodies of COMPRESS_MIN_BYTES and up
+compressor = compressor_from_env()
+
+
+@app.after_request
+def compress_response(response):
+    return compressor(request, response)
+
+# Parsed uploads keyed by file hash; bump PARSER_VERSION whenever parsing output changes
+PARSER_VERSION = '1'
+
+# Transactions database (TRANSACTIONS_DB_PATH), opened on first use
+transaction_store = store_from_env()
+
+
+# Keyword -> category automaton (CATEGORY_RULES_FILE overrides the built-in rules)
+upload_categorizer = load_categorizer(UPLOAD_RULES)
+
+# Stored through Flask's JSON provider so a cached response matches a fresh one
+parse_cache = parse_cache_from_env(dumps=app.json.dumps, loads=app.json.loads)
+
+# Statements parsed in the background for POST /api/upload/jobs (UPLOAD_JOB_WORKERS at a time)
+upload_jobs = upload_job_queue_from_env()
+
+
+def parse_cache_version():
+    """Parser version plus the category rules in force, which also shape the result"""
+    return f"app/{PARSER_VERSION}/{upload_categorizer.fingerprint()}"
+
+# Indian Bank text line: Date Description Amount
+TEXT_LINE_RE = re.compile(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\s+(.+?)\s+(\d+\.?\d*)')
 
 
 # ---------- Helpers ----------
@@ -27,44 +73,47 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def iter_pdf_transactions(file_path, on_page=None):
+    """
+    Stream transactions from a PDF, page by page, using bank-specific parsers.
+    on_page(page_number, page_count) is called as each page is finished. When
+    the statement has to be read a second time, page_count doubles and the
+    second pass carries on from the first, so progress only moves forward.
+    """
+    parser_factory = BankParserFactory()
+    
+    # The statement header on the first page is enough to pick a parser
+    parser = parser_factory.get_parser(extract_page_text(file_path, 0))
+    
+    pages = iter_pages(file_path, workers=app.config["PDF_EXTRACT_WORKERS"],
+                       include_text=parser.needs_text, on_page=on_page)
+    found = 0
+    for transaction in parser_factory.iter_statement(pages, parser):
+        found += 1
+        yield transaction
+    
+    # Table-only parsers still fall back to the text when the tables yield nothing
+    if not found and not parser.needs_text:
+        def on_text_page(page_number, page_count):
+            on_page(page_count + page_number, 2 * page_count)
+        
+        pages = iter_pages(file_path, workers=app.config["PDF_EXTRACT_WORKERS"],
+                           include_tables=False, on_page=on_text_page if on_page else None)
+        yield from parser_factory.iter_statement(pages, parser)
+
+
 def extract_pdf_with_smart_parser(file_path):
     """
     Enhanced PDF extraction using bank-specific parsers
     """
     try:
-        parser_factory = BankParserFactory()
+        transactions = list(iter_pdf_transactions(file_path))
         
-        with pdfplumber.open(file_path) as pdf:
-            print(f"Processing PDF with {len(pdf.pages)} pages")
-            
-            # Extract text from all pages
-            all_text = ''
-            all_tables = []
-            
-            for page_num, page in enumerate(pdf.pages):
-                print(f"Processing page {page_num + 1}")
-                
-                # Extract text
-                page_text = page.extract_text()
-                if page_text:
-                    all_text += page_text + '\n'
-                
-                # Extract tables
-                page_tables = page.extract_tables()
-                if page_tables:
-                    all_tables.extend(page_tables)
-            
-            print(f"Extracted text length: {len(all_text)}")
-            print(f"Found {len(all_tables)} tables")
-            
-            # Use smart parser to extract transactions
-            transactions = parser_factory.parse_statement(all_text, all_tables)
-            
-            print(f"Extracted {len(transactions)} transactions using smart parser")
-            return transactions
+        log.info("Extracted %s transactions using smart parser", len(transactions))
+        return transactions
             
     except Exception as e:
-        print(f"Error in smart parser extraction: {e}")
+        log.error("Error in smart parser extraction: %s", e)
         # Fallback to basic extraction
         return extract_pdf_basic(file_path)
 
@@ -77,15 +126,18 @@ def extract_pdf_basic(file_path):
     
     with pdfplumber.open(file_path) as pdf:
         for page_num, page in enumerate(pdf.pages):
-            print(f"Processing page {page_num + 1}")
+            log.debug("Processing page %s", page_num + 1)
+            
+            # Lay the page out once for both the text and the tables
+            analysis = PageAnalysis(page)
             
             # Extract text for pattern matching
-            text = page.extract_text()
+            text = analysis.text
             if not text:
                 continue
             
             # Try table extraction first
-            tables = page.extract_tables()
+            tables = analysis.tables
             if tables:
                 for table in tables:
                     for row in table:
@@ -118,7 +170,7 @@ def parse_indian_bank_row(row):
         date_str = None
         date_idx = 0
         for i, cell in enumerate(clean_row):
-            if re.match(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', cell):
+            if DATE_PREFIX_RE.match(cell):
                 date_str = cell
                 date_idx = i
                 break
@@ -129,7 +181,7 @@ def parse_indian_bank_row(row):
         # Find description (usually after date)
         description = ''
         for i in range(date_idx + 1, len(clean_row)):
-            if clean_row[i] and not re.match(r'^\d+\.?\d*$', clean_row[i]):
+            if clean_row[i] and not PLAIN_NUMBER_RE.fullmatch(clean_row[i]):
                 description = clean_row[i]
                 break
         
@@ -139,7 +191,7 @@ def parse_indian_bank_row(row):
         
         for i in range(len(clean_row) - 1, -1, -1):
             cell = clean_row[i]
-            if cell and re.match(r'^\d+\.?\d*$', cell):
+            if cell and PLAIN_NUMBER_RE.fullmatch(cell):
                 amount = float(cell)
                 # Check if it's in credit column (Indian bank usually has separate debit/credit columns)
                 if i == len(clean_row) - 1:  # Assuming last column is credit
@@ -155,7 +207,7 @@ def parse_indian_bank_row(row):
         }
         
     except Exception as e:
-        print(f"Error parsing row: {e}")
+        log.error("Error parsing row: %s", e)
         return None
 
 
@@ -168,8 +220,7 @@ def extract_from_text_patterns(text):
     
     for line in lines:
         # Pattern for Indian Bank: Date Description Amount
-        pattern = r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\s+(.+?)\s+(\d+\.?\d*)'
-        match = re.search(pattern, line)
+        match = TEXT_LINE_RE.search(line)
         
         if match:
             date_str, description, amount_str = match.groups()
@@ -192,78 +243,90 @@ def format_date(date_str):
     Format date string to YYYY-MM-DD
     """
     try:
-        # Handle DD/MM/YYYY or DD-MM-YYYY format
-        if '/' in date_str:
-            parts = date_str.split('/')
-        else:
-            parts = date_str.split('-')
-        
-        if len(parts) == 3:
-            day, month, year = parts
-            
-            # Handle 2-digit years
-            if len(year) == 2:
-                year = '20' + year
-            
-            # Ensure proper formatting
-            day = day.zfill(2)
-            month = month.zfill(2)
-            
-            return f"{year}-{month}-{day}"
-        
-        return date_str
+        # Handle DD/MM/YYYY or DD-MM-YYYY format (memoised per distinct string)
+        return reorder_date(date_str)
     except:
         return datetime.now().strftime('%Y-%m-%d')
 
 
 def extract_excel(file_path):
     """
-    Extract data from Excel files
+    Extract data from Excel files (as a DataFrame; see normalize_frame)
     """
-    df = pd.read_excel(file_path)
-    return df.to_dict('records')
+    return pd.read_excel(file_path)
 
 
-def normalize_transactions(transactions):
+def normalize_transactions(transactions, start_id=1):
     """
-    Normalize transaction data to standard format
+    Normalize transaction data to standard format.
+    Categories are assigned for the whole batch in one call.
     """
-    normalized = []
+    categories = detect_categories([trans.get('description', '') for trans in transactions])
     
-    for trans in transactions:
-        normalized_trans = {
-            'id': len(normalized) + 1,
+    return [
+        {
+            'id': trans_id,
             'date': trans.get('date', ''),
             'description': trans.get('description', ''),
             'amount': float(trans.get('amount', 0)),
             'type': trans.get('type', 'debit'),
             'frequency': trans.get('frequency', 'one-time'),
-            'category': detect_category(trans.get('description', '')),
+            'category': category,
             'actions': 'edit,delete'
         }
-        normalized.append(normalized_trans)
+        for trans_id, (trans, category) in enumerate(zip(transactions, categories), start=start_id)
+    ]
+
+
+def normalize_frame(df, start_id=1):
+    """
+    Normalize a sheet of transactions column by column; same output as
+    normalize_transactions(df.to_dict('records'))
+    """
+    def column(name, default):
+        return df[name].to_numpy(dtype=object) if name in df.columns else default
+    
+    descriptions = column('description', [''] * len(df))
+    amounts = column('amount', None)
     
-    return normalized
+    normalized = pd.DataFrame({
+        'id': np.arange(start_id, start_id + len(df)),
+        'date': column('date', ''),
+        'description': descriptions,
+        # object -> float64 is float() per cell, as in normalize_transactions
+        'amount': amounts.astype(np.float64) if amounts is not None else 0.0,
+        'type': column('type', 'debit'),
+        'frequency': column('frequency', 'one-time'),
+        'category': detect_categories(descriptions),
+        'actions': 'edit,delete',
+    }, index=pd.RangeIndex(len(df)))
+    return normalized.to_dict('records')
+
+
+def iter_normalized_batches(batches):
+    """
+    Streaming stage: normalize each (transactions, progress) batch, numbering
+    IDs on from the previous batch
+    """
+    next_id = 1
+    for transactions, progress in batches:
+        normalized = normalize_transactions(transactions, start_id=next_id)
+        next_id += len(normalized)
+        yield normalized, progress
 
 
 def detect_category(description):
     """
     Auto-detect transaction category based on description
     """
-    description_lower = description.lower()
-    
-    if any(word in description_lower for word in ['upi', 'gpay', 'paytm', 'phonepe']):
-        return 'Digital Payment'
-    elif any(word in description_lower for word in ['atm', 'cash']):
-        return 'Cash Withdrawal'
-    elif any(word in description_lower for word in ['salary', 'sal']):
-        return 'Salary'
-    elif any(word in description_lower for word in ['food', 'restaurant', 'hotel']):
-        return 'Food & Dining'
-    elif any(word in description_lower for word in ['fuel', 'petrol', 'diesel']):
-        return 'Fuel'
-    else:
-        return 'Others'
+    return upload_categorizer.categorize(description)
+
+
+def detect_categories(descriptions):
+    """
+    Auto-detect categories for a whole column of descriptions
+    """
+    return upload_categorizer.categorize_many(descriptions)
 
 
 def detect_frequency(transactions):
@@ -287,6 +350,101 @@ def detect_frequency(transactions):
     return transactions
 
 
+def upload_batches(filepath, filename, on_progress=None):
+    """
+    (normalized transactions, progress) batches of an uploaded file: one per
+    PDF page, or chunks of sheet rows; IDs run on across batches.
+    on_progress is passed on to iter_page_batches.
+    """
+    def pdf_source(on_page):
+        yielded = False
+        try:
+            for trans in iter_pdf_transactions(filepath, on_page=on_page):
+                yielded = True
+                yield trans
+        except JobCancelled:
+            raise
+        except Exception as e:
+            if yielded:
+                raise
+            log.error("Error in smart parser extraction: %s", e)
+            # Fallback to basic extraction
+            yield from extract_pdf_basic(filepath)
+    
+    def excel_batches():
+        df = extract_excel(filepath)
+        for start in range(0, len(df), ROWS_PER_CHUNK):
+            yield normalize_frame(df.iloc[start:start + ROWS_PER_CHUNK], start_id=start + 1), {}
+    
+    if filename.lower().endswith('.pdf'):
+        return iter_normalized_batches(iter_page_batches(pdf_source, on_progress=on_progress))
+    return excel_batches()
+
+
+def stream_upload(filepath, filename):
+    """
+    NDJSON body for a streamed upload: transaction chunks as pages finish, then
+    a summary. Recurring transactions can only be known once every row has been
+    seen, so their IDs are sent in the summary rather than on each row. The
+    caller removes the file once the response is closed.
+    """
+    groups = {}
+    
+    def batches():
+        for transactions, progress in upload_batches(filepath, filename):
+            for trans in transactions:
+                groups.setdefault((trans['description'], trans['amount']), []).append(trans['id'])
+            yield transactions, progress
+    
+    def summary():
+        return {
+            'recurring_ids': [trans_id for ids in groups.values() if len(ids) > 1 for trans_id in ids]
+        }
+    
+    yield from iter_ndjson_upload(batches(), summary)
+
+
+def upload_path(filename):
+    """
+    Where an upload is saved: a name of its own, so concurrent uploads of files
+    with the same name don't collide; the extension stays, as the parsers go by it
+    """
+    return os.path.join(app.config["UPLOAD_FOLDER"], uuid.uuid4().hex + os.path.splitext(filename)[1].lower())
+
+
+def remove_upload(filepath):
+    """Delete an uploaded file once it has been parsed (one already gone is fine)"""
+    try:
+        os.remove(filepath)
+    except OSError as e:
+        log.warning("Could not delete uploaded file %s: %s", filepath, e)
+
+
+def run_upload_job(job, filepath, filename, cache_key):
+    """
+    Body of a background upload job: the /api/upload result, with progress
+    reported to the job page by page
+    """
+    cached = parse_cache.get(cache_key)
+    if cached is not None:
+        job.report(len(cached), {})
+        return {'success': True, 'transactions': cached, 'count': len(cached), 'cache': 'hit'}
+    
+    transactions = []
+    # Closed on cancellation too, which stops the page extraction
+    # Progress (and the cancel check) comes in per page, including pages without transactions
+    with closing(upload_batches(filepath, filename, lambda progress: job.report(0, progress))) as batches:
+        for batch, progress in batches:
+            transactions.extend(batch)
+            job.report(len(batch), progress)
+    
+    enhanced_transactions = detect_frequency(transactions)
+    if enhanced_transactions:
+        parse_cache.put(cache_key, enhanced_transactions)
+    return {'success': True, 'transactions': enhanced_transactions, 'count': len(enhanced_transactions),
+            'cache': 'miss'}
+
+
 # ---------- API Routes ----------
 @app.route("/api/upload", methods=["POST"])
 def upload_file():
@@ -304,36 +462,136 @@ def upload_file():
         
         if file and allowed_file(file.filename):
             filename = file.filename
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+            filepath = upload_path(filename)
+            
+            # ?stream=1 or Accept: application/x-ndjson sends rows as pages finish
+            if wants_stream(request):
+                file.save(filepath)
+                response = Response(stream_upload(filepath, filename), mimetype=NDJSON_MIMETYPE,
+                                    headers={'X-Accel-Buffering': 'no'})
+                # Runs once the server is done with the body, even if it was never read
+                response.call_on_close(lambda: remove_upload(filepath))
+                return response
+            
+            # JSON, or columnar MessagePack for clients that Accept it
+            mimetype = response_mimetype(request)
+            if mimetype is None:
+                return jsonify({'error': not_acceptable_message()}), 406
+            
+            # A file that has been parsed before is answered without touching the disk
+            cache_key = upload_key(file, parse_cache_version())
+            cached = parse_cache.get(cache_key)
+            if cached is not None:
+                return encode_response({
+                    'success': True,
+                    'transactions': cached,
+                    'count': len(cached),
+                    'cache': 'hit'
+                }, mimetype)
+            
             file.save(filepath)
             
-            # Extract data based on file type
+            # Extract and normalize data based on file type
             if filename.lower().endswith('.pdf'):
-                transactions = extract_pdf_with_smart_parser(filepath)
+                normalized_transactions = normalize_transactions(extract_pdf_with_smart_parser(filepath))
             else:
-                transactions = extract_excel(filepath)
+                normalized_transactions = normalize_frame(extract_excel(filepath))
             
-            # Normalize and enhance data
-            normalized_transactions = normalize_transactions(transactions)
+            # Enhance data
             enhanced_transactions = detect_frequency(normalized_transactions)
             
             # Clean up uploaded file
-            os.remove(filepath)
+            remove_upload(filepath)
+            
+            # Empty results are left out, so a failed parse is retried next time
+            if enhanced_transactions:
+                parse_cache.put(cache_key, enhanced_transactions)
             
-            return jsonify({
+            return encode_response({
                 'success': True,
                 'transactions': enhanced_transactions,
-                'count': len(enhanced_transactions)
-            })
+                'count': len(enhanced_transactions),
+                'cache': 'miss'
+            }, mimetype)
         
         else:
             return jsonify({'error': 'Invalid file type'}), 400
     
     except Exception as e:
-        print(f"Error processing file: {e}")
+        log.error("Error processing file: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route("/api/upload/jobs", methods=["POST"])
+def submit_upload_job():
+    """
+    Queue a statement for parsing in the background (see upload_jobs).
+    Answers 202 straight away with the job id; poll GET /api/upload/jobs/<id>
+    for progress and the result, or DELETE it to cancel.
+    """
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        file = request.files['file']
+        
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not allowed_file(file.filename):
+            return jsonify({'error': 'Invalid file type'}), 400
+        
+        filename = file.filename
+        cache_key = upload_key(file, parse_cache_version())
+        filepath = upload_path(filename)
+        file.save(filepath)
+        
+        try:
+            job = upload_jobs.submit(filename, lambda job: run_upload_job(job, filepath, filename, cache_key),
+                                     cleanup=lambda: remove_upload(filepath))
+        except QueueFull as e:
+            remove_upload(filepath)
+            return jsonify({'error': str(e)}), 503
+        
+        status_url = f'/api/upload/jobs/{job.id}'
+        response = jsonify({'success': True, **job.as_dict(), 'status_url': status_url})
+        response.status_code = 202
+        response.headers['Location'] = status_url
+        return response
+    
+    except Exception as e:
+        log.error("Error queueing upload job: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
+@app.route("/api/upload/jobs/<job_id>", methods=["GET"])
+def get_upload_job(job_id):
+    """
+    Progress of an upload job: status (queued, running, done, failed,
+    cancelled), pages_done / page_count for PDFs and the transactions found
+    so far; a done job also carries the /api/upload result
+    """
+    mimetype = response_mimetype(request)
+    if mimetype is None:
+        return jsonify({'error': not_acceptable_message()}), 406
+    
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown upload job'}), 404
+    return encode_response(job.as_dict(), mimetype)
+
+
+@app.route("/api/upload/jobs/<job_id>", methods=["DELETE"])
+def cancel_upload_job(job_id):
+    """
+    Cancel an upload job; a running one stops at its next page
+    """
+    job = upload_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown upload job'}), 404
+    return jsonify(job.as_dict(include_result=False)), 202
+
+
 @app.route("/api/transactions", methods=["GET"])
 def get_transactions():
     """
@@ -350,144 +608,35 @@ def get_transactions():
 @app.route("/api/transactions/<int:user_id>", methods=["GET"])
 def get_user_transactions(user_id):
     """
-    Get transactions for a specific user
+    Get transactions for a specific user, ordered by date.
+    
+    Without ?limit the whole history comes back. With ?limit=N the list is
+    one page, and the X-Next-Cursor header (absent on the last page) is sent
+    back as ?cursor= for the next one. Filters: date_from and date_to
+    (YYYY-MM-DD, inclusive), type, category, frequency; ?order=desc for
+    newest first.
+    
+    Pages carry an ETag (the user's data version plus the query); a request
+    whose If-None-Match holds it gets a 304 without the page being read.
     """
     try:
-        # For demo purposes, return sample transaction data
-        sample_transactions = [
-            {
-                'id': 1,
-                'user_id': user_id,
-                'date': '2024-01-15',
-                'description': 'Salary Credit',
-                'amount': 5000.00,
-                'type': 'credit',
-                'frequency': 'regular',
-                'created_at': '2024-01-15T10:00:00'
-            },
-            {
-                'id': 2,
-                'user_id': user_id,
-                'date': '2024-01-16',
-                'description': 'Grocery Shopping',
-                'amount': 150.00,
-                'type': 'debit',
-                'frequency': 'regular',
-                'created_at': '2024-01-16T14:30:00'
-            },
-            {
-                'id': 3,
-                'user_id': user_id,
-                'date': '2024-01-18',
-                'description': 'Utility Bill Payment',
-                'amount': 200.00,
-                'type': 'debit',
-                'frequency': 'regular',
-                'created_at': '2024-01-18T09:15:00'
-            },
-            {
-                'id': 4,
-                'user_id': user_id,
-                'date': '2024-02-15',
-                'description': 'Salary Credit',
-                'amount': 5000.00,
-                'type': 'credit',
-                'frequency': 'regular',
-                'created_at': '2024-02-15T10:00:00'
-            },
-            {
-                'id': 5,
-                'user_id': user_id,
-                'date': '2024-02-20',
-                'description': 'Restaurant Bill',
-                'amount': 75.00,
-                'type': 'debit',
-                'frequency': 'irregular',
-                'created_at': '2024-02-20T19:45:00'
-            },
-            {
-                'id': 6,
-                'user_id': user_id,
-                'date': '2024-03-15',
-                'description': 'Salary Credit',
-                'amount': 5000.00,
-                'type': 'credit',
-                'frequency': 'regular',
-                'created_at': '2024-03-15T10:00:00'
-            },
-            {
-                'id': 7,
-                'user_id': user_id,
-                'date': '2024-03-22',
-                'description': 'Gas Bill',
-                'amount': 80.00,
-                'type': 'debit',
-                'frequency': 'regular',
-                'created_at': '2024-03-22T11:20:00'
-            },
-            {
-                'id': 8,
-                'user_id': user_id,
-                'date': '2024-04-15',
-                'description': 'Salary Credit',
-                'amount': 5000.00,
-                'type': 'credit',
-                'frequency': 'regular',
-                'created_at': '2024-04-15T10:00:00'
-            },
-            {
-                'id': 9,
-                'user_id': user_id,
-                'date': '2024-04-25',
-                'description': 'Entertainment Expense',
-                'amount': 120.00,
-                'type': 'debit',
-                'frequency': 'irregular',
-                'created_at': '2024-04-25T16:30:00'
-            },
-            {
-                'id': 10,
-                'user_id': user_id,
-                'date': '2024-05-15',
-                'description': 'Salary Credit',
-                'amount': 5000.00,
-                'type': 'credit',
-                'frequency': 'regular',
-                'created_at': '2024-05-15T10:00:00'
-            },
-            {
-                'id': 11,
-                'user_id': user_id,
-                'date': '2024-05-28',
-                'description': 'Medical Expense',
-                'amount': 300.00,
-                'type': 'debit',
-                'frequency': 'irregular',
-                'created_at': '2024-05-28T13:15:00'
-            },
-            {
-                'id': 12,
-                'user_id': user_id,
-                'date': '2024-06-15',
-                'description': 'Salary Credit',
-                'amount': 5000.00,
-                'type': 'credit',
-                'frequency': 'regular',
-                'created_at': '2024-06-15T10:00:00'
-            },
-            {
-                'id': 13,
-                'user_id': user_id,
-                'date': '2024-06-30',
-                'description': 'Transportation',
-                'amount': 45.00,
-                'type': 'debit',
-                'frequency': 'regular',
-                'created_at': '2024-06-30T08:45:00'
-            }
-        ]
+        query = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        etag = strong_etag('transactions', user_id, transaction_store.data_version(user_id),
+                           sorted(request.args.items(multi=True)))
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
         
-        return jsonify(sample_transactions)
+        transactions, next_key = transaction_store.page(user_id, **query)
+        response = jsonify(transactions)
+        response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor'
+        if next_key is not None:
+            response.headers['X-Next-Cursor'] = encode_cursor(*next_key)
+        return tag(response, etag)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -499,15 +648,23 @@ def save_transactions():
     """
     try:
         transactions = request.json.get('transactions', [])
+        # Rows without their own user_id belong to the request's user
+        user_id = request.json.get('user_id')
         
         if not transactions:
             return jsonify({'error': 'No transactions provided'}), 400
         
-        # Convert to DataFrame for database operations
-        df = pd.DataFrame(transactions)
+        for i, trans in enumerate(transactions):
+            trans = {'user_id': user_id, **trans} if user_id is not None else trans
+            field = missing_field(trans)
+            if field:
+                return jsonify({'error': f'Missing required field "{field}" in transaction {i+1}'}), 400
+            problem = invalid_value(trans)
+            if problem:
+                return jsonify({'error': f'{problem} (transaction {i+1})'}), 400
         
-        # Save to database
-        df.to_sql("transactions", con=engine, if_exists="append", index=False)
+        # Save to database in a single transaction
+        transaction_store.insert_many(transactions, user_id=user_id)
         
         return jsonify({
             'success': True,
@@ -518,6 +675,41 @@ def save_transactions():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route("/api/transactions/import", methods=["POST"])
+def import_transactions():
+    """
+    Idempotent bulk import of a statement's transactions for one user.
+    Rows already stored (same date, amount and description) are skipped, so
+    overlapping statements can be imported again safely.
+    """
+    try:
+        user_id = request.json.get('user_id')
+        transactions = request.json.get('transactions', [])
+        
+        if user_id is None:
+            return jsonify({'error': 'User ID is required'}), 400
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'User ID must be an integer'}), 400
+        if not transactions:
+            return jsonify({'error': 'No transactions provided'}), 400
+        
+        for i, trans in enumerate(transactions):
+            field = missing_field({**trans, 'user_id': user_id})
+            if field:
+                return jsonify({'error': f'Missing required field "{field}" in transaction {i+1}'}), 400
+            problem = invalid_value({**trans, 'user_id': user_id})
+            if problem:
+                return jsonify({'error': f'{problem} (transaction {i+1})'}), 400
+        
+        result = transaction_store.import_transactions(user_id, transactions)
+        return jsonify({'success': True, **result})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route("/api/health", methods=["GET"])
 def health_check():
     """
@@ -526,6 +718,15 @@ def health_check():
     return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
 
 
+@app.route("/api/stats", methods=["GET"])
+def parser_stats():
+    """
+    Parser cache statistics (hits, misses, size per cache)
+    """
+    return jsonify({'date_cache': date_cache_stats(), 'parse_cache': parse_cache.stats(),
+                    'upload_jobs': upload_jobs.stats()})
+
+
 if __name__ == "__main__":
     # Create upload directory
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
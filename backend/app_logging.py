@@ -0,0 +1,136 @@
+"""
+Logging setup shared by the backend modules.
+
+Everything is configured from the environment the first time a logger is
+asked for:
+
+  LOG_LEVEL=INFO                               default level for every module
+  LOG_LEVELS=test_app=DEBUG,bank_parsers=ERROR per-module overrides
+  LOG_DEBUG_SAMPLE=100                         per-row DEBUG diagnostics for one call in 100
+  LOG_FORMAT=text|json                         one JSON object per line with json
+
+Messages use %-style arguments (log.debug("row %s", row)), so a disabled
+level costs one isEnabledFor() check and the message is never built. Call
+sites whose arguments are themselves expensive guard with isEnabledFor().
+
+Per-row diagnostics in the parsing loops guard with debug_sampled(log)
+instead, which also applies LOG_DEBUG_SAMPLE. The sample is taken before
+any record is made, so a skipped row's diagnostics cost one counter step.
+"""
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Dict
+
+ROOT_LOGGER = 'finance'
+
+LEVEL_ENV = 'LOG_LEVEL'
+MODULE_LEVELS_ENV = 'LOG_LEVELS'
+DEBUG_SAMPLE_ENV = 'LOG_DEBUG_SAMPLE'
+FORMAT_ENV = 'LOG_FORMAT'
+
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s %(module_name)s: %(message)s'
+
+_configured = False
+_lock = threading.Lock()
+
+
+class DebugSampler:
+    """Says yes to one call in `every` (every call when every is 1)"""
+
+    def __init__(self, every: int = 1):
+        self.every = max(every, 1)
+        self._counter = itertools.count()
+
+    def take(self) -> bool:
+        return self.every == 1 or next(self._counter) % self.every == 0
+
+
+debug_sampler = DebugSampler()
+
+
+def debug_sampled(logger: logging.Logger) -> bool:
+    """
+    Guard for per-row DEBUG diagnostics: true when DEBUG is enabled for logger
+    and this call falls in the LOG_DEBUG_SAMPLE sample
+    """
+    return logger.isEnabledFor(logging.DEBUG) and debug_sampler.take()
+
+
+def parse_sample_rate(value: str) -> int:
+    """LOG_DEBUG_SAMPLE as a positive int; a bad value is ignored (1, no sampling)"""
+    try:
+        return max(int(value), 1)
+    except ValueError:
+        return 1
+
+
+class ModuleNameFilter(logging.Filter):
+    """Expose the logger name without the 'finance.' prefix as %(module_name)s"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.module_name = record.name.split('.', 1)[-1]
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg (+ exc)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': getattr(record, 'module_name', record.name),
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_module_levels(spec: str) -> Dict[str, int]:
+    """'test_app=DEBUG, app=WARNING' -> {'test_app': 10, 'app': 30}; bad entries are ignored"""
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        level = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+def configure() -> None:
+    """Attach the handler and apply the env levels; safe to call more than once"""
+    global _configured
+    with _lock:
+        if _configured:
+            return
+
+        root = logging.getLogger(ROOT_LOGGER)
+        level = logging.getLevelName(os.environ.get(LEVEL_ENV, 'INFO').upper())
+        root.setLevel(level if isinstance(level, int) else logging.INFO)
+        root.propagate = False
+
+        handler = logging.StreamHandler(sys.stderr)
+        handler.addFilter(ModuleNameFilter())
+        if os.environ.get(FORMAT_ENV, 'text').lower() == 'json':
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+
+        debug_sampler.every = parse_sample_rate(os.environ.get(DEBUG_SAMPLE_ENV, '1'))
+
+        for name, module_level in parse_module_levels(os.environ.get(MODULE_LEVELS_ENV, '')).items():
+            logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(module_level)
+
+        _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a backend module, e.g. get_logger('test_app')"""
+    configure()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
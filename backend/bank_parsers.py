@@ -1,14 +1,41 @@
 """
 Bank-specific parsers for different Indian banks
 """
-import re
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+import cell_classifiers
+from app_logging import get_logger
+from categorizer import STATEMENT_RULES, load_categorizer
+
+log = get_logger('bank_parsers')
+
+
+def deduplicate_transactions(transactions: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Streaming stage: drop repeats of (date, amount, first 20 chars of description)"""
+    # Whole keys, so rows whose keys merely hash alike are both kept; the set
+    # grows only with the unique rows
+    seen = set()
+    
+    for trans in transactions:
+        key = (
+            trans['date'],
+            trans['amount'],
+            trans['description'][:20].strip()
+        )
+        
+        if key not in seen:
+            seen.add(key)
+            yield trans
 
 
 class BankParser:
     """Base class for bank-specific parsers"""
     
+    # Whether parse() reads the page text; parsers that only read tables let
+    # the extractor skip text layout for every page but the first
+    needs_text = True
+    
     def __init__(self):
         self.bank_name = "Generic"
     
@@ -19,14 +46,32 @@ class BankParser:
     def parse(self, text: str, tables: List = None) -> List[Dict[str, Any]]:
         """Parse transactions from the PDF text/tables"""
         return []
+    
+    def iter_parse(self, pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Parse page dicts ({'text', 'tables'}) incrementally, yielding transactions.
+        Parsers without a streaming implementation buffer the document and call parse().
+        """
+        text = ''
+        tables = []
+        for page in pages:
+            if page.get('text'):
+                text += page['text'] + '\n'
+            tables.extend(page.get('tables') or [])
+        
+        yield from self.parse(text, tables)
 
 
 class IndianBankParser(BankParser):
     """Parser for Indian Bank statements"""
     
+    # Text is only a fallback for statements whose tables yield nothing
+    needs_text = False
+    
     def __init__(self):
         super().__init__()
         self.bank_name = "Indian Bank"
+        self.categorizer = load_categorizer(STATEMENT_RULES)
     
     def can_parse(self, text: str) -> bool:
         """Check if this is an Indian Bank statement"""
@@ -38,24 +83,35 @@ class IndianBankParser(BankParser):
     
     def parse(self, text: str, tables: List = None) -> List[Dict[str, Any]]:
         """Parse Indian Bank statement"""
-        transactions = []
-        
-        # Try table-based parsing first
-        if tables:
-            for table in tables:
-                table_transactions = self._parse_table(table)
-                transactions.extend(table_transactions)
+        return list(self.iter_parse([{'text': text, 'tables': tables or []}]))
+    
+    def iter_parse(self, pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Parse Indian Bank statement page by page, yielding unique transactions"""
+        return deduplicate_transactions(self._iter_page_transactions(pages))
+    
+    def _iter_page_transactions(self, pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Table-based parsing first; text is only parsed if no table yields anything"""
+        found_in_tables = False
+        pending_text = []
         
-        # If no table data, try text-based parsing
-        if not transactions:
-            transactions = self._parse_text(text)
+        for page in pages:
+            for table in page.get('tables') or []:
+                for transaction in self._parse_table(table):
+                    found_in_tables = True
+                    yield transaction
+            
+            # Text is only kept until the first table transaction turns up
+            if found_in_tables:
+                pending_text = []
+            elif page.get('text'):
+                pending_text.append(page['text'])
         
-        return self._deduplicate_transactions(transactions)
+        if not found_in_tables:
+            for text in pending_text:
+                yield from self._parse_text(text)
     
-    def _parse_table(self, table: List[List]) -> List[Dict[str, Any]]:
+    def _parse_table(self, table: List[List]) -> Iterator[Dict[str, Any]]:
         """Parse transactions from table data"""
-        transactions = []
-        
         for row in table:
             if not row or len(row) < 4:
                 continue
@@ -67,9 +123,7 @@ class IndianBankParser(BankParser):
             
             transaction = self._parse_row(row)
             if transaction:
-                transactions.append(transaction)
-        
-        return transactions
+                yield transaction
     
     def _parse_row(self, row: List) -> Optional[Dict[str, Any]]:
         """Parse a single row from the table"""
@@ -129,27 +183,19 @@ class IndianBankParser(BankParser):
             }
             
         except Exception as e:
-            print(f"Error parsing row: {e}")
+            log.error("Error parsing row: %s", e)
             return None
     
-    def _parse_text(self, text: str) -> List[Dict[str, Any]]:
+    def _parse_text(self, text: str) -> Iterator[Dict[str, Any]]:
         """Parse transactions from raw text"""
-        transactions = []
-        lines = text.split('\n')
-        
-        for line in lines:
+        for line in text.split('\n'):
             # Indian Bank pattern: Date Description Amount (variations)
-            patterns = [
-                r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\s+(.+?)\s+(\d+(?:,\d{3})*\.?\d*)',
-                r'(\d{1,2}\s+\w{3}\s+\d{4})\s+(.+?)\s+(\d+(?:,\d{3})*\.?\d*)',
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
+            for pattern in cell_classifiers.STATEMENT_LINE_PATTERNS:
+                match = pattern.search(line)
                 if match:
                     date_str, description, amount_str = match.groups()
                     
-                    transaction = {
+                    yield {
                         'date': self._format_date(date_str),
                         'description': description.strip(),
                         'amount': float(self._clean_amount(amount_str)),
@@ -157,123 +203,32 @@ class IndianBankParser(BankParser):
                         'frequency': 'one-time',
                         'category': self._detect_category(description)
                     }
-                    
-                    transactions.append(transaction)
                     break
-        
-        return transactions
     
     def _is_date(self, text: str) -> bool:
         """Check if text looks like a date"""
-        if not text:
-            return False
-        
-        date_patterns = [
-            r'^\d{1,2}[/-]\d{1,2}[/-]\d{2,4}$',
-            r'^\d{1,2}\s+\w{3}\s+\d{4}$',
-            r'^\d{4}[/-]\d{1,2}[/-]\d{1,2}$'
-        ]
-        
-        return any(re.match(pattern, text.strip()) for pattern in date_patterns)
+        return cell_classifiers.is_statement_date(text)
     
     def _is_amount(self, text: str) -> bool:
         """Check if text looks like an amount"""
-        if not text:
-            return False
-        
-        # Remove common currency symbols and commas
-        cleaned = re.sub(r'[₹,\s]', '', text.strip())
-        
-        # Check if it's a valid number
-        try:
-            float(cleaned)
-            return True
-        except ValueError:
-            return False
+        return cell_classifiers.is_amount(text)
     
     def _clean_amount(self, text: str) -> str:
         """Clean amount string for parsing"""
-        # Remove currency symbols, commas, and extra spaces
-        cleaned = re.sub(r'[₹,\s]', '', text.strip())
-        return cleaned
+        return cell_classifiers.clean_amount(text)
     
     def _format_date(self, date_str: str) -> str:
-        """Format date string to YYYY-MM-DD"""
-        try:
-            # Handle different date formats
-            date_str = date_str.strip()
-            
-            # DD/MM/YYYY or DD-MM-YYYY
-            if re.match(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', date_str):
-                if '/' in date_str:
-                    parts = date_str.split('/')
-                else:
-                    parts = date_str.split('-')
-                
-                day, month, year = parts
-                
-                # Handle 2-digit years
-                if len(year) == 2:
-                    year = '20' + year
-                
-                return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-            
-            # DD MMM YYYY (e.g., 15 Jan 2024)
-            elif re.match(r'\d{1,2}\s+\w{3}\s+\d{4}', date_str):
-                parts = date_str.split()
-                day, month_str, year = parts
-                
-                month_map = {
-                    'jan': '01', 'feb': '02', 'mar': '03', 'apr': '04',
-                    'may': '05', 'jun': '06', 'jul': '07', 'aug': '08',
-                    'sep': '09', 'oct': '10', 'nov': '11', 'dec': '12'
-                }
-                
-                month = month_map.get(month_str.lower()[:3], '01')
-                return f"{year}-{month}-{day.zfill(2)}"
-            
-            return datetime.now().strftime('%Y-%m-%d')
-            
-        except Exception:
-            return datetime.now().strftime('%Y-%m-%d')
+        """Format date string to YYYY-MM-DD (today if it can't be read)"""
+        formatted = cell_classifiers.normalize_statement_date(date_str)
+        return formatted or datetime.now().strftime('%Y-%m-%d')
     
     def _detect_category(self, description: str) -> str:
         """Detect transaction category from description"""
-        desc_lower = description.lower()
-        
-        if any(word in desc_lower for word in ['upi', 'gpay', 'paytm', 'phonepe', 'bhim']):
-            return 'Digital Payment'
-        elif any(word in desc_lower for word in ['atm', 'cash withdrawal', 'cwd']):
-            return 'Cash Withdrawal'
-        elif any(word in desc_lower for word in ['salary', 'sal', 'wages']):
-            return 'Salary'
-        elif any(word in desc_lower for word in ['interest', 'int']):
-            return 'Interest'
-        elif any(word in desc_lower for word in ['transfer', 'tfr', 'neft', 'rtgs', 'imps']):
-            return 'Transfer'
-        elif any(word in desc_lower for word in ['fee', 'charges', 'charge']):
-            return 'Bank Charges'
-        else:
-            return 'Others'
+        return self.categorizer.categorize(description)
     
     def _deduplicate_transactions(self, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Remove duplicate transactions"""
-        seen = set()
-        unique_transactions = []
-        
-        for trans in transactions:
-            # Create a unique key based on date, amount, and first 20 chars of description
-            key = (
-                trans['date'],
-                trans['amount'],
-                trans['description'][:20].strip()
-            )
-            
-            if key not in seen:
-                seen.add(key)
-                unique_transactions.append(trans)
-        
-        return unique_transactions
+        return list(deduplicate_transactions(transactions))
 
 
 class SBIParser(BankParser):
@@ -340,8 +295,16 @@ class BankParserFactory:
         # Return the first parser (Indian Bank) as default
         return self.parsers[0]
     
-    def parse_statement(self, text: str, tables: List = None) -> List[Dict[str, Any]]:
-        """Parse bank statement using the appropriate parser"""
-        parser = self.get_parser(text)
-        print(f"Using parser: {parser.bank_name}")
-        return parser.parse(text, tables)
\ No newline at end of file
+    def parse_statement(self, text: str, tables: List = None,
+                        parser: Optional[BankParser] = None) -> List[Dict[str, Any]]:
+        """Parse bank statement using the appropriate (or an already chosen) parser"""
+        if parser is None:
+            parser = self.get_parser(text)
+        log.info("Using parser: %s", parser.bank_name)
+        return parser.parse(text, tables)
+    
+    def iter_statement(self, pages: Iterable[Dict[str, Any]],
+                       parser: BankParser) -> Iterator[Dict[str, Any]]:
+        """Stream transactions from page dicts with an already chosen parser"""
+        log.info("Using parser: %s", parser.bank_name)
+        return parser.iter_parse(pages)
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""
+Forecasts for many users in one call, for the nightly projection job.
+
+Every user's monthly history gets the forecast /api/predict-future would give
+it: the regression on all transactions, and the one on regular transactions
+with the same fallback to trend analysis. Users are grouped by history length
+and each group is one stack of arrays (users x months x features), so the
+features, scaling, least-squares fits and horizon predictions are a handful
+of numpy calls per group instead of per user.
+
+Results come out as one record per user in the /api/predict-future response
+shape (NDJSON), or as one CSV row per user, forecast and month.
+
+  python batch_forecast.py [--db PATH] [--user ID ...] [--months-ahead 6] [--format ndjson|csv] [--out FILE]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app_logging import get_logger
+from forecasting import (FeatureScaler, LinearModel, MonthlyTotals, clip_forecast, horizon_dates, monthly_histories,
+                         trailing_mean_values, valid_months_ahead)
+from storage import DEFAULT_PATH, PATH_ENV, TransactionStore
+
+log = get_logger('batch_forecast')
+
+MIN_MONTHS = 3
+# Users fitted per stack; bounds the memory of one group
+STACK_SIZE = 4096
+INSUFFICIENT_HISTORY = 'Insufficient transaction history for prediction (need at least 3 months)'
+CSV_COLUMNS = ('user_id', 'forecast', 'method', 'future_date', 'month', 'year', 'income', 'expense', 'savings')
+YEAR_MONTH = re.compile(r'\d{4}-(0[1-9]|1[0-2])')
+
+
+class UserForecast(NamedTuple):
+    user_id: Any
+    history: MonthlyTotals
+    # (months ahead x [income, expense, savings]), rounded to cents; None without enough history
+    predictions: Optional[np.ndarray] = None
+    regular: Optional[np.ndarray] = None
+    regular_method: Optional[str] = None
+
+
+def regression_forecast(month_numeric: np.ndarray, income: np.ndarray, expense: np.ndarray,
+                        dates: Sequence[datetime]) -> np.ndarray:
+    """
+    Clipped (income, expense, savings) forecasts, users x months ahead, from
+    the default features fitted per user -- create_ml_features,
+    train_prediction_models and predict_horizon over a stack of users
+    """
+    users, length = income.shape
+    months_ahead = len(dates)
+    X = np.stack([
+        np.broadcast_to(np.arange(1, length + 1, dtype=float), (users, length)),
+        month_numeric,
+        trailing_mean_values(income, 2),
+        trailing_mean_values(expense, 2),
+    ], axis=-1)
+    scaler = FeatureScaler()
+    model = LinearModel().fit(scaler.fit_transform(X), np.stack([income, expense], axis=-1))
+
+    future = np.stack([
+        np.broadcast_to(length + np.arange(1, months_ahead + 1, dtype=float), (users, months_ahead)),
+        np.broadcast_to(np.array([date.month for date in dates], dtype=float), (users, months_ahead)),
+        np.repeat(income[:, -3:].mean(axis=1)[:, None], months_ahead, axis=1),
+        np.repeat(expense[:, -3:].mean(axis=1)[:, None], months_ahead, axis=1),
+    ], axis=-1)
+    return clip_forecast(model.predict(scaler.transform(future)))
+
+
+def trend_forecast(income: np.ndarray, expense: np.ndarray, months_ahead: int) -> np.ndarray:
+    """predict_regular_future_values' fallback for a stack of users: recent average plus a linear trend"""
+    recent = np.stack([income, expense], axis=-1)[:, -6:]
+    count = recent.shape[1]
+    average = recent.mean(axis=1)
+    recent_average = recent[:, -3:].mean(axis=1)
+    older_average = recent[:, :3].mean(axis=1) if count >= 6 else recent_average
+    trend = (recent_average - older_average) / max(3, count - 3)
+    steps = np.arange(1, months_ahead + 1, dtype=float)
+    return clip_forecast(average[:, None, :] + trend[:, None, :] * steps[None, :, None])
+
+
+def forecast_stack(histories: Sequence[MonthlyTotals], dates: Sequence[datetime]
+                   ) -> List[Tuple[np.ndarray, Optional[np.ndarray], Optional[str]]]:
+    """(predictions, regular predictions, regular method) for histories of one length"""
+    month_numeric = np.array([[int(year_month[5:7]) for year_month in history.year_month]
+                              for history in histories], dtype=float)
+    income = np.array([history.income for history in histories], dtype=float)
+    expense = np.array([history.expense for history in histories], dtype=float)
+    predictions = np.round(regression_forecast(month_numeric, income, expense, dates), 2)
+
+    regular = [None] * len(histories)
+    methods = [None] * len(histories)
+    with_regular = [i for i, history in enumerate(histories) if history.regular_income is not None]
+    if with_regular:
+        regular_income = np.array([histories[i].regular_income for i in with_regular], dtype=float)
+        regular_expense = np.array([histories[i].regular_expense for i in with_regular], dtype=float)
+        predicted = regression_forecast(month_numeric[with_regular], regular_income, regular_expense, dates)
+        # One unreasonable month sends that user's whole horizon to trend analysis
+        unreasonable = ((predicted[..., 0] < 100) | (predicted[..., 1] > predicted[..., 0] * 2)).any(axis=1)
+        if unreasonable.any():
+            predicted[unreasonable] = trend_forecast(regular_income[unreasonable], regular_expense[unreasonable],
+                                                     len(dates))
+        predicted = np.round(predicted, 2)
+        for row, i in enumerate(with_regular):
+            regular[i] = predicted[row]
+            methods[i] = 'trend' if unreasonable[row] else 'ml'
+
+    return list(zip(predictions, regular, methods))
+
+
+def forecast_histories(histories: Iterable[Tuple[Any, MonthlyTotals]], months_ahead: int,
+                       now: Optional[datetime] = None) -> Tuple[List[datetime], List[UserForecast]]:
+    """The horizon's dates and one UserForecast per (user_id, history), in input order"""
+    dates = horizon_dates(now or datetime.now(), months_ahead)
+    forecasts = [UserForecast(user_id, history) for user_id, history in histories]
+
+    by_length: Dict[int, List[int]] = {}
+    for index, forecast in enumerate(forecasts):
+        if len(forecast.history.year_month) >= MIN_MONTHS:
+            by_length.setdefault(len(forecast.history.year_month), []).append(index)
+
+    for indexes in by_length.values():
+        for start in range(0, len(indexes), STACK_SIZE):
+            stack = indexes[start:start + STACK_SIZE]
+            results = forecast_stack([forecasts[i].history for i in stack], dates)
+            for i, (predictions, regular, method) in zip(stack, results):
+                forecasts[i] = forecasts[i]._replace(predictions=predictions, regular=regular, regular_method=method)
+    return dates, forecasts
+
+
+def histories_from_store(store: TransactionStore, user_ids: Optional[Iterable[int]] = None
+                         ) -> Iterator[Tuple[int, MonthlyTotals]]:
+    """(user_id, history) for every user in the monthly rollup, or just user_ids"""
+    return monthly_histories(store.monthly_history(user_ids))
+
+
+def histories_from_json(users: Sequence[Dict[str, Any]]) -> List[Tuple[Any, MonthlyTotals]]:
+    """
+    (user_id, history) from posted columnar aggregates: {"user_id", "year_month",
+    "income", "expense"} plus optional "regular_income"/"regular_expense".
+    Raises ValueError describing the first malformed user.
+    """
+    histories = []
+    for position, user in enumerate(users):
+        if not isinstance(user, dict) or 'user_id' not in user:
+            raise ValueError(f"users[{position}] needs a user_id")
+        year_month = user.get('year_month')
+        if not isinstance(year_month, list) or not all(isinstance(month, str) and YEAR_MONTH.fullmatch(month)
+                                                       for month in year_month):
+            raise ValueError(f"users[{position}].year_month must be a list of 'YYYY-MM' strings")
+        if len(set(year_month)) != len(year_month):
+            raise ValueError(f"users[{position}].year_month has repeated months")
+
+        fields = ['income', 'expense'] + [field for field in ('regular_income', 'regular_expense') if field in user]
+        if len(fields) == 3:
+            raise ValueError(f"users[{position}] needs both regular_income and regular_expense, or neither")
+        for field in fields:
+            values = user.get(field)
+            if (not isinstance(values, list) or len(values) != len(year_month)
+                    or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values)):
+                raise ValueError(f"users[{position}].{field} must be a list of numbers, one per month")
+
+        order = sorted(range(len(year_month)), key=year_month.__getitem__)
+        columns = {field: [user[field][i] for i in order] for field in fields}
+        histories.append((user['user_id'], MonthlyTotals([year_month[i] for i in order], **columns)))
+    return histories
+
+
+def prediction_rows(values: np.ndarray, labels: Sequence[Tuple[str, str, int]],
+                    keys: Tuple[str, str, str]) -> List[Dict[str, Any]]:
+    """Prediction dicts for one forecast, values rounded as they were stored"""
+    return [{'future_date': future_date, 'month': month, 'year': year,
+             keys[0]: income, keys[1]: expense, keys[2]: savings}
+            for (future_date, month, year), (income, expense, savings) in zip(labels, values.tolist())]
+
+
+def date_labels(dates: Sequence[datetime]) -> List[Tuple[str, str, int]]:
+    """(future_date, month, year) for each forecast month, as /api/predict-future labels them"""
+    return [(f"{date.strftime('%B')} {date.year}", date.strftime('%B'), date.year) for date in dates]
+
+
+def forecast_record(forecast: UserForecast, dates: Sequence[datetime],
+                    labels: Optional[Sequence[Tuple[str, str, int]]] = None) -> Dict[str, Any]:
+    """The /api/predict-future response for one user, plus its user_id"""
+    if forecast.predictions is None:
+        return {'user_id': forecast.user_id, 'success': False, 'error': INSUFFICIENT_HISTORY,
+                'predictions': [], 'regular_predictions': []}
+
+    labels = labels or date_labels(dates)
+    history = forecast.history
+    return {
+        'user_id': forecast.user_id,
+        'success': True,
+        'predictions': prediction_rows(forecast.predictions, labels,
+                                       ('income_expected', 'expense_expected', 'savings_expected')),
+        'regular_predictions': [] if forecast.regular is None else prediction_rows(
+            forecast.regular, labels, ('predicted_income', 'predicted_expense', 'predicted_savings')),
+        'model_info': {
+            'data_points_used': len(history.year_month),
+            'months_predicted': len(dates),
+            'regular_data_points': len(history.year_month) if history.regular_income is not None else 0,
+            'data_range': {'from': history.year_month[0], 'to': history.year_month[-1]}
+        }
+    }
+
+
+def iter_ndjson(forecasts: Iterable[UserForecast], dates: Sequence[datetime]) -> Iterator[str]:
+    """One JSON record per user and line"""
+    labels = date_labels(dates)
+    for forecast in forecasts:
+        yield json.dumps(forecast_record(forecast, dates, labels)) + '\n'
+
+
+def iter_csv(forecasts: Iterable[UserForecast], dates: Sequence[datetime],
+             users_per_chunk: int = 500) -> Iterator[str]:
+    """
+    CSV text, header first, one row per user, forecast ('all' or 'regular')
+    and month; users without enough history have no rows
+    """
+    labels = date_labels(dates)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(CSV_COLUMNS)
+    for count, forecast in enumerate(forecasts, 1):
+        for kind, method, values in (('all', 'ml', forecast.predictions),
+                                     ('regular', forecast.regular_method, forecast.regular)):
+            if values is None:
+                continue
+            for label, row in zip(labels, values.tolist()):
+                writer.writerow((forecast.user_id, kind, method) + label + tuple(row))
+        if count % users_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Forecast every user in the transactions database')
+    parser.add_argument('--db', default=os.environ.get(PATH_ENV, DEFAULT_PATH),
+                        help=f"database path (default: ${PATH_ENV} or {DEFAULT_PATH})")
+    parser.add_argument('--user', type=int, action='append', help='only this user_id (repeatable)')
+    parser.add_argument('--months-ahead', type=int, default=6)
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    parser.add_argument('--out', default='-', help='output file (default: stdout)')
+    args = parser.parse_args(argv)
+    if not valid_months_ahead(args.months_ahead):
+        parser.error('--months-ahead must be from 1 to 120')
+
+    start = time.perf_counter()
+    store = TransactionStore(args.db)
+    dates, forecasts = forecast_histories(histories_from_store(store, args.user), args.months_ahead)
+    lines = iter_csv(forecasts, dates) if args.format == 'csv' else iter_ndjson(forecasts, dates)
+
+    out = sys.stdout if args.out == '-' else open(args.out, 'w', newline='')
+    try:
+        out.writelines(lines)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    store.close()
+
+    elapsed = time.perf_counter() - start
+    forecast_count = sum(forecast.predictions is not None for forecast in forecasts)
+    log.info("Forecast %s of %s users in %.2f s (%.0f users/s)", forecast_count, len(forecasts), elapsed,
+             len(forecasts) / elapsed if elapsed else 0)
+
+
+if __name__ == '__main__':
+    main()
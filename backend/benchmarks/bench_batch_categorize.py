@@ -0,0 +1,100 @@
+"""
+Categorising a 100k-row Excel import: one detect_category() call per row (the
+old normalize_transactions loop) vs one categorize_many() call per batch.
+
+Usage: python benchmarks/bench_batch_categorize.py [rows]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import app  # noqa: E402
+from synthetic_statements import DESCRIPTIONS  # noqa: E402
+
+
+def legacy_detect_category(description):
+    description_lower = description.lower()
+    if any(word in description_lower for word in ['upi', 'gpay', 'paytm', 'phonepe']):
+        return 'Digital Payment'
+    elif any(word in description_lower for word in ['atm', 'cash']):
+        return 'Cash Withdrawal'
+    elif any(word in description_lower for word in ['salary', 'sal']):
+        return 'Salary'
+    elif any(word in description_lower for word in ['food', 'restaurant', 'hotel']):
+        return 'Food & Dining'
+    elif any(word in description_lower for word in ['fuel', 'petrol', 'diesel']):
+        return 'Fuel'
+    else:
+        return 'Others'
+
+
+def legacy_normalize_transactions(transactions):
+    normalized = []
+    for trans_id, trans in enumerate(transactions, start=1):
+        normalized.append({
+            'id': trans_id,
+            'date': trans.get('date', ''),
+            'description': trans.get('description', ''),
+            'amount': float(trans.get('amount', 0)),
+            'type': trans.get('type', 'debit'),
+            'frequency': trans.get('frequency', 'one-time'),
+            'category': legacy_detect_category(trans.get('description', '')),
+            'actions': 'edit,delete'
+        })
+    return normalized
+
+
+def excel_records(count, seed=9):
+    """Excel-style rows: recurring merchants, plus a share of one-off references"""
+    rng = random.Random(seed)
+    merchants = [f"{rng.choice(DESCRIPTIONS)} {n}" for n in range(2000)]
+    records = []
+    for i in range(count):
+        if rng.random() < 0.2:
+            description = f"{rng.choice(DESCRIPTIONS)} REF{i}"
+        else:
+            description = rng.choice(merchants)
+        records.append({'date': '2024-01-15', 'description': description,
+                        'amount': round(rng.uniform(10, 5000), 2), 'type': 'debit'})
+    return records
+
+
+def best_of(func, *args, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    records = excel_records(count)
+    descriptions = [trans['description'] for trans in records]
+    column = pd.Series(descriptions)
+
+    per_row_s, expected = best_of(lambda: [legacy_detect_category(d) for d in descriptions])
+    batch_s, categories = best_of(app.detect_categories, descriptions)
+    series_s, series = best_of(app.detect_categories, column)
+    assert categories == expected and series.tolist() == expected
+
+    old_s, old = best_of(legacy_normalize_transactions, records)
+    new_s, new = best_of(app.normalize_transactions, records)
+    assert old == new
+
+    print(f"rows={count} distinct descriptions={column.nunique()}")
+    print(f"categorise per row:        {per_row_s * 1000:8.1f} ms")
+    print(f"categorize_many (list):    {batch_s * 1000:8.1f} ms  ({per_row_s / batch_s:.1f}x)")
+    print(f"categorize_many (Series):  {series_s * 1000:8.1f} ms  ({per_row_s / series_s:.1f}x)")
+    print(f"normalize_transactions:    {old_s * 1000:8.1f} ms -> {new_s * 1000:.1f} ms "
+          f"({old_s / new_s:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
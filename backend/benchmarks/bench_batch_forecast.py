@@ -0,0 +1,107 @@
+"""
+Nightly projections: forecasting many users with batch_forecast (users
+stacked by history length) against one user at a time, in users per second.
+
+  engine   forecast_histories + NDJSON encoding vs the per-user frame,
+           feature, training and prediction functions of test_app
+  HTTP     one POST /api/predict-future/batch with every user_id vs one
+           POST /api/predict-future per user (model cache off)
+
+Histories are 3-120 months long and written straight into monthly_aggregates
+of a temporary database. The per-user paths run on a sample.
+
+Usage: python benchmarks/bench_batch_forecast.py [users] [sample]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+MONTHS = pd.period_range('2015-01', periods=120, freq='M').astype(str).tolist()
+
+
+def aggregate_rows(users, seed=9):
+    """monthly_aggregates rows: income/expense, regular and irregular, per user and month"""
+    rng = random.Random(seed)
+    for user_id in range(1, users + 1):
+        length = rng.randint(3, 120)
+        for year_month in MONTHS[-length:]:
+            for trans_type, frequency, scale in (('credit', 'regular', 80000), ('credit', 'irregular', 20000),
+                                                 ('debit', 'regular', 40000), ('debit', 'irregular', 30000)):
+                yield (user_id, year_month, trans_type, frequency, '', round(rng.uniform(0, scale), 2), 5)
+
+
+def per_user(test_app, history, months_ahead=6):
+    year_month = pd.PeriodIndex(history.year_month, freq='M')
+    results = []
+    for income, expense, predict in ((history.income, history.expense, test_app.predict_future_values),
+                                     (history.regular_income, history.regular_expense,
+                                      test_app.predict_regular_future_values)):
+        monthly_df = test_app.monthly_frame(year_month, income, expense)
+        X, y = test_app.create_ml_features(monthly_df)
+        model, scaler = test_app.train_prediction_models(X, y)
+        results.append(predict(model, scaler, monthly_df, months_ahead))
+    return results
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sample = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['TRANSACTIONS_DB_PATH'] = os.path.join(tmp, 'transactions.db')
+        os.environ['MODEL_CACHE_SIZE'] = '0'
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        import test_app
+        from batch_forecast import forecast_histories, histories_from_store, iter_ndjson
+
+        store = test_app.transaction_store
+        with store.transaction() as connection:
+            connection.executemany('INSERT INTO monthly_aggregates VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   aggregate_rows(users))
+
+        start = time.perf_counter()
+        histories = list(histories_from_store(store))
+        read_s = time.perf_counter() - start
+        start = time.perf_counter()
+        dates, forecasts = forecast_histories(histories, 6)
+        lines = sum(1 for _ in iter_ndjson(forecasts, dates))
+        batch_s = time.perf_counter() - start
+        assert lines == users
+
+        start = time.perf_counter()
+        for _, history in histories[:sample]:
+            per_user(test_app, history)
+        single_s = (time.perf_counter() - start) / sample
+
+        client = test_app.app.test_client()
+        body = json.dumps({'user_ids': list(range(1, users + 1))})
+        start = time.perf_counter()
+        response = client.post('/api/predict-future/batch', data=body, content_type='application/json')
+        records = response.get_data(as_text=True).count('\n')
+        http_batch_s = time.perf_counter() - start
+        assert records == users
+
+        start = time.perf_counter()
+        for user_id in range(1, sample + 1):
+            client.post('/api/predict-future', json={'user_id': user_id})
+        http_single_s = (time.perf_counter() - start) / sample
+        store.close()
+
+    print(f"users={users:,} (3-120 months each), horizon 6 months")
+    print(f"engine  batch_forecast:      {users / batch_s:>9,.0f} users/s  "
+          f"({batch_s:.2f} s, + {read_s:.2f} s reading the rollup)")
+    print(f"engine  one user at a time:  {1 / single_s:>9,.0f} users/s  ({users / single_s / (users / batch_s):.0f}x slower)")
+    print(f"HTTP    /batch, one request: {users / http_batch_s:>9,.0f} users/s  ({http_batch_s:.2f} s)")
+    print(f"HTTP    one request per user:{1 / http_single_s:>9,.0f} users/s  "
+          f"({users * http_single_s / http_batch_s:.0f}x slower)")
+
+
+if __name__ == '__main__':
+    main()
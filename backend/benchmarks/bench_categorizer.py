@@ -0,0 +1,93 @@
+"""
+Per-description cost of categorisation as the rule table grows: the old
+chained any() substring scans vs the Aho-Corasick KeywordCategorizer.
+Also checks both give the same category for every description.
+
+Usage: python benchmarks/bench_categorizer.py [descriptions]
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from categorizer import STATEMENT_RULES, KeywordCategorizer, Rule  # noqa: E402
+from synthetic_statements import DESCRIPTIONS  # noqa: E402
+
+RULE_COUNTS = [20, 100, 500, 1000, 5000]
+CATEGORIES = ['Shopping', 'Food & Dining', 'Travel', 'Utilities', 'Health', 'Education',
+              'Entertainment', 'Groceries', 'Insurance', 'Rent']
+
+
+def merchant_rules(count, seed=3):
+    """The statement rules plus made-up merchant keywords, up to `count` rules"""
+    rng = random.Random(seed)
+    rules = list(STATEMENT_RULES)
+    while len(rules) < count:
+        keyword = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+        rules.append(Rule(keyword, rng.choice(CATEGORIES), rng.randint(6, 40)))
+    return rules[:count]
+
+
+def any_chain(rules, default='Others'):
+    """The old shape: one any() scan per category, in priority order"""
+    groups = {}
+    for keyword, category, priority in sorted(rules, key=lambda rule: rule.priority):
+        groups.setdefault((priority, category), []).append(keyword)
+    ordered = [(category, keywords) for (_, category), keywords in groups.items()]
+
+    def categorize(description):
+        desc_lower = description.lower()
+        for category, keywords in ordered:
+            if any(word in desc_lower for word in keywords):
+                return category
+        return default
+    return categorize
+
+
+def descriptions(count, rules, seed=5):
+    rng = random.Random(seed)
+    keywords = [rule.keyword.upper() for rule in rules]
+    result = []
+    for i in range(count):
+        text = f"{rng.choice(DESCRIPTIONS)} {i}"
+        if rng.random() < 0.5:
+            text = f"POS/{rng.choice(keywords)}/REF{rng.randint(1000, 9999)}"
+        result.append(text)
+    return result
+
+
+def us_per_description(categorize, texts):
+    start = time.perf_counter()
+    for text in texts:
+        categorize(text)
+    return (time.perf_counter() - start) / len(texts) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"descriptions={count}")
+    print(f"{'rules':>6} {'any() chain us':>15} {'automaton us':>13} {'build ms':>9}")
+
+    for rule_count in RULE_COUNTS:
+        rules = merchant_rules(rule_count)
+        texts = descriptions(count, rules)
+
+        start = time.perf_counter()
+        categorizer = KeywordCategorizer(rules)
+        build_ms = (time.perf_counter() - start) * 1000
+        chain = any_chain(rules)
+
+        mismatches = [text for text in texts if chain(text) != categorizer.categorize(text)]
+        if mismatches:
+            raise SystemExit(f"{rule_count} rules: categories differ for {mismatches[:5]}")
+
+        before = us_per_description(chain, texts)
+        after = us_per_description(categorizer.categorize, texts)
+        print(f"{rule_count:>6} {before:>15.2f} {after:>13.2f} {build_ms:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Cells per second for the date/amount classifiers, before (per-call pattern
+lists, as the parsers used to do it) and after (cell_classifiers), plus a
+parity check over the same cells.
+
+Usage: python benchmarks/bench_cell_classifiers.py [cells]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cell_classifiers  # noqa: E402
+
+
+# ---------- Previous implementations (diagnostic prints removed) ----------
+def legacy_is_date(text):
+    if not text:
+        return False
+    cleaned_text = text.replace('\n', '').strip()
+    cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
+    cleaned_text = re.sub(r'\s*/\s*', '/', cleaned_text)
+    cleaned_text = re.sub(r'\s*-\s*', '-', cleaned_text)
+    date_patterns = [
+        r'^\d{1,2}/\d{1,2}/\d{2,4}$',
+        r'^\d{1,2}-\d{1,2}-\d{2,4}$',
+        r'^\d{1,2}/\d{1,2}/\d{2,4}\s+\d{1,2}:\d{2}(:\d{2})?$',
+        r'^\d{1,2}-\d{1,2}-\d{2,4}\s+\d{1,2}:\d{2}(:\d{2})?$',
+        r'^\d{1,2}\w{3}\d{4}$',
+        r'^\d{1,2}\s+\w{3}\s+\d{4}$',
+        r'^\d{4}/\d{1,2}/\d{1,2}$',
+        r'^\d{4}-\d{1,2}-\d{1,2}$',
+        r'^\d{4}/\d{1,2}/\d{1,2}\s+\d{1,2}:\d{2}(:\d{2})?$',
+        r'^\d{4}-\d{1,2}-\d{1,2}\s+\d{1,2}:\d{2}(:\d{2})?$',
+    ]
+    return any(re.match(pattern, cleaned_text) for pattern in date_patterns)
+
+
+def legacy_is_statement_date(text):
+    if not text:
+        return False
+    date_patterns = [
+        r'^\d{1,2}[/-]\d{1,2}[/-]\d{2,4}$',
+        r'^\d{1,2}\s+\w{3}\s+\d{4}$',
+        r'^\d{4}[/-]\d{1,2}[/-]\d{1,2}$'
+    ]
+    return any(re.match(pattern, text.strip()) for pattern in date_patterns)
+
+
+def legacy_is_amount(text):
+    if not text:
+        return False
+    cleaned = re.sub(r'[₹,\s]', '', text.strip())
+    try:
+        float(cleaned)
+        return len(cleaned) > 0
+    except ValueError:
+        return False
+
+
+def legacy_clean_amount(text):
+    return re.sub(r'[₹,\s]', '', text.strip())
+
+
+def legacy_normalize_date(date_str):
+    try:
+        cleaned_date = date_str.replace('\n', ' ').strip()
+        cleaned_date = re.sub(r'\s+', ' ', cleaned_date)
+        cleaned_date = re.sub(r'\s*/\s*', '/', cleaned_date)
+        cleaned_date = re.sub(r'\s*-\s*', '-', cleaned_date)
+        date_match = re.match(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', cleaned_date)
+        date_part = date_match.group(1) if date_match else cleaned_date
+        if re.match(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', date_part):
+            parts = date_part.split('/') if '/' in date_part else date_part.split('-')
+            day, month, year = parts
+            if len(year) == 2:
+                year = '20' + year
+            return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+        elif re.match(r'\d{1,2}\s*\w{3}\s*\d{4}', date_part):
+            parts = re.split(r'\s+', date_part.replace('\n', ' ').strip())
+            if len(parts) >= 3:
+                day, month_str, year = parts[0], parts[1], parts[2]
+                month_map = {
+                    'jan': '01', 'feb': '02', 'mar': '03', 'apr': '04',
+                    'may': '05', 'jun': '06', 'jul': '07', 'aug': '08',
+                    'sep': '09', 'oct': '10', 'nov': '11', 'dec': '12'
+                }
+                month = month_map.get(month_str.lower()[:3], '01')
+                return f"{year}-{month}-{day.zfill(2)}"
+        return None
+    except Exception:
+        return None
+
+
+# ---------- Workload ----------
+def sample_cells(count, seed=11):
+    """A statement-like mix: mostly plain dates and amounts, some awkward cells"""
+    rng = random.Random(seed)
+    shapes = [
+        lambda: f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+        lambda: f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2023",
+        lambda: f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/24 10:{rng.randint(10, 59)}",
+        lambda: f"{rng.randint(1, 28)} Jan 2024",
+        lambda: f"{rng.randint(1, 28):02d}Mar2024",
+        lambda: f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 00:00:00",
+        lambda: f"{rng.randint(1, 28):02d} / {rng.randint(1, 12):02d} / 2024",
+        lambda: f"{rng.uniform(1, 99999):.2f}",
+        lambda: f"{rng.uniform(1, 99999):.2f}",
+        lambda: f"{rng.randint(1, 999)},{rng.randint(100, 999)}.00",
+        lambda: f"₹ {rng.randint(1, 9999)}",
+        lambda: str(rng.randint(1, 99999)),
+        lambda: rng.choice(['UPI/GPAY/Swiggy', 'ATM WDL', 'NEFT-SALARY', 'Balance B/F', '']),
+        lambda: rng.choice(['nan', '12345678', '1e3', '-250.5', '15/01-2024', '1.']),
+    ]
+    return [rng.choice(shapes)() for _ in range(count)]
+
+
+CHECKS = [
+    ('is_date', legacy_is_date, cell_classifiers.is_date),
+    ('is_statement_date', legacy_is_statement_date, cell_classifiers.is_statement_date),
+    ('is_amount', legacy_is_amount, cell_classifiers.is_amount),
+    ('clean_amount', legacy_clean_amount, cell_classifiers.clean_amount),
+    ('normalize_date', legacy_normalize_date, cell_classifiers.normalize_date),
+]
+
+
+def cells_per_second(func, cells):
+    start = time.perf_counter()
+    for cell in cells:
+        func(cell)
+    return len(cells) / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    cells = sample_cells(count)
+
+    print(f"cells={count}")
+    print(f"{'check':<18} {'before cells/s':>15} {'after cells/s':>15} {'speedup':>8}")
+    for name, legacy, current in CHECKS:
+        mismatches = [cell for cell in cells[:20000] if legacy(cell) != current(cell)]
+        if mismatches:
+            raise SystemExit(f"{name}: results differ for {mismatches[:5]}")
+
+        before = cells_per_second(legacy, cells)
+        after = cells_per_second(current, cells)
+        print(f"{name:<18} {before:>15,.0f} {after:>15,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
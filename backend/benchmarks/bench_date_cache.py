@@ -0,0 +1,79 @@
+"""
+Rows per second through the table-row parser on a long statement, with the
+date normaliser's cache disabled vs enabled, plus the column API.
+
+Usage: python benchmarks/bench_date_cache.py [rows]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cell_classifiers  # noqa: E402
+from bank_parsers import IndianBankParser  # noqa: E402
+from synthetic_statements import statement_rows  # noqa: E402
+
+
+def rows_per_second(parse, rows, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for row in rows:
+            parse(row)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+def parse_dates(normalize):
+    return lambda row: normalize(row[0])
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # A year of statement (4 rows a day), repeated: the same few hundred dates recur
+    year = statement_rows(4 * 365)
+    rows = [year[i % len(year)] for i in range(count)]
+    parser = IndianBankParser()
+
+    cached = cell_classifiers.normalize_statement_date
+    uncached = cached.__wrapped__
+
+    cell_classifiers.normalize_statement_date = uncached
+    try:
+        uncached_rate = rows_per_second(parser._parse_row, rows)
+    finally:
+        cell_classifiers.normalize_statement_date = cached
+
+    cell_classifiers.clear_date_caches()
+    cached_rate = rows_per_second(parser._parse_row, rows)
+    stats = cell_classifiers.date_cache_stats()['normalize_statement_date']
+
+    uncached_date_rate = rows_per_second(parse_dates(uncached), rows)
+    cached_date_rate = rows_per_second(parse_dates(cached), rows)
+
+    dates = [row[0] for row in rows]
+    start = time.perf_counter()
+    per_cell = [uncached(value) for value in dates]
+    per_cell_s = time.perf_counter() - start
+
+    cell_classifiers.clear_date_caches()
+    start = time.perf_counter()
+    column = cell_classifiers.normalize_date_column(dates, cached)
+    column_s = time.perf_counter() - start
+    assert column == per_cell
+
+    print(f"rows={count} distinct dates={len(set(dates))}")
+    print(f"date cell, no cache:    {uncached_date_rate:>10,.0f} rows/s")
+    print(f"date cell, LRU cache:   {cached_date_rate:>10,.0f} rows/s "
+          f"({cached_date_rate / uncached_date_rate:.1f}x)")
+    print(f"row parser, no cache:   {uncached_rate:>10,.0f} rows/s")
+    print(f"row parser, LRU cache:  {cached_rate:>10,.0f} rows/s "
+          f"({cached_rate / uncached_rate:.2f}x, hit rate {stats['hit_rate']:.1%})")
+    print(f"date column per cell:   {count / per_cell_s:>10,.0f} values/s")
+    print(f"normalize_date_column:  {count / column_s:>10,.0f} values/s "
+          f"({per_cell_s / column_s:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
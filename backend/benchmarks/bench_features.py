@@ -0,0 +1,94 @@
+"""
+Building the forecast's feature matrix and targets from monthly frames of
+3 months to 10 years: forecasting.feature_matrix / target_arrays against
+the row-by-row iloc loop create_ml_features used before. Every frame is
+checked to give an identical matrix and targets (float and integer amounts,
+gaps, a NaT month) before anything is timed.
+
+Usage: python benchmarks/bench_features.py [months] [repeats]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from forecasting import feature_matrix, monthly_frame, target_arrays  # noqa: E402
+
+
+def monthly(months, seed, integer=False, nat=False):
+    rng = random.Random(seed)
+    year_month = pd.period_range('2015-01', periods=months, freq='M')
+    if nat:
+        year_month = pd.PeriodIndex(list(year_month[:-1]) + [pd.NaT], freq='M')
+    income = [rng.choice((0, rng.uniform(0, 2e6))) for _ in range(months)]
+    expense = [rng.uniform(0, 2e6) for _ in range(months)]
+    if integer:
+        income, expense = [int(v) for v in income], [int(v) for v in expense]
+    return monthly_frame(year_month, income, expense)
+
+
+def iloc_loop(monthly_df):
+    """The previous implementation, kept here for comparison"""
+    features = []
+    targets = {'income': [], 'expense': [], 'savings': []}
+    monthly_df = monthly_df.reset_index(drop=True)
+    for i in range(len(monthly_df)):
+        if i >= 2:
+            recent_income_trend = monthly_df.iloc[max(0, i-2):i]['income'].mean()
+            recent_expense_trend = monthly_df.iloc[max(0, i-2):i]['expense'].mean()
+        else:
+            recent_income_trend = monthly_df.iloc[:i+1]['income'].mean()
+            recent_expense_trend = monthly_df.iloc[:i+1]['expense'].mean()
+        features.append([i + 1, monthly_df.iloc[i]['month_numeric'],
+                         recent_income_trend, recent_expense_trend])
+        for target in targets:
+            targets[target].append(monthly_df.iloc[i][target])
+    return np.array(features), {target: np.array(values) for target, values in targets.items()}
+
+
+def vectorized(monthly_df):
+    return feature_matrix(monthly_df), target_arrays(monthly_df)
+
+
+def same(left, right):
+    (X, y), (X2, y2) = left, right
+    return (X.dtype == X2.dtype and np.array_equal(X, X2, equal_nan=True)
+            and all(y[t].dtype == y2[t].dtype and np.array_equal(y[t], y2[t]) for t in y))
+
+
+def best_of(repeats, fn, frame):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(frame)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    months = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    checked = 0
+    for seed, size in enumerate(range(3, months + 1)):
+        for kind in ({}, {'integer': True}, {'nat': True}):
+            frame = monthly(size, seed, **kind)
+            assert same(iloc_loop(frame), vectorized(frame)), (size, kind)
+            checked += 1
+    print(f"parity: {checked} frames of 3..{months} months identical")
+
+    for size in (12, 36, months):
+        frame = monthly(size, size)
+        loop_s = best_of(repeats, iloc_loop, frame)
+        vector_s = best_of(repeats, vectorized, frame)
+        print(f"{size:4d} months  iloc loop {loop_s * 1000:7.2f} ms  "
+              f"feature_matrix {vector_s * 1000:6.3f} ms  ({loop_s / vector_s:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Forecast horizon latency: predict_future_values (test_app) scoring 6 and
+120 months with one batched predict_horizon call, against the per-month loop
+it replaced (a 1x4 feature row, the tail(3) trends, one transform and one
+predict per month). Both are checked to give the same raw predictions, up
+to the last bits a matrix product can round differently from row products.
+
+Usage: python benchmarks/bench_horizon.py [history months] [repeats]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from bench_features import monthly  # noqa: E402
+from forecasting import horizon_dates, predict_horizon  # noqa: E402
+
+
+def per_month_loop(model, scaler, monthly_df, months_ahead):
+    """The previous prediction loop, raw predictions only"""
+    rows = []
+    current_date = datetime.now()
+    for i in range(1, months_ahead + 1):
+        future_date = current_date + timedelta(days=30 * i)
+        recent_income_trend = monthly_df['income'].tail(3).mean()
+        recent_expense_trend = monthly_df['expense'].tail(3).mean()
+        future_features = np.array([[len(monthly_df) + i, future_date.month,
+                                     recent_income_trend, recent_expense_trend]])
+        rows.append(model.predict(scaler.transform(future_features))[0])
+    return np.array(rows)
+
+
+def batched(model, scaler, monthly_df, months_ahead):
+    return predict_horizon(model, scaler, monthly_df, horizon_dates(datetime.now(), months_ahead))
+
+
+def best_of(repeats, fn, *args):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    history_months = int(sys.argv[1]) if len(sys.argv) > 1 else 36
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    import test_app
+
+    monthly_df = monthly(history_months, 1)
+    X, y = test_app.create_ml_features(monthly_df)
+    model, scaler = test_app.train_prediction_models(X, y)
+
+    print(f"history={history_months} months")
+    for months_ahead in (6, 120):
+        expected = per_month_loop(model, scaler, monthly_df, months_ahead)
+        assert np.allclose(expected, batched(model, scaler, monthly_df, months_ahead), rtol=1e-12, atol=0)
+        loop_s = best_of(repeats, per_month_loop, model, scaler, monthly_df, months_ahead)
+        batch_s = best_of(repeats, batched, model, scaler, monthly_df, months_ahead)
+        route_s = best_of(repeats, test_app.predict_future_values, model, scaler, monthly_df, months_ahead)
+        regular_s = best_of(repeats, test_app.predict_regular_future_values, model, scaler, monthly_df, months_ahead)
+        print(f"{months_ahead:4d} months ahead  per-month loop {loop_s * 1000:6.2f} ms  "
+              f"predict_horizon {batch_s * 1000:5.2f} ms  ({loop_s / batch_s:.0f}x)   "
+              f"predict_future_values {route_s * 1000:5.2f} ms  "
+              f"predict_regular_future_values {regular_s * 1000:5.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Dashboard reloads against test_app: the full transaction list
+(GET /api/transactions/<user_id>) and a stored user's forecast
+(GET /api/predict-future?user_id=) fetched fresh vs revalidated with
+If-None-Match (304), in server time and bytes on the wire, plus what gzip
+costs and saves on the fresh responses.
+
+Usage: python benchmarks/bench_http_caching.py [per day] [years] [repeats]
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_monthly_aggregates import best_of, history  # noqa: E402
+
+USER_ID = 1
+
+
+def main():
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['TRANSACTIONS_DB_PATH'] = os.path.join(tmp, 'transactions.db')
+        os.environ['MODEL_CACHE_SIZE'] = '0'
+        import test_app
+
+        test_app.transaction_store.insert_many(history(per_day, years), user_id=USER_ID)
+        client = test_app.app.test_client()
+
+        def get(url, headers):
+            response = client.get(url, headers=headers)
+            assert response.status_code in (200, 304), response.status_code
+            return response
+
+        print(f"transactions={test_app.transaction_store.count(USER_ID):,}")
+        for label, url in (('transaction list', f'/api/transactions/{USER_ID}'),
+                           ('forecast', f'/api/predict-future?user_id={USER_ID}&months_ahead=6')):
+            plain_s, plain = best_of(repeats, get, url, {})
+            gzip_s, gzipped = best_of(repeats, get, url, {'Accept-Encoding': 'gzip'})
+            revalidate_s, revalidated = best_of(repeats, get, url, {'Accept-Encoding': 'gzip',
+                                                                     'If-None-Match': gzipped.headers['ETag']})
+            assert revalidated.status_code == 304
+            print(f"{label:<17} fresh {plain_s * 1000:7.1f} ms {len(plain.data):>10,} B   "
+                  f"gzip {gzip_s * 1000:7.1f} ms {len(gzipped.data):>9,} B   "
+                  f"304 {revalidate_s * 1000:6.2f} ms {len(revalidated.data):>3} B "
+                  f"({plain_s / revalidate_s:.0f}x)")
+        test_app.transaction_store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Re-importing overlapping statements: a user already holds 11 months, then
+imports the 12-month statement that contains them. Timed against importing
+the new month on its own (the work that is actually new) and against the
+same 12-month import with the month digests cleared, which makes every row
+go through the natural-key lookup.
+
+Usage: python benchmarks/bench_import.py [transactions per day] [repeats]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import TransactionStore  # noqa: E402
+from synthetic_statements import DESCRIPTIONS  # noqa: E402
+
+USER_ID = 1
+
+
+def statement(months, per_day, seed=11):
+    """The same transactions for a given day whichever statement they appear in"""
+    transactions = []
+    day = date(2024, 1, 1)
+    while day.month <= months and day.year == 2024:
+        rng = random.Random(f"{seed}-{day}")
+        for _ in range(per_day):
+            transactions.append({
+                'date': day.isoformat(),
+                'description': rng.choice(DESCRIPTIONS),
+                'amount': round(rng.uniform(10, 50000), 2),
+                'type': rng.choice(('credit', 'debit')),
+                'frequency': rng.choice(('regular', 'irregular')),
+                'category': rng.choice(('Salary', 'Digital Payment', 'Others')),
+            })
+        day += timedelta(days=1)
+    return transactions
+
+
+def copy_database(source, path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    with sqlite3.connect(source) as src, sqlite3.connect(path) as dst:
+        src.backup(dst)
+
+
+def timed(source, tmp, transactions, repeats, before=None):
+    """Best-of import time, each run on a fresh copy of the source database"""
+    best, result = float('inf'), None
+    path = os.path.join(tmp, 'run.db')
+    for _ in range(repeats):
+        copy_database(source, path)
+        store = TransactionStore(path)
+        if before:
+            before(store.connection())
+        start = time.perf_counter()
+        result = store.import_transactions(USER_ID, transactions)
+        best = min(best, time.perf_counter() - start)
+        store.close()
+    return best, result
+
+
+def main():
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    eleven = statement(11, per_day)
+    twelve = statement(12, per_day)
+    december = twelve[len(eleven):]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'eleven_months.db')
+        store = TransactionStore(source)
+        store.import_transactions(USER_ID, eleven)
+        store.close()
+
+        new_s, new = timed(source, tmp, december, repeats)
+        overlap_s, overlap = timed(source, tmp, twelve, repeats)
+        no_digest_s, no_digest = timed(source, tmp, twelve, repeats,
+                                       before=lambda c: c.execute('DELETE FROM import_digests'))
+        again_s, again = timed(source, tmp, eleven, repeats)
+
+        for result in (new, overlap, no_digest):
+            assert result['inserted'] == len(december) and result['conflicting'] == 0
+        assert again['inserted'] == 0 and again['skipped'] == len(eleven)
+
+    print(f"stored={len(eleven):,} rows (11 months)  statement={len(twelve):,} rows (12 months)")
+    print(f"new month only:                 {new_s * 1000:8.1f} ms  ({len(december):,} rows)")
+    print(f"12 months over 11 (digests):    {overlap_s * 1000:8.1f} ms  "
+          f"inserted {overlap['inserted']}, skipped {overlap['skipped']}, "
+          f"{overlap['months_unchanged']} months untouched")
+    print(f"12 months over 11 (row lookup): {no_digest_s * 1000:8.1f} ms")
+    print(f"same 11 months again:           {again_s * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Cost of the parser diagnostics: the per-row parse_transaction_row() path over
+a synthetic export with DEBUG written out (what the old print() calls did),
+DEBUG sampled 1 in 100, and at the default INFO level, against a logger whose
+methods do nothing at all. Output goes to /dev/null.
+
+Usage: python benchmarks/bench_logging.py [rows]
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_logging  # noqa: E402
+import test_app  # noqa: E402
+from synthetic_statements import statement_rows  # noqa: E402
+
+
+class NullLogger:
+    """Floor: every logging call is an empty method"""
+
+    def isEnabledFor(self, level):
+        return False
+
+    def debug(self, *args, **kwargs):
+        pass
+
+    info = warning = error = exception = debug
+
+
+def parse_rows(rows):
+    return [test_app.parse_transaction_row(row) for row in rows]
+
+
+def best_of(func, *args, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rows = statement_rows(count)
+
+    root = logging.getLogger(app_logging.ROOT_LOGGER)
+    handler = root.handlers[0]
+    logger = test_app.log
+
+    with open(os.devnull, 'w') as devnull:
+        handler.setStream(devnull)
+        timings = {}
+
+        root.setLevel(logging.DEBUG)
+        timings['DEBUG (every record)'], expected = best_of(parse_rows, rows, repeats=1)
+
+        app_logging.debug_sampler.every = 100
+        timings['DEBUG sampled 1/100'], _ = best_of(parse_rows, rows, repeats=1)
+        app_logging.debug_sampler.every = 1
+
+        root.setLevel(logging.INFO)
+        timings['INFO (debug disabled)'], result = best_of(parse_rows, rows)
+        assert result == expected
+
+        test_app.log = NullLogger()
+        timings['no-op logger'], _ = best_of(parse_rows, rows)
+        test_app.log = logger
+
+    floor = timings['no-op logger']
+    print(f"rows={count} transactions={sum(1 for t in expected if t)}")
+    for name, seconds in timings.items():
+        print(f"{name:<24} {seconds * 1000:9.1f} ms  ({count / seconds:>9,.0f} rows/s, "
+              f"{(seconds / floor - 1) * 100:+6.1f}% vs no-op)")
+
+
+if __name__ == '__main__':
+    main()
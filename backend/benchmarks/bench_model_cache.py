@@ -0,0 +1,62 @@
+"""
+Repeat forecasts: POST /api/predict-future (test_app) with the same history,
+first call (cache miss: features, two trainings, predictions) vs repeat
+calls (served from the model cache), both for a posted transaction list and
+for a stored user read from the monthly rollup. Request bodies are encoded
+once up front; a posted list still pays for JSON decoding and the monthly
+grouping on every call, a stored user only for reading the rollup.
+
+Usage: python benchmarks/bench_model_cache.py [per day] [years] [repeats]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_monthly_aggregates import history  # noqa: E402
+
+USER_ID = 1
+
+
+def predict(client, body):
+    start = time.perf_counter()
+    response = client.post('/api/predict-future', data=body, content_type='application/json')
+    return time.perf_counter() - start, response.get_json()
+
+
+def main():
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['TRANSACTIONS_DB_PATH'] = os.path.join(tmp, 'transactions.db')
+        os.environ['MODEL_CACHE_PATH'] = os.path.join(tmp, 'model_cache.db')
+        import test_app
+
+        transactions = list(history(per_day, years))
+        test_app.transaction_store.insert_many(transactions, user_id=USER_ID)
+        client = test_app.app.test_client()
+
+        print(f"transactions={len(transactions):,}")
+        for label, request in (('posted transactions', {'transactions': transactions}),
+                               ('stored user_id', {'user_id': USER_ID})):
+            body = json.dumps(request)
+            miss_s, first = predict(client, body)
+            assert first['cache'] == 'miss'
+            hits = []
+            for _ in range(repeats):
+                hit_s, again = predict(client, body)
+                assert again['cache'] == 'hit' and again['predictions'] == first['predictions']
+                hits.append(hit_s)
+            hits.sort()
+            print(f"{label:<20} miss {miss_s * 1000:7.1f} ms   hit {hits[len(hits) // 2] * 1000:6.1f} ms median "
+                  f"({miss_s / hits[len(hits) // 2]:.0f}x)")
+        test_app.transaction_store.close()
+
+
+if __name__ == '__main__':
+    main()
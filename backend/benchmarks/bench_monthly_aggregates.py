@@ -0,0 +1,81 @@
+"""
+Building the monthly frames /api/predict-future trains on (test_app): from a
+posted list of a user's transactions (prepare_transaction_data_for_ml) vs
+from the stored monthly_aggregates rollup (prepare_monthly_data_from_store).
+The rollup is kept up to date by the inserts themselves; a full rebuild is
+timed as well for reference.
+
+Usage: python benchmarks/bench_monthly_aggregates.py [per day] [years] [repeats]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_statements import DESCRIPTIONS  # noqa: E402
+
+USER_ID = 1
+
+
+def history(per_day, years, seed=7):
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    for day in range(years * 365):
+        day_str = (start + timedelta(days=day)).isoformat()
+        for _ in range(per_day):
+            yield {
+                'date': day_str,
+                'description': rng.choice(DESCRIPTIONS),
+                'amount': round(rng.uniform(10, 50000), 2),
+                'type': rng.choice(('credit', 'debit')),
+                'frequency': rng.choice(('regular', 'irregular')),
+                'category': rng.choice(('Salary', 'Digital Payment', 'Others')),
+            }
+
+
+def best_of(repeats, fn, *args):
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['TRANSACTIONS_DB_PATH'] = os.path.join(tmp, 'transactions.db')
+        import test_app
+
+        store = test_app.transaction_store
+        transactions = list(history(per_day, years))
+        store.insert_many(transactions, user_id=USER_ID)
+        rollup_rows = store.connection().execute(
+            'SELECT COUNT(*) FROM monthly_aggregates WHERE user_id = ?', (USER_ID,)).fetchone()[0]
+
+        list_s, (monthly, regular) = best_of(repeats, test_app.prepare_transaction_data_for_ml, transactions)
+        store_s, (stored_monthly, stored_regular) = best_of(
+            repeats, test_app.prepare_monthly_data_from_store, USER_ID)
+        rebuild_s, _ = best_of(repeats, store.rebuild_aggregates, USER_ID)
+
+        for left, right in ((monthly, stored_monthly), (regular, stored_regular)):
+            assert list(left['year_month']) == list(right['year_month'])
+            assert ((left['savings'] - right['savings']).abs() < 0.01).all()
+        store.close()
+
+    print(f"transactions={len(transactions):,} months={len(monthly)} rollup rows={rollup_rows}")
+    print(f"from posted transactions: {list_s * 1000:8.1f} ms")
+    print(f"from monthly_aggregates:  {store_s * 1000:8.1f} ms  ({list_s / store_s:.0f}x)")
+    print(f"rebuild_aggregates:       {rebuild_s * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
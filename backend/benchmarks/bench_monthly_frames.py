@@ -0,0 +1,99 @@
+"""
+Building the monthly frames for the savings forecast from 10 years of
+synthetic transactions: forecasting.monthly_frames (one factorize and sort)
+against the per-month mask-and-sum loop prepare_transaction_data_for_ml
+used before, which scans the rows four times for every month. The two are
+checked to produce identical frames.
+
+Usage: python benchmarks/bench_monthly_frames.py [per day] [years] [repeats]
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from forecasting import monthly_frames  # noqa: E402
+from synthetic_statements import DESCRIPTIONS  # noqa: E402
+
+
+def transactions_frame(per_day, years, seed=17):
+    """Transactions as prepare_transaction_data_for_ml has them before grouping"""
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    rows = []
+    for day in range(years * 365):
+        day_str = (start + timedelta(days=day)).isoformat()
+        for _ in range(per_day):
+            rows.append({
+                'date': day_str,
+                'description': rng.choice(DESCRIPTIONS),
+                'amount': round(rng.uniform(10, 50000), 2),
+                'type': rng.choice(('credit', 'debit')),
+                'frequency': rng.choice(('regular', 'irregular')),
+            })
+    df = pd.DataFrame(rows)
+    df['date'] = pd.to_datetime(df['date'])
+    df['year_month'] = df['date'].dt.to_period('M')
+    return df
+
+
+def per_month_loop(df):
+    """The previous implementation, kept here for comparison"""
+    income_df = df[df['type'] == 'credit'].copy()
+    expense_df = df[df['type'] == 'debit'].copy()
+    regular_income_df = income_df[income_df['frequency'] == 'regular'].copy()
+    regular_expense_df = expense_df[expense_df['frequency'] == 'regular'].copy()
+
+    monthly_data = []
+    regular_monthly_data = []
+    for month in df['year_month'].unique():
+        month_income = income_df[income_df['year_month'] == month]['amount'].sum()
+        month_expense = expense_df[expense_df['year_month'] == month]['amount'].sum()
+        regular_month_income = regular_income_df[regular_income_df['year_month'] == month]['amount'].sum()
+        regular_month_expense = regular_expense_df[regular_expense_df['year_month'] == month]['amount'].sum()
+        for data, income, expense in ((monthly_data, month_income, month_expense),
+                                      (regular_monthly_data, regular_month_income, regular_month_expense)):
+            data.append({
+                'year_month': month,
+                'income': income,
+                'expense': expense,
+                'savings': income - expense,
+                'month_numeric': month.month,
+                'year': month.year
+            })
+    return (pd.DataFrame(monthly_data).sort_values('year_month'),
+            pd.DataFrame(regular_monthly_data).sort_values('year_month'))
+
+
+def best_of(repeats, fn, df):
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    df = transactions_frame(per_day, years)
+    loop_s, expected = best_of(repeats, per_month_loop, df)
+    frames_s, frames = best_of(repeats, monthly_frames, df)
+    for old, new in zip(expected, frames):
+        pd.testing.assert_frame_equal(old, new, check_exact=True)
+
+    print(f"transactions={len(df):,} months={len(frames[0])}")
+    print(f"per-month loop:  {loop_s * 1000:8.1f} ms")
+    print(f"monthly_frames:  {frames_s * 1000:8.1f} ms  ({loop_s / frames_s:.0f}x, identical frames)")
+
+
+if __name__ == '__main__':
+    main()
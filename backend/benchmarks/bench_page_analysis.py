@@ -0,0 +1,58 @@
+"""
+Per-page CPU of pdfplumber's extract_text()+extract_tables() vs PageAnalysis.
+
+The page layout (page.chars) is parsed up front so only the text/table work
+is timed. Usage: python benchmarks/bench_page_analysis.py [pages]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdfplumber  # noqa: E402
+
+from pdf_extraction import PageAnalysis  # noqa: E402
+from synthetic_statements import write_statement_pdf  # noqa: E402
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_statement_pdf(os.path.join(tmp, 'statement.pdf'), page_count)
+
+        with pdfplumber.open(path) as pdf:
+            pages = pdf.pages
+            for page in pages:
+                page.chars, page.edges
+
+            start = time.process_time()
+            expected = [(page.extract_text(), page.extract_tables()) for page in pages]
+            plumber = time.process_time() - start
+
+            start = time.process_time()
+            actual = []
+            for page in pages:
+                analysis = PageAnalysis(page)
+                actual.append((analysis.text, analysis.tables))
+            shared = time.process_time() - start
+
+            start = time.process_time()
+            for page in pages:
+                PageAnalysis(page).tables
+            tables_only = time.process_time() - start
+
+    if expected != actual:
+        raise SystemExit("PageAnalysis output differs from pdfplumber")
+
+    per_page = 1000.0 / page_count
+    print(f"pages={page_count}")
+    print(f"extract_text + extract_tables : {plumber * per_page:7.1f} ms/page")
+    print(f"PageAnalysis text + tables    : {shared * per_page:7.1f} ms/page")
+    print(f"PageAnalysis tables only      : {tables_only * per_page:7.1f} ms/page")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Page latency of GET /api/transactions/<user_id> (test_app) for a heavy user:
+5 years of daily transactions in a database shared with other users. Every
+page of the history is fetched through the Flask test client, unfiltered and
+with each filter, and the per-page p50/p99 is reported. The bare query cost
+of the keyset walk is then compared with the same walk done by LIMIT/OFFSET.
+
+Usage: python benchmarks/bench_pagination.py [per day] [other users] [page size]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_statements import DESCRIPTIONS  # noqa: E402
+
+USER_ID = 1
+DAYS = 5 * 365
+CATEGORIES = ('Salary', 'Digital Payment', 'Cash Withdrawal', 'Interest', 'Others')
+
+
+def history(user_id, per_day, rng):
+    start = date(2020, 1, 1)
+    for day in range(DAYS):
+        day_str = (start + timedelta(days=day)).isoformat()
+        for _ in range(per_day):
+            yield (None, user_id, day_str, rng.choice(DESCRIPTIONS), round(rng.uniform(10, 50000), 2),
+                   rng.choice(('credit', 'debit')), rng.choice(('regular', 'irregular')),
+                   rng.choice(CATEGORIES), '2025-01-01T00:00:00', None)
+
+
+def walk(client, query, page_size):
+    """Fetch every page; returns per-page latencies and the rows seen"""
+    latencies, seen = [], 0
+    cursor = ''
+    while True:
+        start = time.perf_counter()
+        response = client.get(f"/api/transactions/{USER_ID}?limit={page_size}&cursor={cursor}&{query}")
+        latencies.append(time.perf_counter() - start)
+        seen += len(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return latencies, seen
+
+
+def keyset_walk(store, page_size):
+    latencies, after = [], None
+    while True:
+        start = time.perf_counter()
+        _, after = store.page(USER_ID, after=after, limit=page_size)
+        latencies.append(time.perf_counter() - start)
+        if after is None:
+            return latencies
+
+
+def offset_walk(store, page_size):
+    latencies = []
+    connection = store.connection()
+    for offset in range(0, store.count(USER_ID), page_size):
+        start = time.perf_counter()
+        connection.execute('SELECT * FROM transactions WHERE user_id = ? ORDER BY date, id '
+                           'LIMIT ? OFFSET ?', (USER_ID, page_size, offset)).fetchall()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000
+
+
+def main():
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    other_users = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    page_size = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['TRANSACTIONS_DB_PATH'] = os.path.join(tmp, 'transactions.db')
+        import test_app
+
+        store = test_app.transaction_store
+        rng = random.Random(5)
+        for user_id in range(USER_ID, USER_ID + other_users + 1):
+            store.insert_rows(history(user_id, per_day, rng))
+        total = store.count()
+
+        client = test_app.app.test_client()
+        print(f"rows={total:,} user rows={store.count(USER_ID):,} page={page_size}")
+        for label, query in (('all', ''), ('type=debit', 'type=debit'),
+                             ('category=Salary', 'category=Salary'),
+                             ('frequency=regular', 'frequency=regular'),
+                             ('2023, newest first', 'date_from=2023-01-01&date_to=2023-12-31&order=desc')):
+            latencies, seen = walk(client, query, page_size)
+            print(f"{label:<20} {len(latencies):5d} pages {seen:7,d} rows  "
+                  f"p50 {percentile(latencies, 50):6.2f} ms  p99 {percentile(latencies, 99):6.2f} ms")
+
+        for label, run in (('store.page (keyset)', keyset_walk), ('LIMIT/OFFSET', offset_walk)):
+            latencies = run(store, page_size)
+            print(f"{label:<20} {len(latencies):5d} pages                "
+                  f"p50 {percentile(latencies, 50):6.2f} ms  p99 {percentile(latencies, 99):6.2f} ms  "
+                  f"last page {latencies[-1] * 1000:.2f} ms")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
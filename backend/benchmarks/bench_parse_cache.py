@@ -0,0 +1,59 @@
+"""
+Re-uploading the same statement: POST /api/upload (test_app) on a synthetic
+PDF, first upload (cache miss, full extraction) vs repeat uploads (served
+from the parse cache). The cache lives in a temporary directory.
+
+Usage: python benchmarks/bench_parse_cache.py [pages] [repeats]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_statements import write_statement_pdf  # noqa: E402
+
+
+def upload(client, data, name):
+    start = time.perf_counter()
+    response = client.post('/api/upload', data={'file': (io.BytesIO(data), name)},
+                           content_type='multipart/form-data')
+    return time.perf_counter() - start, response.get_json()
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 25
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['PARSE_CACHE_PATH'] = os.path.join(tmp, 'parse_cache.db')
+        import test_app
+
+        path = write_statement_pdf(os.path.join(tmp, 'statement.pdf'), pages)
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        client = test_app.app.test_client()
+        miss_s, first = upload(client, data, 'statement.pdf')
+        assert first['cache'] == 'miss'
+
+        hits = []
+        for _ in range(repeats):
+            hit_s, again = upload(client, data, 'statement.pdf')
+            assert again['cache'] == 'hit' and again['transactions'] == first['transactions']
+            hits.append(hit_s)
+
+        stats = test_app.parse_cache.stats()
+
+    hits.sort()
+    print(f"pages={pages} transactions={first['count']} file={len(data) / 1024:.0f} KiB "
+          f"cached={stats['bytes'] / 1024:.0f} KiB")
+    print(f"first upload (miss): {miss_s * 1000:8.1f} ms")
+    print(f"re-upload (hit):     {hits[len(hits) // 2] * 1000:8.1f} ms median, "
+          f"{hits[-1] * 1000:.1f} ms max  ({miss_s / hits[len(hits) // 2]:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
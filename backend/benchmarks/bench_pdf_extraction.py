@@ -0,0 +1,54 @@
+"""
+Compare serial and process-pool page extraction on synthetic statements.
+
+Usage: python benchmarks/bench_pdf_extraction.py [pages ...] [--workers N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_extraction import extract_pages, default_worker_count  # noqa: E402
+from synthetic_statements import write_statement_pdf  # noqa: E402
+
+
+def time_extraction(path, workers, repeat):
+    best = float('inf')
+    pages = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = extract_pages(path, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('pages', nargs='*', type=int, default=[20, 80, 150])
+    parser.add_argument('--workers', type=int, default=default_worker_count())
+    parser.add_argument('--rows-per-page', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"workers={args.workers} rows_per_page={args.rows_per_page}")
+    print(f"{'pages':>6} {'serial s':>10} {'pool s':>10} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for page_count in args.pages:
+            path = write_statement_pdf(os.path.join(tmp, f"statement_{page_count}.pdf"),
+                                       page_count, args.rows_per_page)
+
+            serial, serial_pages = time_extraction(path, 1, args.repeat)
+            pooled, pooled_pages = time_extraction(path, args.workers, args.repeat)
+
+            if serial_pages != pooled_pages:
+                raise SystemExit(f"Pool output differs from serial output for {page_count} pages")
+
+            print(f"{page_count:>6} {serial:>10.2f} {pooled:>10.2f} {serial / pooled:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Training and predicting the forecast regression: forecasting.FeatureScaler +
+LinearModel (one least-squares solve for income and expense, savings as
+their difference) against sklearn's StandardScaler + a LinearRegression per
+target, as train_prediction_models did. Predictions are compared on a range
+of histories, then fit+predict time and the cold import cost of each are
+measured. Needs scikit-learn installed for the comparison only.
+
+Usage: python benchmarks/bench_regression.py [histories] [repeats]
+"""
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from sklearn.linear_model import LinearRegression  # noqa: E402
+from sklearn.preprocessing import StandardScaler  # noqa: E402
+
+from bench_features import monthly  # noqa: E402
+from forecasting import FeatureScaler, LinearModel, feature_matrix, target_arrays  # noqa: E402
+
+HORIZON = 6
+
+
+def future_features(X, months_ahead=HORIZON):
+    """Feature rows for the months after the history, as predict_future_values builds them"""
+    last = X[-3:, 2:].mean(axis=0)
+    return np.array([[len(X) + i, (i - 1) % 12 + 1, last[0], last[1]]
+                     for i in range(1, months_ahead + 1)])
+
+
+def with_sklearn(X, y, future):
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    models = {target: LinearRegression().fit(X_scaled, y[target]) for target in ('income', 'expense', 'savings')}
+    scaled = scaler.transform(future)
+    income = models['income'].predict(scaled)
+    expense = models['expense'].predict(scaled)
+    return np.column_stack([income, expense, income - expense])
+
+
+def with_numpy(X, y, future):
+    scaler = FeatureScaler()
+    model = LinearModel().fit(scaler.fit_transform(X), np.column_stack([y['income'], y['expense']]))
+    predicted = model.predict(scaler.transform(future))
+    return np.column_stack([predicted, predicted[:, 0] - predicted[:, 1]])
+
+
+def best_of(repeats, fn, *args):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def import_time(statement):
+    """Wall time of a fresh interpreter running the import, minus a bare interpreter"""
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True,
+                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return time.perf_counter() - start
+    return min(run(statement) for _ in range(3)) - min(run('pass') for _ in range(3))
+
+
+def main():
+    histories = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    worst = 0.0
+    for seed in range(histories):
+        frame = monthly(3 + seed % 118, seed, integer=bool(seed % 3 == 0))
+        X, y = feature_matrix(frame), target_arrays(frame)
+        future = future_features(X)
+        expected, got = with_sklearn(X, y, future), with_numpy(X, y, future)
+        scale = np.abs(expected).max()
+        worst = max(worst, np.abs(expected - got).max() / scale)
+        assert np.allclose(expected, got, rtol=1e-9, atol=1e-6 * scale), seed
+    print(f"parity: {histories} histories, largest difference {worst:.1e} of the largest prediction")
+
+    for months in (12, 60, 120):
+        frame = monthly(months, months)
+        X, y = feature_matrix(frame), target_arrays(frame)
+        future = future_features(X)
+        sklearn_s = best_of(repeats, with_sklearn, X, y, future)
+        numpy_s = best_of(repeats, with_numpy, X, y, future)
+        print(f"{months:4d} months  sklearn {sklearn_s * 1e6:8.0f} us   numpy {numpy_s * 1e6:6.0f} us  "
+              f"({sklearn_s / numpy_s:.0f}x)")
+
+    print(f"import sklearn.linear_model + preprocessing: {import_time('import sklearn.linear_model, sklearn.preprocessing') * 1000:6.0f} ms")
+    print(f"import forecasting:                          {import_time('import forecasting') * 1000:6.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Importing a large bank export: the row path (iterrows + parse_transaction_row
+per row, as extract_transactions_from_excel used to) vs the columnar
+table_layouts.parse_frame. The row path runs on a slice and is extrapolated;
+its diagnostic prints go to /dev/null.
+
+Usage: python benchmarks/bench_sheet_import.py [rows] [row-path rows]
+"""
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import table_layouts  # noqa: E402
+import test_app  # noqa: E402
+from synthetic_statements import HEADERS, statement_rows  # noqa: E402
+
+
+def row_path(df):
+    transactions = []
+    rows = [[str(cell) if pd.notna(cell) else '' for cell in row.values] for _, row in df.iterrows()]
+    for row_num, row in enumerate(rows):
+        if row_num == 0 and not test_app.is_date(row[0]):
+            continue
+        transaction = test_app.parse_transaction_row(row)
+        if transaction:
+            transactions.append(transaction)
+    return test_app.remove_duplicates(transactions)
+
+
+def columnar_path(df):
+    transactions, _ = table_layouts.parse_frame(df, test_app.table_categorizer)
+    return test_app.remove_duplicates(transactions)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    row_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'export.csv')
+        pd.DataFrame([HEADERS] + statement_rows(count)).to_csv(path, index=False, header=False)
+
+        start = time.perf_counter()
+        df = pd.read_csv(path, header=None, dtype=str, keep_default_na=False)
+        read_s = time.perf_counter() - start
+
+    sample = df.iloc[:row_count + 1]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        expected = row_path(sample)
+        row_s = time.perf_counter() - start
+
+        assert columnar_path(sample) == expected
+
+        start = time.perf_counter()
+        transactions = columnar_path(df)
+        columnar_s = time.perf_counter() - start
+
+    row_rate = row_count / row_s
+    print(f"rows={count} (csv read {read_s:.2f} s)")
+    print(f"row path:      {row_rate:>10,.0f} rows/s -> {count / row_rate:6.1f} s for {count:,} rows")
+    print(f"columnar path: {count / columnar_s:>10,.0f} rows/s -> {columnar_s:6.1f} s "
+          f"({len(transactions):,} transactions, {row_rate and (count / columnar_s) / row_rate:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
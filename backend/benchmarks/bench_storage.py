@@ -0,0 +1,111 @@
+"""
+Sustained insert rate into the transactions table: 1M rows through
+TransactionStore.insert_many (what the save routes use) in batches, against
+the old DataFrame.to_sql append (into the unindexed table it creates) and
+one autocommitted INSERT per row, both on a sample. Every run uses a fresh
+database in a temporary directory.
+
+Usage: python benchmarks/bench_storage.py [rows] [batch size] [sample rows]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+from storage import TransactionStore  # noqa: E402
+from synthetic_statements import DESCRIPTIONS  # noqa: E402
+
+
+def user_batches(count, batch_size, users=200, seed=3):
+    """
+    Batches of posted transactions as the save routes see them: each batch is
+    one user's statement import, in date order, users taking turns over ~5 years.
+    """
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    batches = []
+    for batch_num, first in enumerate(range(0, count, batch_size)):
+        size = min(batch_size, count - first)
+        days = sorted(rng.randrange(1826) for _ in range(size))
+        batches.append([{
+            'user_id': batch_num % users,
+            'date': (start + timedelta(days=day)).isoformat(),
+            'description': rng.choice(DESCRIPTIONS),
+            'amount': round(rng.uniform(10, 50000), 2),
+            'type': rng.choice(('credit', 'debit')),
+            'frequency': rng.choice(('regular', 'irregular')),
+            'category': rng.choice(('Salary', 'Digital Payment', 'Others')),
+        } for day in days])
+    return batches
+
+
+def store_insert(path, batches):
+    store = TransactionStore(path)
+    start = time.perf_counter()
+    for batch in batches:
+        store.insert_many(batch)
+    elapsed = time.perf_counter() - start
+    assert store.count() == sum(map(len, batches))
+    store.close()
+    return elapsed
+
+
+def to_sql_insert(path, batches):
+    engine = create_engine(f"sqlite:///{path}")
+    start = time.perf_counter()
+    for batch in batches:
+        pd.DataFrame(batch).to_sql("transactions", con=engine, if_exists="append", index=False)
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+
+def row_at_a_time(path, batches):
+    TransactionStore(path).connection()  # create the schema
+    connection = sqlite3.connect(path, isolation_level=None)
+    start = time.perf_counter()
+    for trans in (trans for batch in batches for trans in batch):
+        connection.execute(
+            'INSERT INTO transactions (user_id, date, description, amount, type, frequency, '
+            'category, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (trans['user_id'], trans['date'], trans['description'], trans['amount'],
+             trans['type'], trans['frequency'], trans['category'], 'now'))
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    sample = int(sys.argv[3]) if len(sys.argv) > 3 else 20000
+
+    batches = user_batches(count, batch_size)
+    sample_batches = user_batches(sample, batch_size)
+    per_row_batches = user_batches(sample // 10, batch_size)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_s = store_insert(os.path.join(tmp, 'store.db'), batches)
+        to_sql_s = to_sql_insert(os.path.join(tmp, 'to_sql.db'), sample_batches)
+        per_row_s = row_at_a_time(os.path.join(tmp, 'per_row.db'), per_row_batches)
+        size = os.path.getsize(os.path.join(tmp, 'store.db'))
+
+    store_rate = count / store_s
+    print(f"rows={count:,} batch={batch_size:,} db={size / 2**20:.0f} MiB")
+    print(f"insert_many (WAL, executemany): {store_rate:>10,.0f} rows/s  ({store_s:.1f} s)")
+    for name, rows, seconds in (("DataFrame.to_sql append:", sample, to_sql_s),
+                                ("INSERT + commit per row:", sample // 10, per_row_s)):
+        rate = rows / seconds
+        print(f"{name:<32}{rate:>10,.0f} rows/s  (sample of {rows:,}; {store_rate / rate:.0f}x slower)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Peak memory of the buffered parse (all_text/all_tables, then parse()) vs the
+streaming page -> transaction pipeline, on synthetic page dicts.
+
+Usage: python benchmarks/bench_streaming_memory.py [pages ...]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bank_parsers import IndianBankParser  # noqa: E402
+from synthetic_statements import HEADERS, statement_rows  # noqa: E402
+
+ROWS_PER_PAGE = 40
+
+
+def synthetic_pages(page_count):
+    """Yield page dicts shaped like pdf_extraction's output, one page at a time"""
+    for p in range(page_count):
+        rows = statement_rows(ROWS_PER_PAGE, seed=p)
+        # Make every row unique across the document so dedupe keeps them all
+        for i, row in enumerate(rows):
+            row[5] = f"{p:04d}-{i:02d} {row[5]}"
+        text = '\n'.join(' '.join(row) for row in rows)
+        yield {'page_number': p + 1, 'text': text, 'tables': [[HEADERS] + rows]}
+
+
+def buffered(page_count):
+    all_text = ''
+    all_tables = []
+    for page in synthetic_pages(page_count):
+        all_text += page['text'] + '\n'
+        all_tables.extend(page['tables'])
+    return len(IndianBankParser().parse(all_text, all_tables))
+
+
+def streamed(page_count):
+    count = 0
+    for _ in IndianBankParser().iter_parse(synthetic_pages(page_count)):
+        count += 1
+    return count
+
+
+def peak(func, page_count):
+    tracemalloc.start()
+    count = func(page_count)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, peak_bytes / (1024 * 1024)
+
+
+def main():
+    page_counts = [int(arg) for arg in sys.argv[1:]] or [50, 200, 500]
+    print(f"{'pages':>6} {'buffered MiB':>13} {'streamed MiB':>13}")
+
+    for page_count in page_counts:
+        count_a, buffered_mib = peak(buffered, page_count)
+        count_b, streamed_mib = peak(streamed, page_count)
+        if count_a != count_b:
+            raise SystemExit(f"Transaction counts differ: {count_a} vs {count_b}")
+        print(f"{page_count:>6} {buffered_mib:>13.1f} {streamed_mib:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Background upload jobs against test_app (parse cache off): how long a client
+waits for POST /api/upload/jobs (202) vs a synchronous POST /api/upload of
+the same statement, /api/health latency while large statements parse in the
+background, and the wall time for a batch of statements through the job
+queue at UPLOAD_JOB_WORKERS at a time.
+
+Usage: python benchmarks/bench_upload_jobs.py [pages] [statements] [workers]
+"""
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_monthly_aggregates import best_of  # noqa: E402
+from synthetic_statements import write_statement_pdf  # noqa: E402
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['TRANSACTIONS_DB_PATH'] = os.path.join(tmp, 'transactions.db')
+        os.environ['PARSE_CACHE_SIZE'] = '0'
+        os.environ['UPLOAD_JOB_WORKERS'] = str(workers)
+        import test_app
+
+        pdfs = [open(write_statement_pdf(os.path.join(tmp, f'statement{i}.pdf'), pages, seed=i), 'rb').read()
+                for i in range(statements)]
+        client = test_app.app.test_client()
+
+        def post(url, data):
+            response = client.post(url, data={'file': (io.BytesIO(data), 'statement.pdf')},
+                                   content_type='multipart/form-data')
+            assert response.status_code in (200, 202), response.data[:200]
+            return response.get_json()
+
+        def wait(job_id):
+            while True:
+                job = client.get(f'/api/upload/jobs/{job_id}').get_json()
+                if job['status'] in ('done', 'failed', 'cancelled'):
+                    assert job['status'] == 'done', job
+                    return job
+                time.sleep(0.01)
+
+        def health():
+            assert client.get('/api/health').status_code == 200
+
+        print(f"pages={pages} statements={statements} workers={workers}")
+        sync_s, result = best_of(1, post, '/api/upload', pdfs[0])
+        submit_s, job = best_of(1, post, '/api/upload/jobs', pdfs[0])
+        assert wait(job['job_id'])['transactions'] == result['transactions']
+        print(f"sync upload  {sync_s * 1000:8.1f} ms ({result['count']:,} transactions)")
+        print(f"job 202      {submit_s * 1000:8.1f} ms ({sync_s / submit_s:.0f}x sooner)")
+
+        idle_s, _ = best_of(20, health)
+        latencies = []
+        started = time.perf_counter()
+        jobs = [post('/api/upload/jobs', pdf)['job_id'] for pdf in pdfs]
+        stop = threading.Event()
+
+        def probe():
+            while not stop.is_set():
+                t = time.perf_counter()
+                health()
+                latencies.append(time.perf_counter() - t)
+                time.sleep(0.05)
+
+        prober = threading.Thread(target=probe)
+        prober.start()
+        found = sum(wait(job_id)['count'] for job_id in jobs)
+        batch_s = time.perf_counter() - started
+        stop.set()
+        prober.join()
+
+        latencies.sort()
+        print(f"health idle  {idle_s * 1000:8.2f} ms")
+        print(f"health busy  {latencies[len(latencies) // 2] * 1000:8.2f} ms median "
+              f"{latencies[-1] * 1000:8.2f} ms max ({len(latencies)} probes)")
+        print(f"batch        {batch_s:8.2f} s  {statements} statements, {found:,} transactions "
+              f"({statements * pages / batch_s:.0f} pages/s; sync one at a time ~{statements * sync_s:.2f} s)")
+        test_app.upload_jobs.shutdown()
+        test_app.transaction_store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Transaction lists on the wire: row JSON vs columnar MessagePack (wire_format)
+for 100k transactions in the /api/upload response shape (app.py rows,
+'actions' included), each description given a reference number so that
+column is not dictionary-encoded.
+
+  bytes        body size, raw and gzipped
+  upload       server: encode the response; client: decode it back to rows
+  predict      client: encode the request body; server: decode it and build
+               the DataFrame prepare_transaction_data_for_ml starts from
+  end to end   POST /api/predict-future (test_app, model cache off), both bodies
+
+Usage: python benchmarks/bench_wire_format.py [transactions] [repeats]
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgpack  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from bench_monthly_aggregates import best_of, history  # noqa: E402
+from wire_format import MSGPACK_MIMETYPE, decode_columns, encode_columns, pack, rows_from_columns, unpack  # noqa: E402
+
+
+def upload_rows(count, seed=3):
+    rng = random.Random(seed)
+    per_day = -(-count // 3650)
+    rows = []
+    for trans_id, trans in enumerate(history(per_day, 10, seed), start=1):
+        rows.append({'id': trans_id, **trans,
+                     'description': f"{trans['description']} REF{rng.randrange(10 ** 9):09d}",
+                     'actions': 'edit,delete'})
+        if len(rows) == count:
+            break
+    return rows
+
+
+def line(label, json_s, msgpack_s):
+    print(f"{label:<34} {json_s * 1000:8.1f} ms {msgpack_s * 1000:8.1f} ms  {json_s / msgpack_s:5.1f}x")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    rows = upload_rows(count)
+    response = {'success': True, 'transactions': rows, 'count': len(rows), 'cache': 'miss'}
+    json_body = json.dumps(response).encode()
+    msgpack_body = pack(response)
+    request_json = json.dumps({'transactions': rows}).encode()
+    request_msgpack = msgpack.packb({'transactions': encode_columns(rows)})
+
+    print(f"transactions={len(rows):,}")
+    print(f"{'':<34} {'JSON':>11} {'MessagePack':>11}")
+    for label, plain, compact in (('upload response', json_body, msgpack_body),
+                                  ('predict request', request_json, request_msgpack)):
+        print(f"{label + ' bytes':<34} {len(plain) / 1e6:8.2f} MB {len(compact) / 1e6:8.2f} MB  "
+              f"{len(plain) / len(compact):5.1f}x")
+        print(f"{label + ' bytes, gzip':<34} {len(gzip.compress(plain)) / 1e6:8.2f} MB "
+              f"{len(gzip.compress(compact)) / 1e6:8.2f} MB")
+
+    decoded_rows = rows_from_columns(unpack(msgpack_body)['transactions'])
+    assert decoded_rows == json.loads(json_body)['transactions']
+
+    line('upload: server encode', best_of(repeats, lambda: json.dumps(response).encode())[0],
+         best_of(repeats, pack, response)[0])
+    line('upload: client decode to rows', best_of(repeats, lambda: json.loads(json_body)['transactions'])[0],
+         best_of(repeats, lambda: rows_from_columns(unpack(msgpack_body)['transactions']))[0])
+    line('predict: client encode', best_of(repeats, lambda: json.dumps({'transactions': rows}).encode())[0],
+         best_of(repeats, lambda: msgpack.packb({'transactions': encode_columns(rows)}))[0])
+
+    json_frame_s, json_frame = best_of(repeats, lambda: pd.DataFrame(json.loads(request_json)['transactions']))
+    msgpack_frame_s, msgpack_frame = best_of(
+        repeats, lambda: pd.DataFrame(decode_columns(unpack(request_msgpack)['transactions'])))
+    pd.testing.assert_frame_equal(json_frame, msgpack_frame)
+    line('predict: server decode + DataFrame', json_frame_s, msgpack_frame_s)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['TRANSACTIONS_DB_PATH'] = os.path.join(tmp, 'transactions.db')
+        os.environ['MODEL_CACHE_SIZE'] = '0'
+        import test_app
+
+        client = test_app.app.test_client()
+
+        def predict(body, content_type, accept):
+            response = client.post('/api/predict-future', data=body, content_type=content_type,
+                                   headers={'Accept': accept})
+            assert response.status_code == 200, response.data[:200]
+            return response
+
+        json_s, json_response = best_of(repeats, predict, request_json, 'application/json', 'application/json')
+        msgpack_s, msgpack_response = best_of(repeats, predict, request_msgpack, MSGPACK_MIMETYPE, MSGPACK_MIMETYPE)
+        assert unpack(msgpack_response.data)['predictions'] == json_response.get_json()['predictions']
+        line('POST /api/predict-future', json_s, msgpack_s)
+        test_app.transaction_store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Synthetic bank statement generators used by the benchmark scripts
+"""
+import os
+import random
+from datetime import date, timedelta
+from typing import List
+
+
+HEADERS = ['Value Date', 'Post Date', 'Credit', 'Debit', 'Balance', 'Description']
+COLUMN_WIDTHS = [62, 62, 70, 70, 80, 190]
+DESCRIPTIONS = [
+    'UPI/PAYTM/Grocery Store', 'ATM CASH WITHDRAWAL', 'SALARY CREDIT ACME LTD',
+    'NEFT TRANSFER TO SAVINGS', 'INTEREST CREDIT', 'GPAY/Restaurant Bill',
+    'SMS CHARGES', 'IMPS/Rent Payment', 'BHIM/Electricity Bill', 'CWD/Branch',
+]
+
+
+def statement_rows(count: int, seed: int = 7) -> List[List[str]]:
+    """Build `count` rows in the 6-column Indian Bank layout"""
+    rng = random.Random(seed)
+    start = date(2023, 1, 1)
+    balance = 50000.0
+    rows = []
+
+    for i in range(count):
+        day = start + timedelta(days=i // 4)
+        stamp = day.strftime('%d/%m/%Y')
+        amount = round(rng.uniform(50, 25000), 2)
+        is_credit = rng.random() < 0.3
+        balance += amount if is_credit else -amount
+        rows.append([
+            stamp,
+            stamp,
+            f"{amount:.2f}" if is_credit else '',
+            '' if is_credit else f"{amount:.2f}",
+            f"{balance:.2f}",
+            f"{rng.choice(DESCRIPTIONS)} {i}",
+        ])
+
+    return rows
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _page_stream(rows: List[List[str]], title: str) -> bytes:
+    """Draw a ruled table (so pdfplumber's line strategy finds it) plus a title"""
+    left, top, row_height = 30, 800, 16
+    commands = [
+        'BT /F1 12 Tf 30 820 Td (' + _escape(title) + ') Tj ET',
+        '0.5 w',
+    ]
+
+    table_rows = [HEADERS] + rows
+    bottom = top - row_height * len(table_rows)
+    right = left + sum(COLUMN_WIDTHS)
+
+    for r in range(len(table_rows) + 1):
+        y = top - r * row_height
+        commands.append(f"{left} {y} m {right} {y} l S")
+
+    x = left
+    for width in COLUMN_WIDTHS + [0]:
+        commands.append(f"{x} {top} m {x} {bottom} l S")
+        x += width
+
+    for r, row in enumerate(table_rows):
+        y = top - (r + 1) * row_height + 4
+        x = left
+        for width, cell in zip(COLUMN_WIDTHS, row):
+            if cell:
+                commands.append(f"BT /F1 7 Tf {x + 2} {y} Td ({_escape(cell)}) Tj ET")
+            x += width
+
+    return '\n'.join(commands).encode('latin-1')
+
+
+def write_statement_pdf(path: str, pages: int, rows_per_page: int = 40, seed: int = 7) -> str:
+    """
+    Write a multi-page, table-ruled statement PDF without any PDF library
+    """
+    rows = statement_rows(pages * rows_per_page, seed=seed)
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # Pages tree, filled in once the kids are known
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    kids = []
+
+    for p in range(pages):
+        chunk = rows[p * rows_per_page:(p + 1) * rows_per_page]
+        title = f"INDIAN BANK - Account Statement - Page {p + 1}"
+        stream = _page_stream(chunk, title)
+        objects.append(b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream')
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>".encode()
+        )
+        kids.append(f"{len(objects)} 0 R")
+
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b'\nendobj\n'
+
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'wb') as handle:
+        handle.write(bytes(out))
+    return path
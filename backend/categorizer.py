@@ -0,0 +1,238 @@
+"""
+Keyword-based transaction categoriser.
+
+A rule table (keyword -> category, with a priority) is compiled once into an
+Aho-Corasick automaton, so each description is classified in a single pass
+whatever the number of keywords. When several keywords occur in a description
+the rule with the lowest priority wins (ties go to the earlier rule), which
+is the same answer the old if/elif chains of any() gave.
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CATEGORY = 'Others'
+
+# Up to this many keywords, categorize_many() scans the whole column once per
+# keyword in C instead of walking the automaton per description in Python
+SCAN_MAX_RULES = 256
+
+# Optional rule file (.json or .csv) that replaces the built-in tables
+RULES_FILE_ENV = 'CATEGORY_RULES_FILE'
+
+
+class Rule(NamedTuple):
+    keyword: str
+    category: str
+    priority: int = 0
+
+
+def rules_from_groups(groups: Sequence[Tuple[str, Sequence[str]]]) -> List[Rule]:
+    """[(category, [keywords]), ...] in if/elif order -> rules prioritised by that order"""
+    return [
+        Rule(keyword, category, priority)
+        for priority, (category, keywords) in enumerate(groups)
+        for keyword in keywords
+    ]
+
+
+# Built-in tables, one per parser, in the order their elif chains checked them
+UPLOAD_RULES = rules_from_groups([
+    ('Digital Payment', ['upi', 'gpay', 'paytm', 'phonepe']),
+    ('Cash Withdrawal', ['atm', 'cash']),
+    ('Salary', ['salary', 'sal']),
+    ('Food & Dining', ['food', 'restaurant', 'hotel']),
+    ('Fuel', ['fuel', 'petrol', 'diesel']),
+])
+
+STATEMENT_RULES = rules_from_groups([
+    ('Digital Payment', ['upi', 'gpay', 'paytm', 'phonepe', 'bhim']),
+    ('Cash Withdrawal', ['atm', 'cash withdrawal', 'cwd']),
+    ('Salary', ['salary', 'sal', 'wages']),
+    ('Interest', ['interest', 'int']),
+    ('Transfer', ['transfer', 'tfr', 'neft', 'rtgs', 'imps']),
+    ('Bank Charges', ['fee', 'charges', 'charge']),
+])
+
+TABLE_RULES = rules_from_groups([
+    ('Digital Payment', ['upi', 'gpay', 'paytm', 'phonepe', 'bhim']),
+    ('Cash Withdrawal', ['atm', 'cash withdrawal', 'cwd']),
+    ('Salary', ['salary', 'sal']),
+    ('Interest', ['interest', 'int']),
+])
+
+
+class KeywordCategorizer:
+    """Aho-Corasick automaton over a rule table"""
+
+    def __init__(self, rules: Iterable[Rule], default: str = DEFAULT_CATEGORY):
+        self.default = default
+        self.rules = [Rule(keyword.lower(), category, priority)
+                      for keyword, category, priority in rules if keyword]
+
+        # A rule's rank is its position in priority order; the lowest rank seen wins
+        ranked = sorted(range(len(self.rules)), key=lambda i: (self.rules[i].priority, i))
+        self.categories = [self.rules[i].category for i in ranked]
+        self._no_match = len(self.categories)
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[int] = [self._no_match]
+
+        for rank, i in enumerate(ranked):
+            self._add_keyword(self.rules[i].keyword, rank)
+        self._link()
+
+        # One literal pattern per rank, for the column scan in categorize_many()
+        self._scan_patterns = None
+        if len(ranked) <= SCAN_MAX_RULES:
+            self._scan_patterns = [re.compile(re.escape(self.rules[i].keyword)) for i in ranked]
+
+    def _add_keyword(self, keyword: str, rank: int) -> None:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(self._no_match)
+            state = next_state
+        self._best[state] = min(self._best[state], rank)
+
+    def _link(self) -> None:
+        """Breadth-first failure links; each state also inherits its suffixes' best rank"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._best[next_state] = min(self._best[next_state],
+                                             self._best[self._fail[next_state]])
+                queue.append(next_state)
+
+    def categorize(self, description: Optional[str]) -> str:
+        """Category of the highest-priority keyword found in description"""
+        if not description:
+            return self.default
+
+        best = self._best_rank(description.lower())
+        if best == self._no_match:
+            return self.default
+        return self.categories[best]
+
+    def _best_rank(self, text: str) -> int:
+        """Lowest rank of any keyword occurring in (already lowercased) text"""
+        goto, fail, best_of = self._goto, self._fail, self._best
+        best = self._no_match
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best_of[state] < best:
+                best = best_of[state]
+                if best == 0:
+                    break
+        return best
+
+    __call__ = categorize
+
+    def categorize_many(self, descriptions):
+        """
+        Categorise a whole column of descriptions at once.
+
+        Accepts a pandas Series (returns a Series on the same index) or any
+        sequence (returns a list). The column is factorised so each distinct
+        description is classified once, and the categories are then spread
+        back over the rows with one array take.
+        """
+        codes, uniques = pd.factorize(np.asarray(descriptions, dtype=object))
+        lowered = [description.lower() for description in uniques]
+
+        if self._scan_patterns is not None:
+            ranks = self._scan_ranks(lowered)
+        else:
+            ranks = np.fromiter((self._best_rank(text) for text in lowered), dtype=np.int64,
+                                count=len(lowered))
+
+        labels = np.array(self.categories + [self.default], dtype=object)
+        categories = labels.take(ranks)
+        # Missing descriptions are coded -1, which picks up the default here
+        categories = np.append(categories, self.default).take(codes)
+
+        if isinstance(descriptions, pd.Series):
+            return pd.Series(categories, index=descriptions.index, name='category')
+        return categories.tolist()
+
+    def _scan_ranks(self, lowered: List[str]) -> np.ndarray:
+        """
+        Best rank per description, from one pass over the joined column per
+        keyword. Keywords never contain NUL, so a match can't span two rows.
+        """
+        ranks = np.full(len(lowered), self._no_match, dtype=np.int64)
+        if not lowered:
+            return ranks
+
+        starts = np.zeros(len(lowered), dtype=np.int64)
+        np.cumsum([len(text) + 1 for text in lowered[:-1]], out=starts[1:])
+        blob = '\x00'.join(lowered)
+
+        # Ranks ascend, so the first keyword to claim a row is its best match
+        for rank, pattern in enumerate(self._scan_patterns):
+            positions = [match.start() for match in pattern.finditer(blob)]
+            if not positions:
+                continue
+            rows = np.searchsorted(starts, positions, side='right') - 1
+            rows = rows[ranks[rows] == self._no_match]
+            ranks[rows] = rank
+
+        return ranks
+
+    def fingerprint(self) -> str:
+        """Short digest of the rule table, for caches of categorised results"""
+        digest = hashlib.sha256(repr((self.default, self.rules)).encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+
+def load_rules(path: str) -> List[Rule]:
+    """
+    Read a rule table from a file.
+
+    .json: [{"keyword": "swiggy", "category": "Food & Dining", "priority": 3}, ...]
+           or {"Food & Dining": ["swiggy", "zomato"], ...} (priority = order)
+    .csv:  keyword,category[,priority] with a header row
+    """
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return rules_from_groups(list(data.items()))
+        return [Rule(item['keyword'], item['category'], int(item.get('priority', 0)))
+                for item in data]
+
+    with open(path, newline='', encoding='utf-8') as f:
+        return [Rule(row['keyword'].strip(), row['category'].strip(), int(row.get('priority') or 0))
+                for row in csv.DictReader(f)]
+
+
+def load_categorizer(rules: Iterable[Rule], default: str = DEFAULT_CATEGORY) -> KeywordCategorizer:
+    """Compile the rule file named by CATEGORY_RULES_FILE if set, else the given rules"""
+    path = os.environ.get(RULES_FILE_ENV)
+    if path:
+        rules = load_rules(path)
+    return KeywordCategorizer(rules, default)
@@ -0,0 +1,243 @@
+"""
+Precompiled date/amount classifiers and normalisers shared by the statement parsers.
+
+Every table cell goes through these, so each check is a single precompiled
+pattern (the old per-shape pattern lists are folded into one alternation)
+with a cheap fast path for the shapes bank statements use most. Date
+normalisers are memoised on the raw string, since a statement repeats the
+same few hundred dates across thousands of rows.
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+# Distinct date strings kept per normaliser; a statement has a few hundred at most
+DATE_CACHE_SIZE = int(os.environ.get('DATE_CACHE_SIZE', 4096))
+
+MONTHS = {
+    'jan': '01', 'feb': '02', 'mar': '03', 'apr': '04',
+    'may': '05', 'jun': '06', 'jul': '07', 'aug': '08',
+    'sep': '09', 'oct': '10', 'nov': '11', 'dec': '12'
+}
+
+# Strict statement dates used by bank_parsers: DD/MM/YYYY, DD MMM YYYY, YYYY/MM/DD
+STATEMENT_DATE_RE = re.compile(
+    r'^(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}'
+    r'|\d{1,2}\s+\w{3}\s+\d{4}'
+    r'|\d{4}[/-]\d{1,2}[/-]\d{1,2})$'
+)
+
+# The ten shapes test_app accepts, with or without a time: DD/MM/YYYY, DD-MM-YYYY,
+# YYYY/MM/DD, YYYY-MM-DD (same separator twice), DDMMMYYYY and DD MMM YYYY
+DATE_RE = re.compile(
+    r'^(?:\d{1,2}(?P<s1>[/-])\d{1,2}(?P=s1)\d{2,4}(?:\s+\d{1,2}:\d{2}(?::\d{2})?)?'
+    r'|\d{4}(?P<s2>[/-])\d{1,2}(?P=s2)\d{1,2}(?:\s+\d{1,2}:\d{2}(?::\d{2})?)?'
+    r'|\d{1,2}\w{3}\d{4}'
+    r'|\d{1,2}\s+\w{3}\s+\d{4})$'
+)
+
+# Leading DD/MM/YYYY (or DD-MM-YY) of a cell, e.g. before a timestamp
+DATE_PREFIX_RE = re.compile(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})')
+DAY_MONTH_NAME_YEAR_RE = re.compile(r'\d{1,2}\s*\w{3}\s*\d{4}')
+STATEMENT_DAY_MONTH_NAME_YEAR_RE = re.compile(r'\d{1,2}\s+\w{3}\s+\d{4}')
+
+# "Date Description Amount" lines in statement text
+STATEMENT_LINE_PATTERNS = [
+    re.compile(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\s+(.+?)\s+(\d+(?:,\d{3})*\.?\d*)'),
+    re.compile(r'(\d{1,2}\s+\w{3}\s+\d{4})\s+(.+?)\s+(\d+(?:,\d{3})*\.?\d*)'),
+]
+
+# Plain digits with an optional decimal part: most amount cells, no cleaning needed
+PLAIN_NUMBER_RE = re.compile(r'\d+\.?\d*')
+_PLAIN_DECIMAL_RE = re.compile(r'\d+(?:\.\d+)?')
+# Currency symbol, thousands separators and spaces stripped before float()
+AMOUNT_JUNK_RE = re.compile(r'[₹,\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPACED_SLASH_RE = re.compile(r'\s*/\s*')
+_SPACED_DASH_RE = re.compile(r'\s*-\s*')
+_HAS_WHITESPACE_RE = re.compile(r'\s')
+
+
+def _is_plain_date(text: str) -> bool:
+    """Fast path for DD/MM/YYYY and DD-MM-YYYY, the shape of nearly every statement date"""
+    return (
+        len(text) == 10
+        and text[2] == text[5]
+        and text[2] in '/-'
+        and text[:2].isdecimal()
+        and text[3:5].isdecimal()
+        and text[6:].isdecimal()
+    )
+
+
+def normalize_spacing(text: str) -> str:
+    """Collapse whitespace and drop spaces around / and - (e.g. '15 / 01 / 2024')"""
+    if not _HAS_WHITESPACE_RE.search(text):
+        return text
+    text = _WHITESPACE_RE.sub(' ', text)
+    text = _SPACED_SLASH_RE.sub('/', text)
+    return _SPACED_DASH_RE.sub('-', text)
+
+
+def is_date(text: str) -> bool:
+    """Check if text looks like a date (with or without timestamp)"""
+    if not text:
+        return False
+    if _is_plain_date(text):
+        return True
+
+    cleaned_text = normalize_spacing(text.replace('\n', '').strip())
+    return DATE_RE.match(cleaned_text) is not None
+
+
+def is_statement_date(text: str) -> bool:
+    """Check if text looks like a statement date (strict shapes, no timestamps)"""
+    if not text:
+        return False
+    if _is_plain_date(text):
+        return True
+    return STATEMENT_DATE_RE.match(text.strip()) is not None
+
+
+def is_amount(text: str) -> bool:
+    """Check if text looks like an amount (currency symbols, commas and spaces allowed)"""
+    if not text:
+        return False
+    if _PLAIN_DECIMAL_RE.fullmatch(text):
+        return True
+
+    cleaned = AMOUNT_JUNK_RE.sub('', text)
+    try:
+        float(cleaned)
+        return len(cleaned) > 0
+    except ValueError:
+        return False
+
+
+def clean_amount(text: str) -> str:
+    """Clean amount string for parsing"""
+    if _PLAIN_DECIMAL_RE.fullmatch(text):
+        return text
+    return AMOUNT_JUNK_RE.sub('', text)
+
+
+def _day_month_year(date_part: str) -> str:
+    """'DD/MM/YY[YY]' or 'DD-MM-YY[YY]' -> 'YYYY-MM-DD'"""
+    if '/' in date_part:
+        day, month, year = date_part.split('/')
+    else:
+        day, month, year = date_part.split('-')
+
+    if len(year) == 2:
+        year = '20' + year
+
+    return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def normalize_date(date_str: str) -> Optional[str]:
+    """
+    Format a (possibly timestamped) date as YYYY-MM-DD.
+    Returns None when the value can't be read; callers decide the fallback,
+    so the cache never holds a "today" that goes stale.
+    """
+    try:
+        cleaned_date = normalize_spacing(date_str.replace('\n', ' ').strip())
+
+        # Extract just the date part if there's a timestamp
+        date_match = DATE_PREFIX_RE.match(cleaned_date)
+        date_part = date_match.group(1) if date_match else cleaned_date
+
+        # DD/MM/YYYY or DD-MM-YYYY
+        if date_match:
+            return _day_month_year(date_part)
+
+        # DD MMM YYYY
+        if DAY_MONTH_NAME_YEAR_RE.match(date_part):
+            parts = _WHITESPACE_RE.split(date_part.strip())
+            if len(parts) >= 3:
+                day, month_str, year = parts[0], parts[1], parts[2]
+                month = MONTHS.get(month_str.lower()[:3], '01')
+                return f"{year}-{month}-{day.zfill(2)}"
+
+        return None
+
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def normalize_statement_date(date_str: str) -> Optional[str]:
+    """
+    Format a strict statement date (DD/MM/YYYY or DD MMM YYYY) as YYYY-MM-DD.
+    Returns None when the value can't be read; callers decide the fallback.
+    """
+    try:
+        date_str = date_str.strip()
+
+        if DATE_PREFIX_RE.match(date_str):
+            return _day_month_year(date_str)
+
+        if STATEMENT_DAY_MONTH_NAME_YEAR_RE.match(date_str):
+            day, month_str, year = date_str.split()
+            month = MONTHS.get(month_str.lower()[:3], '01')
+            return f"{year}-{month}-{day.zfill(2)}"
+
+        return None
+
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def reorder_date(date_str: str) -> str:
+    """'DD/MM/YY[YY]' or 'DD-MM-YY[YY]' -> 'YYYY-MM-DD'; other shapes come back unchanged"""
+    parts = date_str.split('/') if '/' in date_str else date_str.split('-')
+    if len(parts) != 3:
+        return date_str
+
+    day, month, year = parts
+    if len(year) == 2:
+        year = '20' + year
+    return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+
+
+DATE_NORMALIZERS = {
+    'normalize_date': normalize_date,
+    'normalize_statement_date': normalize_statement_date,
+    'reorder_date': reorder_date,
+}
+
+
+def normalize_date_column(values: Iterable[Any],
+                          normalizer: Callable[[Any], Optional[str]] = normalize_date) -> List[Optional[str]]:
+    """
+    Normalise a whole column of date values in one call.
+    Each distinct value is parsed once; repeats are filled in from that result.
+    """
+    values = list(values)
+    formatted = {value: normalizer(value) for value in dict.fromkeys(values)}
+    return [formatted[value] for value in values]
+
+
+def date_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters for each date normaliser's cache"""
+    stats = {}
+    for name, normalizer in DATE_NORMALIZERS.items():
+        info = normalizer.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'max_size': info.maxsize,
+            'hit_rate': round(info.hits / lookups, 4) if lookups else 0.0,
+        }
+    return stats
+
+
+def clear_date_caches() -> None:
+    for normalizer in DATE_NORMALIZERS.values():
+        normalizer.cache_clear()
@@ -0,0 +1,100 @@
+"""
+Compression of response bodies (brotli or gzip) for clients that send a
+matching Accept-Encoding. Brotli comes from the Brotli package in
+requirements.txt; without it only gzip is offered.
+
+Registered as an after_request hook by both apps. Only complete bodies of
+compressible types at or above a size threshold are compressed; streamed
+responses (NDJSON uploads, batch forecasts) are left alone, as compressing
+them would hold chunks back until the compressor flushes. A strong ETag gets
+the coding appended ("abc" -> "abc-gzip"), since the compressed bytes are a
+different representation (etags.not_modified accepts either form).
+
+  COMPRESS_MIN_BYTES=1024     smaller bodies are sent as they are (0 disables compression)
+  COMPRESS_LEVEL=6            gzip level, 1-9
+  COMPRESS_BROTLI_QUALITY=4   brotli quality, 0-11
+"""
+import gzip
+import os
+from typing import Callable, Dict, Optional
+
+from app_logging import get_logger
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+log = get_logger('compression')
+
+MIN_BYTES_ENV = 'COMPRESS_MIN_BYTES'
+LEVEL_ENV = 'COMPRESS_LEVEL'
+BROTLI_QUALITY_ENV = 'COMPRESS_BROTLI_QUALITY'
+DEFAULT_MIN_BYTES = 1024
+DEFAULT_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'application/x-msgpack', 'application/x-ndjson',
+    'text/csv', 'text/html', 'text/plain',
+))
+
+
+class ResponseCompressor:
+    """after_request hook compressing eligible response bodies"""
+
+    def __init__(self, min_bytes: int = DEFAULT_MIN_BYTES, level: int = DEFAULT_LEVEL,
+                 brotli_quality: int = DEFAULT_BROTLI_QUALITY):
+        self.min_bytes = min_bytes
+        self.level = level
+        self.brotli_quality = brotli_quality
+        # Preferred first: brotli wins a tie in Accept-Encoding
+        self.codings: Dict[str, Callable[[bytes], bytes]] = {}
+        if brotli is not None:
+            self.codings['br'] = lambda data: brotli.compress(data, quality=self.brotli_quality)
+        self.codings['gzip'] = lambda data: gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.min_bytes > 0
+
+    def eligible(self, request, response) -> bool:
+        """Whether the response is a complete body worth compressing, whatever the client accepts"""
+        return (self.enabled
+                and request.method != 'HEAD'
+                and 200 <= response.status_code < 300 and response.status_code != 204
+                and not response.is_streamed and not response.direct_passthrough
+                and 'Content-Encoding' not in response.headers
+                and response.mimetype in COMPRESSIBLE_MIMETYPES
+                and response.content_length is not None and response.content_length >= self.min_bytes)
+
+    def coding(self, request) -> Optional[str]:
+        """The content coding to use for this client, or None"""
+        return request.accept_encodings.best_match(list(self.codings))
+
+    def __call__(self, request, response):
+        if not self.eligible(request, response):
+            return response
+
+        # The body depends on Accept-Encoding from here on, compressed or not
+        response.vary.add('Accept-Encoding')
+        coding = self.coding(request)
+        if coding is None:
+            return response
+
+        body = response.get_data()
+        response.set_data(self.codings[coding](body))
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag is not None and not weak:
+            response.set_etag(f'{etag}-{coding}')
+        log.debug("Compressed %s response: %s -> %s bytes (%s)", response.mimetype, len(body),
+                  response.content_length, coding)
+        return response
+
+
+def compressor_from_env() -> ResponseCompressor:
+    """ResponseCompressor configured by COMPRESS_MIN_BYTES / COMPRESS_LEVEL / COMPRESS_BROTLI_QUALITY"""
+    return ResponseCompressor(int(os.environ.get(MIN_BYTES_ENV, DEFAULT_MIN_BYTES)),
+                              int(os.environ.get(LEVEL_ENV, DEFAULT_LEVEL)),
+                              int(os.environ.get(BROTLI_QUALITY_ENV, DEFAULT_BROTLI_QUALITY)))
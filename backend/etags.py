@@ -0,0 +1,61 @@
+"""
+Strong ETags computed from what a response is built from, checked before
+any of the work of building it.
+
+A route derives the tag from a data version (TransactionStore.data_version)
+plus everything else the body depends on: the query, the negotiated format. A GET or HEAD whose If-None-Match already
+holds the tag -- as sent, or with the content coding compression appended --
+is answered with an empty 304.
+"""
+import hashlib
+from typing import Any, Iterable, Optional
+
+from flask import Response
+
+# Part of every tag; bump when the body of a tagged response changes shape
+ETAG_VERSION = '1'
+
+# Content codings compression.ResponseCompressor may append to a tag
+CODING_SUFFIXES = ('', '-gzip', '-br')
+
+# Headers a cross-origin client needs to see to revalidate
+EXPOSED_HEADERS = ('ETag',)
+
+
+def strong_etag(*parts: Any) -> str:
+    """Opaque tag for the parts a response depends on"""
+    return hashlib.sha256('\x00'.join(map(str, (ETAG_VERSION,) + parts)).encode()).hexdigest()[:32]
+
+
+def not_modified(request, etag: str, vary: Iterable[str] = ()) -> Optional[Response]:
+    """
+    Empty 304 if If-None-Match already holds etag, otherwise None; vary as the
+    full response's. Only GET and HEAD can be answered with a 304 (RFC 9110
+    13.1.2): any other method is always run.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    for suffix in CODING_SUFFIXES:
+        if request.if_none_match.contains(etag + suffix):
+            response = Response(status=304)
+            response.set_etag(etag + suffix)
+            response.vary.update((*vary, 'Accept-Encoding'))
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+    return None
+
+
+def tag(response: Response, etag: str) -> Response:
+    """Set etag on a response that may be stored, to be revalidated on every use"""
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    exposed = response.headers.get('Access-Control-Expose-Headers')
+    response.headers['Access-Control-Expose-Headers'] = ', '.join(filter(None, (exposed,) + EXPOSED_HEADERS))
+    return response
+
+
+def tagged(response: Response, etag: Optional[str]) -> Response:
+    """tag() the response if there is an etag, otherwise leave it as it is"""
+    return tag(response, etag) if etag is not None else response
@@ -0,0 +1,295 @@
+"""
+Monthly income/expense frames for the savings forecast.
+
+monthly_frames() turns a user's transactions into the two frames
+/api/predict-future trains on -- every transaction, and regular ones only --
+in one pass: months are factorized once and each (month, type) total is
+read off a single stable sort of the amounts, so the cost is one sort of
+the rows however many months they span.
+
+Each total is summed with numpy's own reduction over the month's amounts in
+their original order, i.e. exactly as the per-month mask-and-sum did, so
+the frames match the old ones to the last bit. (groupby().sum() uses
+compensated summation and can differ in the final digits.)
+
+feature_matrix() turns a monthly frame into the model's inputs, one column
+per named feature computed over the whole frame at once. Features are
+looked up in FEATURES; a new one is a function of the frame returning one
+value per month, e.g. FEATURES['income_last_year'] = lag('income', 12).
+
+FeatureScaler and LinearModel stand in for sklearn's StandardScaler and
+LinearRegression: the same standardization and intercept handling, with
+every target column fitted by one numpy least-squares solve, so the service
+doesn't import sklearn at all.
+
+predict_horizon() scores every forecast month in one call: the horizon's
+feature rows are built as a matrix and go through the scaler and model once.
+"""
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+FRAME_COLUMNS = ['year_month', 'income', 'expense', 'savings', 'month_numeric', 'year']
+TARGETS = ('income', 'expense', 'savings')
+MAX_MONTHS_AHEAD = 120
+
+Feature = Callable[[pd.DataFrame], np.ndarray]
+
+
+def segment_sums(keys: np.ndarray, amounts: np.ndarray, size: int) -> np.ndarray:
+    """
+    Sum of amounts per key 0..size-1 (other keys are ignored), each summed in
+    row order like amounts[keys == k].sum()
+    """
+    order = np.argsort(keys, kind='stable')
+    keys, amounts = keys[order], amounts[order]
+    bounds = np.searchsorted(keys, np.arange(size + 1))
+    return np.array([amounts[lo:hi].sum() for lo, hi in zip(bounds[:-1], bounds[1:])],
+                    dtype=amounts.dtype)
+
+
+def monthly_frame(year_month: pd.PeriodIndex, income: Sequence[float],
+                  expense: Sequence[float]) -> pd.DataFrame:
+    """One row per month, in month order, with the prediction columns"""
+    months = year_month.month.to_numpy()
+    years = year_month.year.to_numpy()
+    if year_month.hasnans:
+        # NaT months carry NaN month/year, as NaT.month did
+        months = np.where(year_month.isna(), np.nan, months)
+        years = np.where(year_month.isna(), np.nan, years)
+    income = np.asarray(income)
+    expense = np.asarray(expense)
+    frame = pd.DataFrame({
+        'year_month': year_month,
+        'income': income,
+        'expense': expense,
+        'savings': income - expense,
+        'month_numeric': months,
+        'year': years,
+    }, columns=FRAME_COLUMNS)
+    return frame.sort_values('year_month')
+
+
+def monthly_frames(df: pd.DataFrame) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+    """
+    (monthly_df, regular_monthly_df) from a frame with lowercased 'type' and
+    'frequency', 'amount' and a 'year_month' period column. Every month with
+    a transaction gets a row in both frames; totals it has none of are 0.
+    """
+    if df.empty:
+        return None, None
+
+    codes, months = pd.factorize(df['year_month'], use_na_sentinel=False)
+    size = len(months)
+    # A month that is NaT never compares equal, so it has no totals
+    codes = np.where(df['year_month'].isna().to_numpy(), size, codes)
+
+    amounts = df['amount'].to_numpy()
+    if amounts.dtype.kind == 'f':
+        amounts = np.where(np.isnan(amounts), 0.0, amounts)
+
+    trans_type = df['type'].to_numpy()
+    credit = trans_type == 'credit'
+    debit = trans_type == 'debit'
+    regular = (df['frequency'] == 'regular').to_numpy()
+
+    # Key 2 * month + (0 income, 1 expense); rows of any other type fall outside
+    keys = np.where(credit, 2 * codes, np.where(debit, 2 * codes + 1, 2 * size))
+    totals = segment_sums(keys, amounts, 2 * size)
+    regular_totals = segment_sums(np.where(regular, keys, 2 * size), amounts, 2 * size)
+
+    monthly_df = monthly_frame(months, totals[0::2], totals[1::2])
+    regular_monthly_df = monthly_frame(months, regular_totals[0::2], regular_totals[1::2])
+    return monthly_df, regular_monthly_df
+
+
+class MonthlyTotals(NamedTuple):
+    """A user's monthly history as columns, months ('YYYY-MM') in order"""
+    year_month: List[str]
+    income: List[float]
+    expense: List[float]
+    regular_income: Optional[List[float]] = None
+    regular_expense: Optional[List[float]] = None
+
+
+def monthly_histories(rows: Iterable[Tuple[Any, str, float, float, float, float]]
+                      ) -> Iterator[Tuple[Any, MonthlyTotals]]:
+    """
+    (user_id, MonthlyTotals) from TransactionStore.monthly_history rows, which
+    come ordered by user and month
+    """
+    for user_id, user_rows in groupby(rows, key=itemgetter(0)):
+        columns = list(zip(*user_rows))
+        yield user_id, MonthlyTotals(*(list(column) for column in columns[1:]))
+
+
+def shift(values: np.ndarray, months: int) -> np.ndarray:
+    """values moved `months` places later along the last axis, NaN-padded at the start"""
+    shifted = np.full(values.shape, np.nan)
+    length = values.shape[-1]
+    if months < length:
+        shifted[..., months:] = values[..., :length - months]
+    return shifted
+
+
+def trailing_mean_values(values: np.ndarray, window: int) -> np.ndarray:
+    """trailing_mean over the last axis of an array of monthly values"""
+    length = values.shape[-1]
+    # Summed oldest first, the order a slice's .mean() adds them in
+    total = sum(shift(values, months) for months in range(window, 0, -1))
+    so_far = np.cumsum(values, axis=-1) / np.arange(1, length + 1)
+    return np.where(np.arange(length) >= window, total / window, so_far)
+
+
+def trailing_mean(column: str, window: int) -> Feature:
+    """
+    Mean of `column` over the `window` months before each month. The first
+    `window` months, with fewer before them, take the mean of the months so
+    far including their own.
+    """
+    def feature(frame: pd.DataFrame) -> np.ndarray:
+        return trailing_mean_values(frame[column].to_numpy(dtype=float), window)
+    return feature
+
+
+def lag(column: str, months: int) -> Feature:
+    """`column` as it was `months` months earlier; earlier months take the first month's value"""
+    def feature(frame: pd.DataFrame) -> np.ndarray:
+        values = frame[column].to_numpy(dtype=float)
+        lagged = shift(values, months)
+        lagged[:months] = values[0]
+        return lagged
+    return feature
+
+
+FEATURES: Dict[str, Feature] = {
+    'month_sequence': lambda frame: np.arange(1, len(frame) + 1, dtype=float),
+    'month_of_year': lambda frame: frame['month_numeric'].to_numpy(dtype=float),
+    'recent_income_trend': trailing_mean('income', 2),
+    'recent_expense_trend': trailing_mean('expense', 2),
+}
+
+DEFAULT_FEATURES = ('month_sequence', 'month_of_year', 'recent_income_trend', 'recent_expense_trend')
+
+
+def feature_matrix(monthly_df: pd.DataFrame, features: Sequence[str] = DEFAULT_FEATURES) -> np.ndarray:
+    """(months x features) array, columns in the order `features` names them"""
+    monthly_df = monthly_df.reset_index(drop=True)
+    return np.column_stack([FEATURES[name](monthly_df) for name in features])
+
+
+def target_arrays(monthly_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Income, expense and savings per month, in the frame's order"""
+    return {target: monthly_df[target].to_numpy() for target in TARGETS}
+
+
+class FeatureScaler:
+    """
+    Standardizes features to zero mean and unit variance, as sklearn's
+    StandardScaler does (population variance; constant features keep scale 1).
+    X may also be a stack (groups x rows x features), each group scaled on its own.
+    """
+
+    def fit(self, X: np.ndarray) -> 'FeatureScaler':
+        X = np.asarray(X, dtype=float)
+        rows = X.shape[-2]
+        self.mean_ = X.mean(axis=-2)
+        self.var_ = X.var(axis=-2)
+        # The same test for "constant up to rounding" StandardScaler applies
+        eps = np.finfo(np.float64).eps
+        constant = self.var_ <= rows * eps * self.var_ + (rows * self.mean_ * eps) ** 2
+        self.scale_ = np.where(constant, 1.0, np.sqrt(self.var_))
+        return self
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return (np.asarray(X, dtype=float) - self.mean_[..., None, :]) / self.scale_[..., None, :]
+
+    def fit_transform(self, X: np.ndarray) -> np.ndarray:
+        return self.fit(X).transform(X)
+
+
+class LinearModel:
+    """
+    Ordinary least squares with an intercept, fitted to every target column
+    of Y in one solve -- what one sklearn LinearRegression per target gives.
+    A stack of problems (groups x rows x features) is solved in one batched
+    pseudo-inverse, with lstsq's cutoff for small singular values.
+    """
+
+    def fit(self, X: np.ndarray, Y: np.ndarray) -> 'LinearModel':
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float)
+        X_offset = X.mean(axis=-2)
+        Y_offset = Y.mean(axis=-2)
+        X_centered = X - X_offset[..., None, :]
+        Y_centered = Y - Y_offset[..., None, :]
+        if X.ndim == 2:
+            self.coef_, _, self.rank_, _ = np.linalg.lstsq(X_centered, Y_centered, rcond=None)
+        else:
+            rcond = np.finfo(np.float64).eps * max(X.shape[-2:])
+            self.coef_ = np.linalg.pinv(X_centered, rcond=rcond) @ Y_centered
+        self.intercept_ = Y_offset - (X_offset[..., None, :] @ self.coef_)[..., 0, :]
+        return self
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """(rows x targets) predictions, or (groups x rows x targets) for a stack"""
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_[..., None, :]
+
+    def score(self, X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+        """R^2 per target column"""
+        return r2_score(np.asarray(Y, dtype=float), self.predict(X))
+
+
+def r2_score(Y: np.ndarray, predicted: np.ndarray) -> np.ndarray:
+    """Coefficient of determination per column; a constant column scores 1 if hit exactly, else 0"""
+    residual = ((Y - predicted) ** 2).sum(axis=0)
+    total = ((Y - Y.mean(axis=0)) ** 2).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = 1 - residual / total
+    return np.where(total != 0, score, np.where(residual == 0, 1.0, 0.0))
+
+
+def valid_months_ahead(months_ahead: Any) -> bool:
+    """A horizon is a whole number of months from 1 to MAX_MONTHS_AHEAD"""
+    return (isinstance(months_ahead, int) and not isinstance(months_ahead, bool)
+            and 1 <= months_ahead <= MAX_MONTHS_AHEAD)
+
+
+def horizon_dates(now: datetime, months_ahead: int) -> List[datetime]:
+    """The dates forecast months are labelled by: every 30 days after now"""
+    return [now + timedelta(days=30 * i) for i in range(1, months_ahead + 1)]
+
+
+def horizon_features(monthly_df: pd.DataFrame, dates: Sequence[datetime]) -> np.ndarray:
+    """
+    DEFAULT_FEATURES rows for the months after monthly_df: the sequence carries
+    on, month_of_year is each date's, and both trends stay at the mean of the
+    last three months
+    """
+    months_ahead = len(dates)
+    return np.column_stack([
+        len(monthly_df) + np.arange(1, months_ahead + 1, dtype=float),
+        np.array([date.month for date in dates], dtype=float),
+        np.full(months_ahead, monthly_df['income'].tail(3).mean(), dtype=float),
+        np.full(months_ahead, monthly_df['expense'].tail(3).mean(), dtype=float),
+    ])
+
+
+def predict_horizon(model: LinearModel, scaler: FeatureScaler, monthly_df: pd.DataFrame,
+                    dates: Sequence[datetime]) -> np.ndarray:
+    """Unclipped (income, expense) predictions, one row per date, from one predict call"""
+    return model.predict(scaler.transform(horizon_features(monthly_df, dates)))
+
+
+def clip_forecast(raw_predictions: np.ndarray) -> np.ndarray:
+    """
+    (income, expense, savings) rows from raw (income, expense) predictions:
+    negatives and NaN become 0, as max(0, x) makes them, and savings is the
+    clipped income minus the clipped expense
+    """
+    clipped = np.where(raw_predictions > 0, raw_predictions, 0.0)
+    return np.concatenate([clipped, (clipped[..., 0] - clipped[..., 1])[..., None]], axis=-1)
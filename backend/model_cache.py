@@ -0,0 +1,185 @@
+"""
+Cache of forecasts from trained models, keyed by a fingerprint of the
+monthly aggregates they were trained on.
+
+/api/predict-future trains its scaler and regression models from scratch on
+every call; the Predict page calls it again and again with the same history.
+Entries are kept in memory as a size-bounded LRU and expire after a TTL. With
+MODEL_CACHE_PATH set they are also written through to a SQLite file (as
+zlib-compressed JSON, like parse_cache), so a restarted process can pick
+them up.
+
+  MODEL_CACHE_SIZE=256       entries kept in memory and on disk (0 disables the cache)
+  MODEL_CACHE_TTL=3600       seconds an entry stays valid
+  MODEL_CACHE_PATH=          SQLite file to persist entries in (unset: memory only)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app_logging import get_logger
+from sqlite_local import ThreadConnections
+
+log = get_logger('model_cache')
+
+SIZE_ENV = 'MODEL_CACHE_SIZE'
+TTL_ENV = 'MODEL_CACHE_TTL'
+PATH_ENV = 'MODEL_CACHE_PATH'
+DEFAULT_SIZE = 256
+DEFAULT_TTL = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS model_cache (
+    key       TEXT PRIMARY KEY,
+    data      BLOB NOT NULL,
+    expires   REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS model_cache_last_used ON model_cache (last_used);
+"""
+
+
+def frames_fingerprint(frames: Iterable[Optional[pd.DataFrame]]) -> str:
+    """SHA-256 over the months and income/expense totals of each monthly frame"""
+    digest = hashlib.sha256()
+    for frame in frames:
+        if frame is None:
+            digest.update(b'\x00none')
+            continue
+        digest.update(b'\x00frame%d' % len(frame))
+        digest.update('\x00'.join(frame['year_month'].astype(str)).encode())
+        digest.update(np.ascontiguousarray(frame[['income', 'expense']].to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+
+def forecast_key(fingerprint: str, months_ahead: Any, *parts: Any) -> str:
+    """Key of a forecast for the fingerprinted data; parts add whatever else it depends on"""
+    return hashlib.sha256('\x00'.join(map(str, (fingerprint, months_ahead) + parts)).encode()).hexdigest()
+
+
+class ModelCache:
+    """In-memory LRU with a TTL, optionally written through to SQLite"""
+
+    def __init__(self, max_entries: int = DEFAULT_SIZE, ttl: float = DEFAULT_TTL,
+                 path: Optional[str] = None, dumps: Callable[[Any], str] = json.dumps,
+                 loads: Callable[[str], Any] = json.loads):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.dumps = dumps
+        self.loads = loads
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._connections = ThreadConnections(path, SCHEMA)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key, or None if absent or expired"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        entry = self._load(key, now) if self.path else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        """Store value under key for ttl seconds, evicting the least recently used"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        entry = (now + self.ttl, value)
+        with self._lock:
+            self._remember(key, entry)
+        if self.path:
+            self._store(key, entry, now)
+
+    def _remember(self, key: str, entry: Tuple[float, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str, now: float) -> Optional[Tuple[float, Any]]:
+        try:
+            connection = self._connections.get()
+            row = connection.execute('SELECT data, expires FROM model_cache WHERE key = ? AND expires > ?',
+                                     (key, now)).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE model_cache SET last_used = ? WHERE key = ?', (now, key))
+            return row[1], self.loads(zlib.decompress(row[0]).decode('utf-8'))
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            # A broken cache only costs a retrain
+            log.warning("Model cache lookup failed: %s", e)
+            return None
+
+    def _store(self, key: str, entry: Tuple[float, Any], now: float) -> None:
+        data = zlib.compress(self.dumps(entry[1]).encode('utf-8'))
+        try:
+            connection = self._connections.get()
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute('INSERT OR REPLACE INTO model_cache (key, data, expires, last_used) '
+                                   'VALUES (?, ?, ?, ?)', (key, data, entry[0], now))
+                connection.execute('DELETE FROM model_cache WHERE expires <= ?', (now,))
+                connection.execute('DELETE FROM model_cache WHERE key IN (SELECT key FROM model_cache '
+                                   'ORDER BY last_used DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+        except sqlite3.Error as e:
+            log.warning("Model cache store failed: %s", e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.enabled and self.path:
+            self._connections.get().execute('DELETE FROM model_cache')
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the in-memory size"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'persistent': bool(self.path),
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def model_cache_from_env(**kwargs) -> ModelCache:
+    """ModelCache configured by MODEL_CACHE_SIZE / MODEL_CACHE_TTL / MODEL_CACHE_PATH"""
+    return ModelCache(int(os.environ.get(SIZE_ENV, DEFAULT_SIZE)),
+                      float(os.environ.get(TTL_ENV, DEFAULT_TTL)),
+                      os.environ.get(PATH_ENV) or None, **kwargs)
@@ -0,0 +1,167 @@
+"""
+On-disk cache of parsed uploads, keyed by the SHA-256 of the file bytes.
+
+Re-uploading a statement that has already been parsed returns the stored
+result instead of running extraction again. Entries live in one SQLite file
+as zlib-compressed JSON and the least recently used ones are evicted once
+the cache grows past its byte budget.
+
+  PARSE_CACHE_PATH=parse_cache.db     where the cache lives
+  PARSE_CACHE_MAX_BYTES=268435456     compressed bytes kept (0 disables the cache)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, BinaryIO, Callable, Dict, Optional
+
+from app_logging import get_logger
+from sqlite_local import ThreadConnections
+
+log = get_logger('parse_cache')
+
+PATH_ENV = 'PARSE_CACHE_PATH'
+MAX_BYTES_ENV = 'PARSE_CACHE_MAX_BYTES'
+DEFAULT_PATH = 'parse_cache.db'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parse_cache (
+    key       TEXT PRIMARY KEY,
+    data      BLOB NOT NULL,
+    size      INTEGER NOT NULL,
+    created   REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS parse_cache_last_used ON parse_cache (last_used);
+"""
+
+
+def stream_digest(stream: BinaryIO) -> str:
+    """SHA-256 of a binary stream, read in chunks; the stream is rewound afterwards"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def cache_key(file_digest: str, parser_version: str) -> str:
+    """Entries are only shared between uploads parsed by the same parser version"""
+    return hashlib.sha256(f"{parser_version}\x00{file_digest}".encode()).hexdigest()
+
+
+def upload_key(file_storage, parser_version: str) -> str:
+    """Cache key for an uploaded werkzeug FileStorage, hashed before it is saved"""
+    return cache_key(stream_digest(file_storage.stream), parser_version)
+
+
+class ParseCache:
+    """SQLite-backed, size-bounded LRU of JSON payloads"""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 dumps: Callable[[Any], str] = json.dumps,
+                 loads: Callable[[str], Any] = json.loads):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dumps = dumps
+        self.loads = loads
+        self.hits = 0
+        self.misses = 0
+        self._connections = ThreadConnections(path, SCHEMA)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Stored payload for key, or None; a hit refreshes the entry's LRU position"""
+        if not self.enabled:
+            return None
+
+        try:
+            connection = self._connections.get()
+            row = connection.execute('SELECT data FROM parse_cache WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                connection.execute('UPDATE parse_cache SET last_used = ? WHERE key = ?',
+                                   (time.time(), key))
+        except sqlite3.Error as e:
+            # A broken cache only costs a re-parse
+            log.warning("Parse cache lookup failed: %s", e)
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self.loads(zlib.decompress(row[0]).decode('utf-8'))
+
+    def put(self, key: str, payload: Any) -> bool:
+        """Store payload under key, evicting old entries to stay in budget; False if too big"""
+        if not self.enabled:
+            return False
+
+        data = zlib.compress(self.dumps(payload).encode('utf-8'))
+        if len(data) > self.max_bytes:
+            return False
+
+        now = time.time()
+        try:
+            connection = self._connections.get()
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute(
+                    'INSERT OR REPLACE INTO parse_cache (key, data, size, created, last_used) '
+                    'VALUES (?, ?, ?, ?, ?)', (key, data, len(data), now, now))
+                self._evict(connection)
+        except sqlite3.Error as e:
+            log.warning("Parse cache store failed: %s", e)
+            return False
+        return True
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the total size fits max_bytes"""
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM parse_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in connection.execute('SELECT key, size FROM parse_cache ORDER BY last_used'):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        connection.executemany('DELETE FROM parse_cache WHERE key = ?', evicted)
+
+    def clear(self) -> None:
+        if self.enabled:
+            self._connections.get().execute('DELETE FROM parse_cache')
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the cache's current size"""
+        entries, size = 0, 0
+        if self.enabled:
+            entries, size = self._connections.get().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM parse_cache').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def parse_cache_from_env(**kwargs) -> ParseCache:
+    """ParseCache configured by PARSE_CACHE_PATH / PARSE_CACHE_MAX_BYTES"""
+    return ParseCache(os.environ.get(PATH_ENV, DEFAULT_PATH),
+                      int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES)), **kwargs)
@@ -0,0 +1,290 @@
+"""
+Page-level PDF extraction, optionally spread across a process pool.
+
+The pool is shared by every extraction in the process: it is started on
+first use with PDF_EXTRACT_WORKERS processes (or as many as a caller asks
+for, if more) and kept for the next statement, so an upload does not pay
+for starting worker processes.
+"""
+import os
+import threading
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+
+import pdfplumber
+from pdfplumber import utils
+from pdfplumber.table import TableFinder, TableSettings
+from pdfplumber.utils.text import WordExtractor
+
+
+# Below this many pages sending pages to the pool costs more than it saves
+MIN_PAGES_FOR_POOL = 8
+
+# Upper bound on pages per pool task, so results stream back in small batches
+# instead of one range per worker being held until the whole range is done
+MAX_PAGES_PER_TASK = 16
+
+
+def default_worker_count() -> int:
+    """Worker count from PDF_EXTRACT_WORKERS, else the number of CPUs (capped at 8)"""
+    configured = os.environ.get("PDF_EXTRACT_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def shared_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    The process-wide extraction pool with at least `workers` processes. It
+    is created lazily at max(workers, default_worker_count()) and replaced
+    only when a caller needs more processes (or a worker died); tasks
+    already sent to a replaced pool still finish.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool_workers = max(workers, default_worker_count())
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers)
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next extraction starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def split_page_ranges(page_count: int, workers: int,
+                      max_pages: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Split pages into contiguous [start, stop) ranges, one per worker (or of at most max_pages)"""
+    chunks = max(1, min(workers, page_count))
+    if max_pages:
+        chunks = max(chunks, -(-page_count // max_pages))
+    size, extra = divmod(page_count, chunks)
+
+    ranges = []
+    start = 0
+    for i in range(chunks):
+        stop = start + size + (1 if i < extra else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+
+    return ranges
+
+
+class PageAnalysis:
+    """
+    Lay a page out once and derive both its text and its tables from that.
+
+    pdfplumber's extract_text() and extract_tables() each work from the raw
+    chars on their own, and Table.extract() rescans every char on the page
+    for every table row. Here chars, edges, words and table cells are
+    computed once (lazily) and shared; cell text is filled from a
+    vertical index over the chars instead of a full scan per row.
+    """
+
+    def __init__(self, page, table_settings: Optional[Dict[str, Any]] = None):
+        self.page = page
+        self.settings = TableSettings.resolve(table_settings)
+        self._words = None
+        self._wordmap = None
+        self._table_cells = None
+        self._char_index = None
+
+    @property
+    def chars(self) -> List[Dict[str, Any]]:
+        return self.page.chars
+
+    @property
+    def edges(self) -> List[Dict[str, Any]]:
+        return self.page.edges
+
+    @property
+    def wordmap(self):
+        """Words with their chars; the same words page.extract_words() returns"""
+        if self._wordmap is None:
+            self._wordmap = WordExtractor().extract_wordmap(self.chars)
+        return self._wordmap
+
+    @property
+    def words(self) -> List[Dict[str, Any]]:
+        if self._words is None:
+            self._words = [word for word, _ in self.wordmap.tuples]
+        return self._words
+
+    @property
+    def text(self) -> str:
+        """Same output as page.extract_text(), built from the shared word map"""
+        bbox = self.page.bbox
+        textmap = self.wordmap.to_textmap(
+            x_shift=bbox[0],
+            y_shift=bbox[1],
+            layout_width=self.page.width,
+            layout_height=self.page.height,
+            presorted=True,
+        )
+        return textmap.as_string
+
+    @property
+    def table_cells(self) -> List:
+        """pdfplumber Table objects (cell bounding boxes) found from the page edges"""
+        if self._table_cells is None:
+            self._table_cells = TableFinder(self.page, self.settings).tables
+        return self._table_cells
+
+    def _chars_between(self, top: float, bottom: float) -> List[Dict[str, Any]]:
+        """Chars whose vertical midpoint lies in [top, bottom), in page order"""
+        if self._char_index is None:
+            keyed = sorted(
+                ((char['top'] + char['bottom']) / 2, i) for i, char in enumerate(self.chars)
+            )
+            self._char_index = ([mid for mid, _ in keyed], [i for _, i in keyed])
+
+        mids, order = self._char_index
+        start = bisect_left(mids, top)
+        stop = bisect_left(mids, bottom)
+        return [self.chars[i] for i in sorted(order[start:stop])]
+
+    @property
+    def tables(self) -> List[List[List[Optional[str]]]]:
+        """Same output as page.extract_tables()"""
+        text_settings = dict(self.settings.text_settings or {})
+        tables = []
+
+        for table in self.table_cells:
+            rows = []
+            for row in table.rows:
+                row_chars = self._chars_between(row.bbox[1], row.bbox[3])
+                cells = []
+                for cell in row.cells:
+                    if cell is None:
+                        cells.append(None)
+                        continue
+
+                    x0, top, x1, bottom = cell
+                    cell_chars = [
+                        char for char in row_chars
+                        if x0 <= (char['x0'] + char['x1']) / 2 < x1
+                        and top <= (char['top'] + char['bottom']) / 2 < bottom
+                    ]
+                    if not cell_chars:
+                        cells.append('')
+                        continue
+
+                    kwargs = dict(text_settings, x_shift=x0, y_shift=top)
+                    if 'layout' in kwargs:
+                        kwargs['layout_width'] = x1 - x0
+                        kwargs['layout_height'] = bottom - top
+                    cells.append(utils.extract_text(cell_chars, **kwargs))
+                rows.append(cells)
+            tables.append(rows)
+
+        return tables
+
+
+def _extract_page(page, include_text: bool = True, include_tables: bool = True) -> Dict[str, Any]:
+    """Extract text and/or tables from a single pdfplumber page"""
+    analysis = PageAnalysis(page)
+    content = {
+        'page_number': page.page_number,
+        'text': analysis.text if include_text else '',
+        'tables': analysis.tables if include_tables else [],
+    }
+    # Drop the parsed layout so long statements don't keep every page in memory
+    page.flush_cache()
+    return content
+
+
+def _extract_page_range(file_path: str, start: int, stop: int,
+                        include_text: bool = True, include_tables: bool = True) -> List[Dict[str, Any]]:
+    """Worker entry point: open the PDF once and extract pages [start, stop)"""
+    with pdfplumber.open(file_path) as pdf:
+        return [_extract_page(pdf.pages[i], include_text, include_tables) for i in range(start, stop)]
+
+
+def extract_page_text(file_path: str, page_index: int = 0) -> str:
+    """Text of a single page, e.g. the first page for picking a bank parser"""
+    with pdfplumber.open(file_path) as pdf:
+        if page_index >= len(pdf.pages):
+            return ''
+        return PageAnalysis(pdf.pages[page_index]).text
+
+
+def count_pages(file_path: str) -> int:
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_pages(file_path: str, workers: Optional[int] = None,
+               include_text: bool = True, include_tables: bool = True,
+               on_page: Optional[Callable[[int, int], None]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the text and tables of every page, in page order, as they finish.
+
+    Each pool task opens the PDF once and handles a contiguous page range;
+    only a couple of ranges per worker are in flight at a time, so memory
+    stays bounded however long the statement is. Small documents, or
+    workers <= 1, are extracted serially in this process. Pass
+    include_text=False when the parser only reads tables, so no page text
+    is laid out at all.
+
+    on_page(page_number, page_count) is called once the consumer has
+    finished with a page, i.e. when it asks for the next one. Closing the
+    generator early cancels the ranges not yet started in the shared pool.
+    """
+    if workers is None:
+        workers = default_worker_count()
+
+    page_count = count_pages(file_path)
+
+    def report(content):
+        yield content
+        if on_page:
+            on_page(content['page_number'], page_count)
+
+    if workers <= 1 or page_count < MIN_PAGES_FOR_POOL:
+        with pdfplumber.open(file_path) as pdf:
+            for page in pdf.pages:
+                yield from report(_extract_page(page, include_text, include_tables))
+        return
+
+    ranges = deque(split_page_ranges(page_count, workers, MAX_PAGES_PER_TASK))
+    in_flight = deque()
+
+    executor = shared_pool(workers)
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers * 2:
+                start, stop = ranges.popleft()
+                in_flight.append(executor.submit(
+                    _extract_page_range, file_path, start, stop, include_text, include_tables
+                ))
+            for content in in_flight.popleft().result():
+                yield from report(content)
+    except BrokenProcessPool:
+        _discard_pool(executor)
+        raise
+    finally:
+        # Consumer stopped early (closed, cancelled, or failed): leave the pool to other uploads
+        for future in in_flight:
+            future.cancel()
+
+
+def extract_pages(file_path: str, workers: Optional[int] = None,
+                  include_text: bool = True, include_tables: bool = True) -> List[Dict[str, Any]]:
+    """Extract text and tables for every page, in page order (see iter_pages)"""
+    return list(iter_pages(file_path, workers, include_text, include_tables))
@@ -0,0 +1,58 @@
+"""
+Per-thread SQLite connections for the modules that keep data in a SQLite
+file (storage, parse_cache, model_cache).
+
+sqlite3 connections can't be shared between threads, so each thread opens
+its own on first use. Every connection is in autocommit mode (callers BEGIN
+explicitly when they need a transaction) and runs WAL with
+synchronous=NORMAL: readers don't block the writer, and fsyncs only happen
+at checkpoints.
+"""
+import sqlite3
+import threading
+from typing import Callable, Iterable, Optional
+
+# Applied to every connection before the caller's own pragmas
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+)
+
+
+class ThreadConnections:
+    """
+    One connection per thread to the database at path. A new connection gets
+    PRAGMAS and then pragmas, runs the schema script, then setup(connection)
+    for anything that has to happen once per database rather than per
+    connection.
+    """
+
+    def __init__(self, path: Optional[str], schema: str = '', pragmas: Iterable[str] = (),
+                 setup: Optional[Callable[[sqlite3.Connection], None]] = None, timeout: float = 10):
+        self.path = path
+        self.schema = schema
+        self.pragmas = PRAGMAS + tuple(pragmas)
+        self.setup = setup
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            for pragma in self.pragmas:
+                connection.execute(pragma)
+            if self.schema:
+                connection.executescript(self.schema)
+            if self.setup is not None:
+                self.setup(connection)
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        """Close this thread's connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
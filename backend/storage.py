@@ -0,0 +1,674 @@
+"""
+SQLite persistence for transactions.
+
+One declared `transactions` table (the same columns as the Node server's,
+plus category) with indexes for the per-user read paths. Writes go through
+executemany() inside a single transaction; the database runs in WAL mode so
+readers don't block the writer.
+
+Reads page through a user's history by keyset on (date, id): the cursor is
+the last row's (date, id), so each page is one index range scan however deep
+into the history it is.
+
+Statement imports are idempotent. Each imported row gets a natural key
+(user, date, amount, first 20 characters of the description -- the same
+identity remove_duplicates uses -- plus an occurrence number for genuine
+repeats), which a unique index makes insert-once. A per-month digest of the
+stored rows (keys and contents) lets a re-imported month that is already
+stored exactly as sent be skipped without touching its rows; triggers drop a
+month's digest when one of its rows is updated or deleted, so the next import
+of that month compares row by row again.
+
+monthly_aggregates keeps per-user monthly totals by (type, frequency,
+category), updated in the same database transaction as the rows it
+summarises: inserts made through TransactionStore fold each batch in with
+one upsert per group, and triggers cover updates and deletes from any
+writer. `python storage.py rebuild-aggregates` recomputes it, e.g. after
+rows were inserted behind the store's back.
+
+data_versions holds a token per user that changes with every write to their
+rows (the same way: inserts set it, triggers cover updates and deletes, and
+a rebuild sets it for the users rebuilt). Responses built from a user's rows
+are tagged with it, so an unchanged history can be answered with a 304.
+
+  TRANSACTIONS_DB_PATH=transactions.db    where the database lives
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from sqlite_local import ThreadConnections
+
+PATH_ENV = 'TRANSACTIONS_DB_PATH'
+DEFAULT_PATH = 'transactions.db'
+
+# Applied to every connection on top of sqlite_local's WAL + synchronous=NORMAL
+PRAGMAS = (
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id          INTEGER PRIMARY KEY,
+    user_id     INTEGER NOT NULL,
+    date        TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    amount      REAL NOT NULL,
+    type        TEXT NOT NULL,
+    frequency   TEXT NOT NULL,
+    category    TEXT,
+    created_at  TEXT NOT NULL,
+    natural_key TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_user_date ON transactions (user_id, date);
+CREATE INDEX IF NOT EXISTS transactions_user_category ON transactions (user_id, category, date);
+CREATE INDEX IF NOT EXISTS transactions_user_type ON transactions (user_id, type, date);
+CREATE INDEX IF NOT EXISTS transactions_user_frequency ON transactions (user_id, frequency, date);
+"""
+
+# Created after the natural_key column is known to exist (see _migrate)
+IMPORT_SCHEMA = """
+CREATE UNIQUE INDEX IF NOT EXISTS transactions_user_natural_key
+    ON transactions (user_id, natural_key) WHERE natural_key IS NOT NULL;
+CREATE TABLE IF NOT EXISTS import_digests (
+    user_id    INTEGER NOT NULL,
+    year_month TEXT NOT NULL,
+    row_count  INTEGER NOT NULL,
+    key_sum    INTEGER NOT NULL,
+    PRIMARY KEY (user_id, year_month)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS import_digests_delete AFTER DELETE ON transactions
+WHEN OLD.natural_key IS NOT NULL
+BEGIN
+    DELETE FROM import_digests WHERE user_id = OLD.user_id AND year_month = substr(OLD.date, 1, 7);
+END;
+
+CREATE TRIGGER IF NOT EXISTS import_digests_update AFTER UPDATE ON transactions
+BEGIN
+    DELETE FROM import_digests WHERE user_id = OLD.user_id AND year_month = substr(OLD.date, 1, 7);
+    DELETE FROM import_digests WHERE user_id = NEW.user_id AND year_month = substr(NEW.date, 1, 7);
+END;
+"""
+
+# Uncategorised rows are aggregated under '' so category can be part of the key
+AGGREGATES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS monthly_aggregates (
+    user_id    INTEGER NOT NULL,
+    year_month TEXT NOT NULL,
+    type       TEXT NOT NULL,
+    frequency  TEXT NOT NULL,
+    category   TEXT NOT NULL,
+    total      REAL NOT NULL,
+    row_count  INTEGER NOT NULL,
+    PRIMARY KEY (user_id, year_month, type, frequency, category)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS monthly_aggregates_delete AFTER DELETE ON transactions
+BEGIN
+    UPDATE monthly_aggregates SET total = total - OLD.amount, row_count = row_count - 1
+    WHERE user_id = OLD.user_id AND year_month = substr(OLD.date, 1, 7) AND type = OLD.type
+      AND frequency = OLD.frequency AND category = COALESCE(OLD.category, '');
+    DELETE FROM monthly_aggregates
+    WHERE user_id = OLD.user_id AND year_month = substr(OLD.date, 1, 7) AND type = OLD.type
+      AND frequency = OLD.frequency AND category = COALESCE(OLD.category, '') AND row_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS monthly_aggregates_update
+AFTER UPDATE OF user_id, date, amount, type, frequency, category ON transactions
+BEGIN
+    UPDATE monthly_aggregates SET total = total - OLD.amount, row_count = row_count - 1
+    WHERE user_id = OLD.user_id AND year_month = substr(OLD.date, 1, 7) AND type = OLD.type
+      AND frequency = OLD.frequency AND category = COALESCE(OLD.category, '');
+    DELETE FROM monthly_aggregates
+    WHERE user_id = OLD.user_id AND year_month = substr(OLD.date, 1, 7) AND type = OLD.type
+      AND frequency = OLD.frequency AND category = COALESCE(OLD.category, '') AND row_count <= 0;
+    INSERT INTO monthly_aggregates (user_id, year_month, type, frequency, category, total, row_count)
+    VALUES (NEW.user_id, substr(NEW.date, 1, 7), NEW.type, NEW.frequency,
+            COALESCE(NEW.category, ''), NEW.amount, 1)
+    ON CONFLICT (user_id, year_month, type, frequency, category)
+    DO UPDATE SET total = total + excluded.total, row_count = row_count + 1;
+END;
+"""
+
+# A random token per user that changes with every write to their rows, for
+# ETags. Random rather than a counter, so a recreated database can't hand out
+# a version an old response was tagged with
+VERSIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id INTEGER PRIMARY KEY,
+    version TEXT NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS data_versions_delete AFTER DELETE ON transactions
+BEGIN
+    INSERT INTO data_versions (user_id, version) VALUES (OLD.user_id, lower(hex(randomblob(8))))
+    ON CONFLICT (user_id) DO UPDATE SET version = excluded.version;
+END;
+
+CREATE TRIGGER IF NOT EXISTS data_versions_update AFTER UPDATE ON transactions
+BEGIN
+    INSERT INTO data_versions (user_id, version) VALUES (OLD.user_id, lower(hex(randomblob(8))))
+    ON CONFLICT (user_id) DO UPDATE SET version = excluded.version;
+    INSERT INTO data_versions (user_id, version) VALUES (NEW.user_id, lower(hex(randomblob(8))))
+    ON CONFLICT (user_id) DO UPDATE SET version = excluded.version;
+END;
+"""
+
+BUMP_VERSION_SQL = """
+INSERT INTO data_versions (user_id, version) VALUES (?, lower(hex(randomblob(8))))
+ON CONFLICT (user_id) DO UPDATE SET version = excluded.version
+"""
+
+# WHERE true: an upsert's SELECT needs a WHERE clause to parse
+BUMP_VERSIONS_SQL = """
+INSERT INTO data_versions (user_id, version)
+SELECT DISTINCT user_id, lower(hex(randomblob(8))) FROM transactions {where}
+ON CONFLICT (user_id) DO UPDATE SET version = excluded.version
+"""
+
+# A per-row insert trigger halves bulk insert throughput, so inserts upsert
+# their batch's sums instead (see _add_to_aggregates)
+ADD_TO_AGGREGATES_SQL = """
+INSERT INTO monthly_aggregates (user_id, year_month, type, frequency, category, total, row_count)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, year_month, type, frequency, category)
+DO UPDATE SET total = total + excluded.total, row_count = row_count + excluded.row_count
+"""
+
+REBUILD_AGGREGATES_SQL = """
+INSERT INTO monthly_aggregates (user_id, year_month, type, frequency, category, total, row_count)
+SELECT user_id, substr(date, 1, 7), type, frequency, COALESCE(category, ''), SUM(amount), COUNT(*)
+FROM transactions {where}
+GROUP BY user_id, substr(date, 1, 7), type, frequency, COALESCE(category, '')
+"""
+
+# Per user and month: income, expense, regular income, regular expense. Types and
+# frequencies are matched case-insensitively, as the forecast has always done;
+# months with only other types still appear, with zero totals
+MONTHLY_HISTORY_SQL = """
+SELECT user_id, year_month,
+       SUM(CASE WHEN lower(type) = 'credit' THEN total ELSE 0.0 END),
+       SUM(CASE WHEN lower(type) = 'debit' THEN total ELSE 0.0 END),
+       SUM(CASE WHEN lower(type) = 'credit' AND lower(frequency) = 'regular' THEN total ELSE 0.0 END),
+       SUM(CASE WHEN lower(type) = 'debit' AND lower(frequency) = 'regular' THEN total ELSE 0.0 END)
+FROM monthly_aggregates {where}
+GROUP BY user_id, year_month
+ORDER BY user_id, year_month
+"""
+
+COLUMNS = ('id', 'user_id', 'date', 'description', 'amount', 'type', 'frequency',
+           'category', 'created_at')
+
+# What's written: the API columns plus the import identity
+STORED_COLUMNS = COLUMNS + ('natural_key',)
+
+REQUIRED_FIELDS = ('user_id', 'date', 'description', 'amount', 'type', 'frequency')
+
+INSERT_SQL = (f"INSERT INTO transactions ({', '.join(STORED_COLUMNS)}) "
+              f"VALUES ({', '.join('?' for _ in STORED_COLUMNS)})")
+
+# The unique index backs up the existing-key check import_transactions() makes
+IMPORT_SQL = INSERT_SQL + ' ON CONFLICT DO NOTHING'
+
+# Fields compared when an imported row's natural key is already stored
+CONTENT_FIELDS = ('description', 'amount', 'type', 'frequency', 'category')
+
+KEY_SUM_MODULUS = 2 ** 63
+
+# Conflicting rows echoed back by an import (the count is always exact)
+MAX_REPORTED_CONFLICTS = 100
+
+# Equality filters accepted by page(); each has a (user_id, <column>, date) index
+FILTER_COLUMNS = ('type', 'category', 'frequency')
+
+MAX_PAGE_SIZE = 5000
+
+Row = Tuple[Any, ...]
+
+
+def iso_date(value: Any) -> str:
+    """Dates are stored as text; datetimes/Timestamps become 'YYYY-MM-DD' so they sort"""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+# Stored dates start YYYY-MM-DD: they sort as text, and the month is their first 7 characters
+ISO_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})(?:[T ]|$)')
+
+
+def valid_date(value: Any) -> bool:
+    """Whether value is a date/datetime or a string starting with a real YYYY-MM-DD date"""
+    if hasattr(value, 'strftime'):
+        return True
+    match = ISO_DATE_RE.match(str(value))
+    if match is None:
+        return False
+    try:
+        datetime(*map(int, match.groups()))
+    except ValueError:
+        return False
+    return True
+
+
+def encode_cursor(date: str, trans_id: int) -> str:
+    """Opaque page cursor for the row (date, id) a page ended on"""
+    return base64.urlsafe_b64encode(json.dumps([date, trans_id]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """(date, id) from encode_cursor(); ValueError if it isn't one"""
+    try:
+        date, trans_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return str(date), int(trans_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def page_args(args: Mapping[str, str]) -> Dict[str, Any]:
+    """
+    page() keyword arguments from query parameters: cursor, limit, order
+    (asc/desc), date_from, date_to, type, category, frequency.
+    Raises ValueError on a bad cursor, limit or order.
+    """
+    query: Dict[str, Any] = {
+        'date_from': args.get('date_from') or None,
+        'date_to': args.get('date_to') or None,
+        'filters': {column: args[column] for column in FILTER_COLUMNS if args.get(column)},
+    }
+
+    order = args.get('order', 'asc').lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+    query['descending'] = order == 'desc'
+
+    if args.get('cursor'):
+        query['after'] = decode_cursor(args['cursor'])
+    if args.get('limit'):
+        limit = int(args['limit'])
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        query['limit'] = limit
+    return query
+
+
+def natural_keys(user_id: int, transactions: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    Import identity of each transaction: (user, date, amount, description[:20])
+    plus how many times that tuple has already occurred in this import.
+    """
+    seen: Dict[Tuple[Any, ...], int] = {}
+    keys = []
+    for trans in transactions:
+        identity = (user_id, iso_date(trans['date']), round(float(trans['amount']), 2),
+                    (trans.get('description') or '')[:20].strip())
+        occurrence = seen.get(identity, 0)
+        seen[identity] = occurrence + 1
+        keys.append(hashlib.sha256(repr((identity, occurrence)).encode('utf-8')).hexdigest()[:32])
+    return keys
+
+
+def content(transaction: Dict[str, Any]) -> Tuple[Any, ...]:
+    """CONTENT_FIELDS of a transaction as they are stored"""
+    return (transaction.get('description') or '', float(transaction['amount']),
+            transaction['type'], transaction['frequency'], transaction.get('category'))
+
+
+def month_digest(rows: Iterable[Tuple[str, Tuple[Any, ...]]]) -> Tuple[int, int]:
+    """Order-independent (count, sum of hashes) digest of (natural key, content) pairs"""
+    count, key_sum = 0, 0
+    for key, row_content in rows:
+        count += 1
+        key_sum += int(hashlib.sha256(repr((key, row_content)).encode('utf-8')).hexdigest()[:15], 16)
+    return count, key_sum % KEY_SUM_MODULUS
+
+
+def missing_field(transaction: Dict[str, Any]) -> Optional[str]:
+    """First required field the transaction lacks, or None"""
+    for field in REQUIRED_FIELDS:
+        if field not in transaction:
+            return field
+    return None
+
+
+def invalid_value(transaction: Dict[str, Any]) -> Optional[str]:
+    """Why the first of user_id, date and amount that can't be stored can't be, or None"""
+    try:
+        int(transaction['user_id'])
+    except (TypeError, ValueError):
+        return '"user_id" must be an integer'
+    if not valid_date(transaction['date']):
+        return '"date" must be YYYY-MM-DD'
+    try:
+        float(transaction['amount'])
+    except (TypeError, ValueError):
+        return '"amount" must be a number'
+    return None
+
+
+class TransactionStore:
+    """Thread-safe handle on the transactions database (one connection per thread)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connections = ThreadConnections(path, pragmas=PRAGMAS, setup=self._create_schema, timeout=30)
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _create_schema(self, connection: sqlite3.Connection) -> None:
+        """Create and migrate the schema, once per store, on its first connection"""
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            connection.executescript(SCHEMA)
+            self._migrate(connection)
+            connection.executescript(IMPORT_SCHEMA)
+            backfill = not self._has_table(connection, 'data_versions')
+            connection.executescript(VERSIONS_SCHEMA)
+            if backfill:
+                connection.execute(BUMP_VERSIONS_SQL.format(where='WHERE true'))
+            backfill = not self._has_table(connection, 'monthly_aggregates')
+            connection.executescript(AGGREGATES_SCHEMA)
+            if backfill:
+                self.rebuild_aggregates(connection=connection)
+            self._schema_ready = True
+
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection) -> None:
+        """Bring a database created by an older version up to SCHEMA"""
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(transactions)')}
+        if 'natural_key' not in columns:
+            connection.execute('ALTER TABLE transactions ADD COLUMN natural_key TEXT')
+
+    @staticmethod
+    def _has_table(connection: sqlite3.Connection, name: str) -> bool:
+        return connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                  (name,)).fetchone() is not None
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on this thread's connection"""
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def insert_many(self, transactions: Iterable[Dict[str, Any]],
+                    user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Insert transactions in one database transaction and return them with
+        their new id and created_at. user_id fills in rows that don't carry one.
+        """
+        created_at = datetime.now().isoformat()
+        saved = []
+
+        with self.transaction() as connection:
+            # The write lock is held, so the ids after the current maximum are ours
+            next_id = connection.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM transactions').fetchone()[0]
+            for trans_id, trans in enumerate(transactions, start=next_id):
+                saved.append({**trans, 'user_id': trans.get('user_id', user_id),
+                              'id': trans_id, 'created_at': created_at})
+            rows = [self.row(trans) for trans in saved]
+            connection.executemany(INSERT_SQL, rows)
+            self._add_to_aggregates(connection, rows)
+            self._bump_versions(connection, rows)
+
+        return saved
+
+    def insert(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        return self.insert_many([transaction])[0]
+
+    def insert_rows(self, rows: Iterable[Row]) -> int:
+        """Bulk load of ready-made rows in STORED_COLUMNS order (id None = assign); returns the count"""
+        rows = list(rows)
+        with self.transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(INSERT_SQL, rows)
+            inserted = connection.total_changes - before
+            self._add_to_aggregates(connection, rows)
+            self._bump_versions(connection, rows)
+            return inserted
+
+    @staticmethod
+    def _add_to_aggregates(connection: sqlite3.Connection, rows: List[Row]) -> None:
+        """Fold freshly inserted rows into monthly_aggregates, one upsert per group"""
+        groups: Dict[Tuple[Any, ...], List[Any]] = {}
+        for row in rows:
+            key = (row[1], row[2][:7], row[5], row[6], row[7] or '')
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [row[4], 1]
+            else:
+                group[0] += row[4]
+                group[1] += 1
+        connection.executemany(ADD_TO_AGGREGATES_SQL,
+                               [(*key, total, count) for key, (total, count) in groups.items()])
+
+    @staticmethod
+    def _bump_versions(connection: sqlite3.Connection, rows: List[Row]) -> None:
+        """New data_versions for the users freshly inserted rows belong to"""
+        connection.executemany(BUMP_VERSION_SQL, [(user_id,) for user_id in {row[1] for row in rows}])
+
+    def data_version(self, user_id: int) -> str:
+        """Token that changes whenever the user's rows do ('' for a user without any yet)"""
+        row = self.connection().execute('SELECT version FROM data_versions WHERE user_id = ?',
+                                        (user_id,)).fetchone()
+        return row[0] if row else ''
+
+    @staticmethod
+    def row(transaction: Dict[str, Any]) -> Row:
+        return (
+            transaction.get('id'),
+            int(transaction['user_id']),
+            iso_date(transaction['date']),
+            transaction.get('description') or '',
+            float(transaction['amount']),
+            transaction['type'],
+            transaction['frequency'],
+            transaction.get('category'),
+            transaction['created_at'],
+            transaction.get('natural_key'),
+        )
+
+    def import_transactions(self, user_id: int,
+                            transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Idempotent bulk import for one user. Rows whose natural key is already
+        stored are skipped when their content matches and counted as
+        conflicting (and left alone) when it doesn't; the rest are inserted.
+        Conflicts are echoed back with the id of the stored row they clash with.
+        Months whose digest matches the stored one are skipped whole, so
+        re-importing an overlapping statement only costs work for the months
+        that actually changed.
+        """
+        created_at = datetime.now().isoformat()
+        keys = natural_keys(user_id, transactions)
+
+        months: Dict[str, List[int]] = {}
+        for i, trans in enumerate(transactions):
+            months.setdefault(iso_date(trans['date'])[:7], []).append(i)
+
+        result = {'inserted': 0, 'skipped': 0, 'conflicting': 0,
+                  'months_unchanged': 0, 'months_imported': 0, 'conflicts': []}
+
+        with self.transaction() as connection:
+            stored = {month: (row_count, key_sum) for month, row_count, key_sum in connection.execute(
+                'SELECT year_month, row_count, key_sum FROM import_digests WHERE user_id = ?', (user_id,))}
+            next_id = connection.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM transactions').fetchone()[0]
+
+            for month, indexes in months.items():
+                month_keys = [keys[i] for i in indexes]
+                if stored.get(month) == month_digest(
+                        (key, content(transactions[i])) for i, key in zip(indexes, month_keys)):
+                    result['skipped'] += len(indexes)
+                    result['months_unchanged'] += 1
+                    continue
+
+                existing = {row[0]: (row[1], row[2:]) for row in connection.execute(
+                    f"SELECT natural_key, id, {', '.join(CONTENT_FIELDS)} FROM transactions "
+                    "WHERE user_id = ? AND date >= ? AND date < ? AND natural_key IS NOT NULL",
+                    (user_id, month, month + '~'))}
+
+                new_rows = []
+                new_contents = []
+                for i, key in zip(indexes, month_keys):
+                    trans = transactions[i]
+                    if key not in existing:
+                        new_rows.append(self.row({**trans, 'id': next_id, 'user_id': user_id,
+                                                  'created_at': created_at, 'natural_key': key}))
+                        new_contents.append((key, content(trans)))
+                        next_id += 1
+                        continue
+
+                    stored_id, stored_content = existing[key]
+                    if stored_content == content(trans):
+                        result['skipped'] += 1
+                    else:
+                        result['conflicting'] += 1
+                        if len(result['conflicts']) < MAX_REPORTED_CONFLICTS:
+                            result['conflicts'].append({**trans, 'id': stored_id})
+
+                before = connection.total_changes
+                connection.executemany(IMPORT_SQL, new_rows)
+                result['inserted'] += connection.total_changes - before
+                result['months_imported'] += 1
+                self._add_to_aggregates(connection, new_rows)
+                self._bump_versions(connection, new_rows)
+
+                stored_rows = [(key, stored_content) for key, (_, stored_content) in existing.items()]
+                row_count, key_sum = month_digest(stored_rows + new_contents)
+                connection.execute(
+                    'INSERT OR REPLACE INTO import_digests (user_id, year_month, row_count, key_sum) '
+                    'VALUES (?, ?, ?, ?)', (user_id, month, row_count, key_sum))
+
+        return result
+
+    def page(self, user_id: int, after: Optional[Tuple[str, int]] = None,
+             limit: Optional[int] = None, date_from: Optional[str] = None,
+             date_to: Optional[str] = None, filters: Optional[Dict[str, str]] = None,
+             descending: bool = False) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+        """
+        One page of a user's transactions ordered by (date, id), starting after
+        the keyset `after`. Returns the rows and the keyset to continue from
+        (None on the last page). limit=None returns everything that's left.
+        """
+        where = ['user_id = ?']
+        params: List[Any] = [user_id]
+        for column, value in (filters or {}).items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Unknown filter: {column}")
+            where.append(f"{column} = ?")
+            params.append(value)
+        if date_from:
+            where.append('date >= ?')
+            params.append(date_from)
+        if date_to:
+            where.append('date <= ?')
+            params.append(date_to)
+        if after is not None:
+            where.append('(date, id) < (?, ?)' if descending else '(date, id) > (?, ?)')
+            params.extend(after)
+
+        direction = 'DESC' if descending else 'ASC'
+        sql = (f"SELECT {', '.join(COLUMNS)} FROM transactions WHERE {' AND '.join(where)} "
+               f"ORDER BY date {direction}, id {direction}")
+        if limit is not None:
+            # One extra row says whether another page follows
+            sql += ' LIMIT ?'
+            params.append(limit + 1)
+
+        rows = self.connection().execute(sql, params).fetchall()
+        next_key = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1][2], rows[-1][0])
+        return [dict(zip(COLUMNS, row)) for row in rows], next_key
+
+    def monthly_totals(self, user_id: int) -> List[Tuple[str, str, str, float]]:
+        """(year_month, type, frequency, total) rows from monthly_aggregates, by month"""
+        return self.connection().execute(
+            'SELECT year_month, type, frequency, SUM(total) FROM monthly_aggregates '
+            'WHERE user_id = ? GROUP BY year_month, type, frequency ORDER BY year_month',
+            (user_id,)).fetchall()
+
+    def monthly_history(self, user_ids: Optional[Iterable[int]] = None
+                        ) -> Iterator[Tuple[int, str, float, float, float, float]]:
+        """
+        (user_id, year_month, income, expense, regular_income, regular_expense)
+        from monthly_aggregates for every user (or user_ids), by user and month
+        """
+        where, params = '', ()
+        if user_ids is not None:
+            where, params = 'WHERE user_id IN (SELECT value FROM json_each(?))', (json.dumps(list(user_ids)),)
+        return self.connection().execute(MONTHLY_HISTORY_SQL.format(where=where), params)
+
+    def rebuild_aggregates(self, user_id: Optional[int] = None,
+                           connection: Optional[sqlite3.Connection] = None) -> int:
+        """Recompute monthly_aggregates from transactions (one user or everyone); returns row count"""
+        where, params = ('WHERE user_id = ?', (user_id,)) if user_id is not None else ('', ())
+        if connection is None:
+            with self.transaction() as connection:
+                return self._rebuild_aggregates(connection, where, params)
+        return self._rebuild_aggregates(connection, where, params)
+
+    @staticmethod
+    def _rebuild_aggregates(connection: sqlite3.Connection, where: str, params: Tuple[Any, ...]) -> int:
+        connection.execute(f"DELETE FROM monthly_aggregates {where}", params)
+        before = connection.total_changes
+        connection.execute(REBUILD_AGGREGATES_SQL.format(where=where), params)
+        rebuilt = connection.total_changes - before
+        # Rows written behind the store's back didn't change the version either
+        connection.execute(BUMP_VERSIONS_SQL.format(where=where or 'WHERE true'), params)
+        return rebuilt
+
+    def count(self, user_id: Optional[int] = None) -> int:
+        if user_id is None:
+            return self.connection().execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+        return self.connection().execute(
+            'SELECT COUNT(*) FROM transactions WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+    def close(self) -> None:
+        """Close this thread's connection"""
+        self._connections.close()
+
+
+def store_from_env() -> TransactionStore:
+    """TransactionStore at TRANSACTIONS_DB_PATH; nothing is opened until first use"""
+    return TransactionStore(os.environ.get(PATH_ENV, DEFAULT_PATH))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Maintenance commands for the transactions database')
+    commands = parser.add_subparsers(dest='command', required=True)
+    rebuild = commands.add_parser('rebuild-aggregates',
+                                  help='recompute monthly_aggregates from the transactions table')
+    rebuild.add_argument('--user', type=int, help='only this user_id')
+    rebuild.add_argument('--db', default=os.environ.get(PATH_ENV, DEFAULT_PATH),
+                         help=f"database path (default: ${PATH_ENV} or {DEFAULT_PATH})")
+    args = parser.parse_args(argv)
+
+    store = TransactionStore(args.db)
+    rows = store.rebuild_aggregates(args.user)
+    print(f"Rebuilt monthly_aggregates: {rows} rows")
+
+
+if __name__ == '__main__':
+    main()
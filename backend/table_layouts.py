@@ -0,0 +1,408 @@
+"""
+Layout detection and column-oriented import of tabular bank exports
+(Excel/CSV sheets, PDF statement tables).
+
+A sheet has one width, so the layout family (new bank, Indian Bank, CSV) is
+known from the header alone; the few per-row checks that pick between a
+family's variants (date and amount cells, a credit/debit column) are run
+over whole columns, each distinct cell value being classified once. Every
+layout is then parsed with column operations and the transactions are
+emitted in one go, in the same shape and order as the row parsers in
+test_app.py would give.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import cell_classifiers
+from app_logging import get_logger
+from categorizer import KeywordCategorizer
+
+log = get_logger('table_layouts')
+
+# Layout names, as reported to the client
+NEW_BANK = 'new_bank'                # Date, Remarks, Tran Id, UTR, Instr. ID, Withdrawals, Deposits, Balance
+INDIAN_BANK_6 = 'indian_bank_6'      # Value Date, Post Date, Credit, Debit, Balance, Description
+INDIAN_BANK = 'indian_bank'          # older Indian Bank export, description in column 5 (or 4)
+CSV_5 = 'csv_5'                      # Date, Description, Amount, Type, Category
+CSV_4 = 'csv_4'                      # Date, Amount, Type, Description
+
+TRANSACTION_TYPES = ('credit', 'debit')
+
+# One object array of cell text per column
+Cells = List[np.ndarray]
+
+# Data rows sampled to pick a table's layout, and the share of them that
+# must agree before the layout is applied to the whole table
+SAMPLE_ROWS = 20
+MIN_CONFIDENCE = 0.8
+
+
+# ---------- Sheet -> cleaned string cells ----------
+def frame_to_cells(df: pd.DataFrame) -> Cells:
+    """
+    Cell text as the row parsers see it: str() of each value ('' for missing),
+    stripped, newlines as spaces.
+    """
+    # df.values gives the same per-cell objects iterrows() did
+    values = df.values
+    cells = []
+    for i in range(values.shape[1]):
+        column = values[:, i]
+        missing = pd.isna(column)
+        if column.dtype != object:
+            column = column.astype(str)
+        cells.append(np.array(
+            ['' if is_missing else str(value).strip().replace('\n', ' ')
+             for value, is_missing in zip(column.tolist(), missing.tolist())],
+            dtype=object,
+        ))
+    return cells
+
+
+def _map_unique(values: np.ndarray, func: Callable[[str], Any]) -> np.ndarray:
+    """func over a column, evaluated once per distinct value"""
+    codes, uniques = pd.factorize(values)
+    results = np.array([func(value) for value in uniques] + [None], dtype=object)
+    return results.take(codes)
+
+
+def date_mask(values: np.ndarray) -> np.ndarray:
+    return _map_unique(values, cell_classifiers.is_date).astype(bool)
+
+
+def amount_values(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(is_amount mask, float values) for a column; values are NaN where not an amount"""
+    cleaned = np.array([cell_classifiers.clean_amount(value) for value in values.tolist()], dtype=object)
+    present = cleaned != ''
+    amounts = np.full(len(values), np.nan)
+    is_amount = np.zeros(len(values), dtype=bool)
+
+    candidates = cleaned[present]
+    try:
+        # object -> float64 calls float() on each cell, the same parse is_amount uses
+        amounts[present] = candidates.astype(np.float64)
+        is_amount[present] = True
+    except (TypeError, ValueError):
+        parsed = _map_unique(candidates, _float_or_none)
+        ok = np.array([value is not None for value in parsed.tolist()], dtype=bool)
+        rows = np.flatnonzero(present)[ok]
+        amounts[rows] = parsed[ok].astype(np.float64)
+        is_amount[rows] = True
+
+    return is_amount, amounts
+
+
+def _float_or_none(text: str) -> Optional[float]:
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def formatted_dates(values: np.ndarray) -> List[str]:
+    """YYYY-MM-DD per cell, today where a date can't be read (as format_date does)"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    return [date or today for date in cell_classifiers.normalize_date_column(values.tolist())]
+
+
+def truncate(values: np.ndarray, limit: int) -> List[str]:
+    """Descriptions cut to limit characters plus '...' (cells are already stripped)"""
+    return [value if len(value) <= limit else value[:limit] + '...' for value in values.tolist()]
+
+
+def lowered(values: np.ndarray) -> np.ndarray:
+    return np.array([value.lower() for value in values.tolist()], dtype=object)
+
+
+# ---------- Layout detection ----------
+def row_layouts(cells: Cells) -> np.ndarray:
+    """
+    Layout each row would be parsed with, decided on whole columns with the
+    same rules parse_transaction_row applies per row (None = not parseable)
+    """
+    width = len(cells)
+    rows = len(cells[0]) if cells else 0
+    layouts = np.full(rows, None, dtype=object)
+    if width < 4:
+        return layouts
+
+    if width >= 8:
+        layouts[:] = NEW_BANK
+    elif width >= 6:
+        indian_bank_6 = (date_mask(cells[0]) & date_mask(cells[1])
+                         & (amount_values(cells[2])[0] | (cells[2] == ''))
+                         & (amount_values(cells[3])[0] | (cells[3] == '')))
+        layouts[:] = np.where(indian_bank_6, INDIAN_BANK_6, INDIAN_BANK)
+    elif width == 5:
+        csv_5 = (date_mask(cells[0]) & amount_values(cells[2])[0]
+                 & np.isin(lowered(cells[3]), TRANSACTION_TYPES))
+        layouts[:] = np.where(csv_5, CSV_5, INDIAN_BANK)
+    else:
+        csv_4 = (date_mask(cells[0]) & amount_values(cells[1])[0]
+                 & np.isin(lowered(cells[2]), TRANSACTION_TYPES))
+        layouts[csv_4] = CSV_4
+
+    # Rows with fewer than three filled cells are never transactions
+    filled = sum((column != '').astype(np.int64) for column in cells)
+    layouts[filled < 3] = None
+    return layouts
+
+
+def clean_row(row: Sequence[Any]) -> List[str]:
+    """Cell text of one table row, as parse_transaction_row cleans it"""
+    return [str(cell).strip().replace('\n', ' ') if cell else '' for cell in row]
+
+
+def row_layout(cells: List[str]) -> Optional[str]:
+    """Layout of one cleaned row: parse_transaction_row's format checks, without the parsing"""
+    if sum(1 for cell in cells if cell) < 3:
+        return None
+
+    width = len(cells)
+    is_date, is_amount = cell_classifiers.is_date, cell_classifiers.is_amount
+    if width >= 8:
+        return NEW_BANK
+    if width >= 6:
+        if (is_date(cells[0]) and is_date(cells[1])
+                and (is_amount(cells[2]) or cells[2] == '')
+                and (is_amount(cells[3]) or cells[3] == '')):
+            return INDIAN_BANK_6
+        return INDIAN_BANK
+    if width == 5:
+        if is_date(cells[0]) and is_amount(cells[2]) and cells[3].lower() in TRANSACTION_TYPES:
+            return CSV_5
+        return INDIAN_BANK
+    if width == 4:
+        if is_date(cells[0]) and is_amount(cells[1]) and cells[2].lower() in TRANSACTION_TYPES:
+            return CSV_4
+    return None
+
+
+class LayoutDecision(NamedTuple):
+    layout: Optional[str]     # None when no layout is trusted for the whole table
+    confidence: float         # share of sampled rows in that layout
+    width: int
+    sampled: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'layout': self.layout, 'confidence': round(self.confidence, 3),
+                'width': self.width, 'sampled': self.sampled}
+
+
+def detect_layout(rows: Sequence[Sequence[Any]], sample_size: int = SAMPLE_ROWS) -> LayoutDecision:
+    """
+    Pick a table's layout from its first sample_size data rows (headers
+    already removed). The most common row layout among rows of the most
+    common width wins; below MIN_CONFIDENCE no layout is chosen and every
+    row is detected on its own.
+    """
+    sample = [clean_row(row) for row in rows[:sample_size]]
+    if not sample:
+        return LayoutDecision(None, 0.0, 0, 0)
+
+    width = Counter(len(cells) for cells in sample).most_common(1)[0][0]
+    layouts = Counter(row_layout(cells) for cells in sample if len(cells) == width)
+    layout, votes = layouts.most_common(1)[0]
+    confidence = votes / len(sample)
+
+    if layout is None or confidence < MIN_CONFIDENCE:
+        return LayoutDecision(None, confidence, width, len(sample))
+    return LayoutDecision(layout, confidence, width, len(sample))
+
+
+class LayoutReport:
+    """Layouts chosen while parsing an upload (rows counted before duplicates are dropped)"""
+
+    def __init__(self):
+        self.tables: List[LayoutDecision] = []
+        self.rows = Counter()
+        self.row_fallbacks = 0
+
+    def add_table(self, decision: LayoutDecision) -> None:
+        self.tables.append(decision)
+
+    def add_rows(self, layout: Optional[str], count: int = 1) -> None:
+        self.rows[layout or 'per_row'] += count
+
+    def as_dict(self) -> Dict[str, Any]:
+        total = sum(self.rows.values())
+        name, count = self.rows.most_common(1)[0] if total else (None, 0)
+        report = {
+            'layout': name,
+            'confidence': round(count / total, 3) if total else 0.0,
+            'rows_by_layout': dict(self.rows),
+        }
+        if self.tables:
+            report['tables'] = len(self.tables)
+            report['tables_by_layout'] = dict(Counter(d.layout or 'per_row' for d in self.tables))
+            report['min_table_confidence'] = round(min(d.confidence for d in self.tables), 3)
+            report['row_fallbacks'] = self.row_fallbacks
+        return report
+
+
+def has_header_row(df: pd.DataFrame) -> bool:
+    """The first row is a header unless its first cell is a date"""
+    if df.empty:
+        return False
+    first = df.iat[0, 0]
+    return not cell_classifiers.is_date(str(first) if pd.notna(first) else '')
+
+
+# ---------- Column parsers, one per layout ----------
+# Each returns (valid rows, fields); fields hold whole columns. Descriptions
+# are categorised after truncation unless a 'category' column or the
+# 'category_from' text to categorise is given
+def _credit_or_debit(credit: np.ndarray, debit: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(valid, amount, type): credit wins when positive, else a positive debit"""
+    is_credit = credit > 0
+    is_debit = ~is_credit & (debit > 0)
+    amount = np.where(is_credit, credit, debit)
+    trans_type = np.where(is_credit, 'credit', 'debit').astype(object)
+    return is_credit | is_debit, amount, trans_type
+
+
+def _parse_new_bank(cells: Cells) -> Tuple[np.ndarray, Dict[str, Any]]:
+    valid, amount, trans_type = _credit_or_debit(amount_values(cells[6])[1], amount_values(cells[5])[1])
+    return valid & date_mask(cells[0]), {
+        'date_cells': cells[0], 'description': cells[1], 'limit': 150,
+        'amount': amount, 'type': trans_type,
+    }
+
+
+def _parse_indian_bank_6(cells: Cells) -> Tuple[np.ndarray, Dict[str, Any]]:
+    valid, amount, trans_type = _credit_or_debit(amount_values(cells[2])[1], amount_values(cells[3])[1])
+    description = np.where(cells[5] != '', cells[5], 'Transaction').astype(object)
+    return valid & date_mask(cells[0]), {
+        'date_cells': cells[0], 'description': description, 'limit': 150,
+        'amount': amount, 'type': trans_type,
+    }
+
+
+def _parse_indian_bank(cells: Cells) -> Tuple[np.ndarray, Dict[str, Any]]:
+    date_cells = np.where(cells[0] != '', cells[0], cells[1]).astype(object)
+    valid, amount, trans_type = _credit_or_debit(amount_values(cells[2])[1], amount_values(cells[3])[1])
+    return valid & date_mask(date_cells), {
+        'date_cells': date_cells, 'description': cells[5] if len(cells) > 5 else cells[4], 'limit': 100,
+        'amount': amount, 'type': trans_type,
+    }
+
+
+def _parse_csv_5(cells: Cells) -> Tuple[np.ndarray, Dict[str, Any]]:
+    is_amount, amount = amount_values(cells[2])
+    return is_amount & date_mask(cells[0]), {
+        'date_cells': cells[0], 'description': cells[1], 'limit': 100,
+        'amount': np.abs(amount), 'type': lowered(cells[3]), 'category': cells[4],
+    }
+
+
+def _parse_csv_4(cells: Cells) -> Tuple[np.ndarray, Dict[str, Any]]:
+    is_amount, amount = amount_values(cells[1])
+    return is_amount & date_mask(cells[0]), {
+        'date_cells': cells[0], 'description': cells[3], 'limit': 100,
+        'amount': np.abs(amount), 'type': lowered(cells[2]),
+        # Categorised before the description is cut short
+        'category_from': cells[3],
+    }
+
+
+LAYOUT_PARSERS = {
+    NEW_BANK: _parse_new_bank,
+    INDIAN_BANK_6: _parse_indian_bank_6,
+    INDIAN_BANK: _parse_indian_bank,
+    CSV_5: _parse_csv_5,
+    CSV_4: _parse_csv_4,
+}
+
+
+def _parse_layout(parse: Callable[[Cells], Tuple[np.ndarray, Dict[str, Any]]], cells: Cells,
+                  categorizer: KeywordCategorizer) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """(valid rows, their transactions) for the rows of one layout"""
+    valid, fields = parse(cells)
+    if not valid.any():
+        return valid, []
+
+    description = truncate(fields['description'][valid], fields['limit'])
+    if 'category' in fields:
+        category = fields['category'][valid].tolist()
+    elif 'category_from' in fields:
+        category = categorizer.categorize_many(fields['category_from'][valid])
+    else:
+        category = categorizer.categorize_many(description)
+
+    return valid, [
+        {
+            'id': 0,  # Will be assigned proper ID later
+            'date': date,
+            'description': text,
+            'amount': amount,
+            'type': trans_type,
+            'category': trans_category,
+            'frequency': 'irregular'
+        }
+        for date, text, amount, trans_type, trans_category in zip(
+            formatted_dates(fields['date_cells'][valid]), description, fields['amount'][valid].tolist(),
+            fields['type'][valid].tolist(), category)
+    ]
+
+
+def parse_cells(cells: Cells, layouts: np.ndarray, categorizer: KeywordCategorizer,
+                parse_row: Optional[Callable[[List[str]], Optional[Dict[str, Any]]]] = None,
+                ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Parse every row with its layout's column parser.
+    Returns (transactions in row order, {layout: transactions parsed with it}).
+
+    If a column parser fails on some cell, that layout's rows are handed to
+    parse_row one by one instead (a row it can't parse gives None), so a bad
+    cell only costs its own row; without parse_row the error is raised.
+    """
+    row_numbers = []
+    parsed = []
+    layout_counts = {}
+
+    for layout, parse in LAYOUT_PARSERS.items():
+        rows = np.flatnonzero(layouts == layout)
+        if not len(rows):
+            continue
+
+        try:
+            valid, transactions = _parse_layout(parse, [column[rows] for column in cells], categorizer)
+        except Exception as e:
+            if parse_row is None:
+                raise
+            log.warning("Column parser for %s failed (%s); parsing its %s rows one by one", layout, e, len(rows))
+            transactions = [parse_row([column[row] for column in cells]) for row in rows.tolist()]
+            valid = np.array([trans is not None for trans in transactions], dtype=bool)
+            transactions = [trans for trans in transactions if trans is not None]
+
+        layout_counts[layout] = int(valid.sum())
+        if transactions:
+            row_numbers.append(rows[valid])
+            parsed += transactions
+
+    if not row_numbers:
+        return [], layout_counts
+
+    order = np.argsort(np.concatenate(row_numbers), kind='stable').tolist()
+    return [parsed[i] for i in order], layout_counts
+
+
+def parse_frame(df: pd.DataFrame, categorizer: KeywordCategorizer,
+                parse_row: Optional[Callable[[List[str]], Optional[Dict[str, Any]]]] = None,
+                ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Parse a sheet as read by pandas (a header row, if any, is skipped).
+    Returns (transactions in row order, {layout: transactions parsed with it});
+    parse_row is the per-row fallback parse_cells uses.
+    """
+    if df.shape[1] < 3:
+        return [], {}
+    if has_header_row(df):
+        df = df.iloc[1:]
+
+    cells = frame_to_cells(df)
+    return parse_cells(cells, row_layouts(cells), categorizer, parse_row)
@@ -1,165 +1,237 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import os
+import uuid
+from contextlib import closing
+import logging
 import pdfplumber
 import pandas as pd
 import openpyxl
-import re
 from datetime import datetime, timedelta
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
 import warnings
+from pdf_extraction import iter_pages, default_worker_count
+import cell_classifiers
+from categorizer import TABLE_RULES, load_categorizer
+import table_layouts
+from upload_stream import NDJSON_MIMETYPE, wants_stream, iter_page_batches, iter_ndjson_upload
+from wire_format import (PayloadError, column_length, decode_columns, encode_response, not_acceptable_message,
+                         read_payload, response_mimetype)
+from app_logging import debug_sampled, get_logger
+from batch_forecast import forecast_histories, histories_from_json, histories_from_store, iter_csv, iter_ndjson
+from compression import compressor_from_env
+from etags import not_modified, strong_etag, tag, tagged
+from forecasting import (MAX_MONTHS_AHEAD, TARGETS, FeatureScaler, LinearModel, MonthlyTotals, clip_forecast,
+                         feature_matrix, horizon_dates, horizon_features, monthly_frame, monthly_frames,
+                         monthly_histories, predict_horizon, r2_score, target_arrays, valid_months_ahead)
+from model_cache import forecast_key, frames_fingerprint, model_cache_from_env
+from parse_cache import parse_cache_from_env, upload_key
+from upload_jobs import QueueFull, upload_job_queue_from_env
+from storage import encode_cursor, invalid_value, missing_field, page_args, store_from_env
 warnings.filterwarnings('ignore')
 
+# Per-row diagnostics are DEBUG; enable with LOG_LEVELS=test_app=DEBUG
+log = get_logger('test_app')
+
 app = Flask(__name__)
 CORS(app)
 
+# gzip/brotli for complete bodies of COMPRESS_MIN_BYTES and up
+compressor = compressor_from_env()
+
+@app.after_request
+def compress_response(response):
+    return compressor(request, response)
+
+# Processes used to extract PDF pages in parallel (1 = serial)
+app.config["PDF_EXTRACT_WORKERS"] = default_worker_count()
+
+# Keyword -> category automaton (CATEGORY_RULES_FILE overrides the built-in rules)
+table_categorizer = load_categorizer(TABLE_RULES)
+
+# Parsed uploads keyed by file hash; bump PARSER_VERSION whenever parsing output changes
+PARSER_VERSION = '1'
+parse_cache = parse_cache_from_env(dumps=app.json.dumps, loads=app.json.loads)
+
+def parse_cache_version():
+    """Parser version plus the category rules in force, which also shape the result"""
+    return f"test_app/{PARSER_VERSION}/{table_categorizer.fingerprint()}"
+
+# Transactions database (TRANSACTIONS_DB_PATH), opened on first use
+transaction_store = store_from_env()
+
+# Forecasts keyed by the monthly totals they were trained on; bump MODEL_VERSION
+# whenever the features, training or prediction change
+MODEL_VERSION = '2'
+# Persisted through Flask's JSON provider, as the parse cache is
+model_cache = model_cache_from_env(dumps=app.json.dumps, loads=app.json.loads)
+
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-def extract_transactions_from_pdf(file_path):
+# Statements parsed in the background for POST /api/upload/jobs (UPLOAD_JOB_WORKERS at a time)
+upload_jobs = upload_job_queue_from_env()
+
+def iter_transactions_from_pdf(file_path, on_page=None, layout_report=None):
     """
-    Extract transactions from Indian Bank PDF using pdfplumber
+    Stream transactions from Indian Bank PDF tables, page by page.
+    on_page(page_number, page_count) is called as each page is finished;
+    the layout picked for each table is recorded in layout_report.
     """
-    transactions = []
+    # Only the tables are parsed (text extraction is disabled below),
+    # so the page text is never laid out
+    pages = iter_pages(file_path, workers=app.config["PDF_EXTRACT_WORKERS"],
+                       include_text=False, on_page=on_page)
     
-    try:
-        with pdfplumber.open(file_path) as pdf:
-            print(f"Processing PDF with {len(pdf.pages)} pages")
-            
-            for page_num, page in enumerate(pdf.pages):
-                print(f"Processing page {page_num + 1}")
+    for page in pages:
+        page_num = page['page_number'] - 1
+        log.debug("Processing page %s", page_num + 1)
+        
+        # Try to extract tables first
+        tables = page['tables']
+        if tables:
+            log.debug("Found %s tables on page %s", len(tables), page_num + 1)
+            for table_num, table in enumerate(tables):
+                log.debug("Processing table %s with %s rows", table_num + 1, len(table))
                 
-                # Extract text from the page
-                text = page.extract_text()
-                if text:
-                    print(f"Extracted text from page {page_num + 1}: {len(text)} characters")
-                    
-                # Try to extract tables first
-                tables = page.extract_tables()
-                if tables:
-                    print(f"Found {len(tables)} tables on page {page_num + 1}")
-                    for table_num, table in enumerate(tables):
-                        print(f"Processing table {table_num + 1} with {len(table)} rows")
-                        
-                        for row_num, row in enumerate(table):
-                            print(f"RAW ROW {row_num}: {row}")
-                            print(f"Checking row {row_num}: {row}")
-                            if row and len(row) >= 3:  # Need at least 3 columns
-                                # Skip header rows
-                                if any(header in str(row[0] or '').lower() for header in 
-                                      ['date', 'particulars', 's.no', 'sr.no', 'transaction', 'remarks']):
-                                    print(f"Skipping header row: {row}")
-                                    continue
-                                
-                                print(f"Processing data row {row_num}: {row}")
-                                transaction = parse_transaction_row(row)
-                                if transaction:
-                                    transaction['id'] = len(transactions) + 1
-                                    transactions.append(transaction)
-                                    print(f"Added transaction: {transaction}")
-                                else:
-                                    print(f"Failed to parse row {row_num}: {row}")
-                            else:
-                                print(f"Skipping row {row_num} - insufficient columns ({len(row) if row else 0}): {row}")
+                data_rows = []
+                for row_num, row in enumerate(table):
+                    trace = debug_sampled(log)
+                    if trace:
+                        log.debug("Checking row %s: %s", row_num, row)
+                    if row and len(row) >= 3:  # Need at least 3 columns
+                        # Skip header rows
+                        if any(header in str(row[0] or '').lower() for header in 
+                              ['date', 'particulars', 's.no', 'sr.no', 'transaction', 'remarks']):
+                            if trace:
+                                log.debug("Skipping header row: %s", row)
+                            continue
+                        data_rows.append((row_num, row))
+                    else:
+                        if trace:
+                            log.debug("Skipping row %s - insufficient columns (%s): %s", row_num, len(row) if row else 0, row)
                 
-                # DISABLED: Only try text-based extraction if NO table transactions were found
-                # if not transactions and text:
-                #     text_transactions = extract_from_text_patterns(text, page_num)
-                #     transactions.extend(text_transactions)
+                yield from parse_table_rows(data_rows, layout_report)
+        
+        # DISABLED: Only try text-based extraction if NO table transactions were found
+        # if not transactions and text:
+        #     text_transactions = extract_from_text_patterns(text, page_num)
+        #     transactions.extend(text_transactions)
+
+def parse_table_rows(data_rows, layout_report=None):
+    """
+    Parse a table's (row_num, row) data rows. The layout is detected once from
+    a sample of rows and its row parser applied to the rest. Unless every
+    sampled row agreed, each row's own layout is checked before that parser
+    is used; rows of another width or layout, or that the chosen parser
+    rejects, are detected one by one.
+    """
+    decision = table_layouts.detect_layout([row for _, row in data_rows])
+    log.debug("Table layout: %s", decision.as_dict())
+    if layout_report is not None:
+        layout_report.add_table(decision)
+    
+    row_parser = ROW_PARSERS.get(decision.layout)
+    unanimous = decision.confidence == 1.0
+    for row_num, row in data_rows:
+        trace = debug_sampled(log)
+        if trace:
+            log.debug("Processing data row %s: %s", row_num, row)
+        transaction = None
+        layout = decision.layout
+        
+        clean_row = table_layouts.clean_row(row)
+        if row_parser and len(clean_row) == decision.width and sum(1 for cell in clean_row if cell) >= 3:
+            if unanimous or table_layouts.row_layout(clean_row) == decision.layout:
+                transaction = row_parser(clean_row)
+        
+        if transaction is None:
+            # Mixed-layout table, or a row the chosen parser can't read
+            if row_parser and layout_report is not None:
+                layout_report.row_fallbacks += 1
+            layout = None
+            transaction = parse_transaction_row(row)
+        
+        if transaction:
+            if layout_report is not None:
+                layout_report.add_rows(layout)
+            if trace:
+                log.debug("Added transaction: %s", transaction)
+            yield transaction
+        elif trace:
+            log.debug("Failed to parse row %s: %s", row_num, row)
+
+def extract_transactions_from_pdf(file_path, layout_report=None):
+    """
+    Extract transactions from Indian Bank PDF using pdfplumber
+    """
+    try:
+        # Remove duplicates and clean up
+        cleaned_transactions = remove_duplicates(
+            iter_transactions_from_pdf(file_path, layout_report=layout_report))
     
     except Exception as e:
-        print(f"Error processing PDF: {e}")
+        log.error("Error processing PDF: %s", e)
         return []
     
-    # Remove duplicates and clean up
-    cleaned_transactions = remove_duplicates(transactions)
-    print(f"Final extracted transactions: {len(cleaned_transactions)}")
+    log.info("Final extracted transactions: %s", len(cleaned_transactions))
     
     return cleaned_transactions
 
-def extract_transactions_from_excel(file_path):
+def extract_transactions_from_excel(file_path, layout_report=None):
     """
     Extract transactions from Excel (.xlsx, .xls) or CSV files
     """
     try:
-        transactions = []
-        print(f"Starting Excel processing for: {file_path}")
+        log.info("Starting Excel processing for: %s", file_path)
         
         # Determine file type and read accordingly
         file_extension = os.path.splitext(file_path.lower())[1]
         
         if file_extension == '.csv':
-            print("Processing CSV file")
+            log.debug("Processing CSV file")
             df = pd.read_csv(file_path, encoding='utf-8', on_bad_lines='skip')
         elif file_extension in ['.xlsx', '.xls']:
-            print(f"Processing Excel file: {file_extension}")
+            log.debug("Processing Excel file: %s", file_extension)
             # Try to read all sheets, take the first one with data
             excel_file = pd.ExcelFile(file_path)
             sheet_names = excel_file.sheet_names
-            print(f"Available sheets: {sheet_names}")
+            log.debug("Available sheets: %s", sheet_names)
             
             df = None
             for sheet in sheet_names:
                 temp_df = pd.read_excel(file_path, sheet_name=sheet, header=None)
                 if not temp_df.empty and len(temp_df.columns) >= 3:
                     df = temp_df
-                    print(f"Using sheet: {sheet}")
+                    log.debug("Using sheet: %s", sheet)
                     break
             
             if df is None or df.empty:
-                print("No valid sheet found with sufficient columns")
+                log.warning("No valid sheet found with sufficient columns")
                 return []
         else:
-            print(f"Unsupported file format: {file_extension}")
+            log.warning("Unsupported file format: %s", file_extension)
             return []
         
-        print(f"DataFrame shape: {df.shape}")
-        print(f"DataFrame columns: {df.columns.tolist()}")
-        
-        # Convert DataFrame to list of lists (similar to PDF table format)
-        rows = []
-        for index, row in df.iterrows():
-            row_list = [str(cell) if pd.notna(cell) else '' for cell in row.values]
-            rows.append(row_list)
-        
-        print(f"Total rows extracted: {len(rows)}")
-        
-        # Process rows using the same logic as PDF
-        for row_num, row in enumerate(rows):
-            if len(row) >= 3:  # Minimum columns needed
-                # Skip actual header row (only check first row and only if it looks like column names)
-                if row_num == 0:
-                    # Check if the first row contains column headers (not transaction data)
-                    # Headers typically don't have dates or amounts in the first position
-                    if (not is_date(row[0]) or 
-                        (row[0].lower() in ['date', 'transaction_date', 'posting_date'] and 
-                         row[1].lower() in ['description', 'particulars', 'reference', 'remarks'] and
-                         row[2].lower() in ['amount', 'debit', 'credit', 'withdrawal', 'deposit'])):
-                        print(f"Skipping header row {row_num}: {row}")
-                        continue
-                
-                print(f"Processing Excel row {row_num}: {row}")
-                transaction = parse_transaction_row(row)
-                if transaction:
-                    transaction['id'] = len(transactions) + 1
-                    transactions.append(transaction)
-                    print(f"Added Excel transaction: {transaction}")
-                else:
-                    print(f"Failed to parse Excel row {row_num}: {row}")
-            else:
-                print(f"Skipping Excel row {row_num} - insufficient columns ({len(row)}): {row}")
+        log.debug("DataFrame shape: %s", df.shape)
+        log.debug("DataFrame columns: %s", df.columns.tolist())
+        
+        # Parse whole columns at once; the layout checks parse_transaction_row
+        # makes per row are applied to each column in one pass, and it takes
+        # over the rows of a layout whose column parser fails
+        transactions, layout_counts = table_layouts.parse_frame(df, table_categorizer, parse_transaction_row)
+        log.info("Parsed %s Excel transactions by layout: %s", len(transactions), layout_counts)
+        if layout_report is not None:
+            for layout, count in layout_counts.items():
+                layout_report.add_rows(layout, count)
     
     except Exception as e:
-        print(f"Error processing Excel file: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error processing Excel file: %s", e)
         return []
     
     # Remove duplicates and clean up
     cleaned_transactions = remove_duplicates(transactions)
-    print(f"Final extracted Excel transactions: {len(cleaned_transactions)}")
+    log.info("Final extracted Excel transactions: %s", len(cleaned_transactions))
     
     return cleaned_transactions
 
@@ -167,79 +239,96 @@ def parse_transaction_row(row):
     """
     Parse a single transaction row from table data
     """
+    # Per-row diagnostics, sampled by LOG_DEBUG_SAMPLE
+    trace = debug_sampled(log)
     try:
         # Clean the row
         clean_row = [str(cell).strip().replace('\n', ' ') if cell else '' for cell in row]
-        print(f"Processing transaction row: {clean_row}")
+        if trace:
+            log.debug("Processing transaction row: %s", clean_row)
         
         # Skip empty rows
         non_empty_cells = [cell for cell in clean_row if cell]
         if len(non_empty_cells) < 3:
-            print(f"Row has insufficient data ({len(non_empty_cells)} non-empty cells)")
+            if trace:
+                log.debug("Row has insufficient data (%s non-empty cells)", len(non_empty_cells))
             return None
         
-        print(f"Row has {len(clean_row)} columns, determining format...")
+        if trace:
+            log.debug("Row has %s columns, determining format...", len(clean_row))
         
         # Auto-detect bank format based on row structure and content
         if len(clean_row) >= 8:
             # New format: [Date, Remarks, Tran Id-1, UTR Number, Instr. ID, Withdrawals, Deposits, Balance]
-            print("Detected NEW bank format (8+ columns)")
+            if trace:
+                log.debug("Detected NEW bank format (8+ columns)")
             return parse_new_bank_format(clean_row)
         elif len(clean_row) >= 6:
             # Check if this is Indian Bank format by looking at column structure
             # Indian Bank: [Value Date, Post Date, Credit Amount, Debit Amount, Closing Balance, Description]
             
-            print(f"CHECKING 6-COLUMN FORMAT:")
-            print(f"  Column 0 (should be date): '{clean_row[0]}' -> is_date: {is_date(clean_row[0])}")
-            print(f"  Column 1 (should be date): '{clean_row[1]}' -> is_date: {is_date(clean_row[1])}")
-            print(f"  Column 2 (credit amount): '{clean_row[2]}' -> is_amount: {is_amount(clean_row[2])}")
-            print(f"  Column 3 (debit amount): '{clean_row[3]}' -> is_amount: {is_amount(clean_row[3])}")
+            # The classifier calls in these arguments would run even when DEBUG is off
+            if trace:
+                log.debug("CHECKING 6-COLUMN FORMAT:")
+                log.debug("  Column 0 (should be date): '%s' -> is_date: %s", clean_row[0], is_date(clean_row[0]))
+                log.debug("  Column 1 (should be date): '%s' -> is_date: %s", clean_row[1], is_date(clean_row[1]))
+                log.debug("  Column 2 (credit amount): '%s' -> is_amount: %s", clean_row[2], is_amount(clean_row[2]))
+                log.debug("  Column 3 (debit amount): '%s' -> is_amount: %s", clean_row[3], is_amount(clean_row[3]))
             
             if (is_date(clean_row[0]) and is_date(clean_row[1]) and 
                 (is_amount(clean_row[2]) or clean_row[2] == '') and
                 (is_amount(clean_row[3]) or clean_row[3] == '')):
-                print("✓ DETECTED INDIAN BANK format (6 columns)")
+                if trace:
+                    log.debug("✓ DETECTED INDIAN BANK format (6 columns)")
                 return parse_indian_bank_6_column_format(clean_row)
             else:
-                print("✗ NOT Indian Bank 6-column format, trying 5-column format")
+                if trace:
+                    log.debug("✗ NOT Indian Bank 6-column format, trying 5-column format")
                 # Fallback to old 5-column Indian Bank format
-                print("Detected INDIAN BANK format (5+ columns)")
+                if trace:
+                    log.debug("Detected INDIAN BANK format (5+ columns)")
                 return parse_indian_bank_format(clean_row)
         elif len(clean_row) >= 5:
             # Check for CSV format: [Date, Description, Amount, Type, Category]
             if (is_date(clean_row[0]) and 
                 is_amount(clean_row[2]) and 
                 clean_row[3].lower() in ['credit', 'debit']):
-                print("Detected CSV format: [Date, Description, Amount, Type, Category]")
+                if trace:
+                    log.debug("Detected CSV format: [Date, Description, Amount, Type, Category]")
                 return parse_csv_format(clean_row)
             else:
                 # Old Indian Bank format: [Date, Date, Credit_Amount, Debit_Amount, Balance, Description]
-                print("Detected INDIAN BANK format (5+ columns)")
+                if trace:
+                    log.debug("Detected INDIAN BANK format (5+ columns)")
                 return parse_indian_bank_format(clean_row)
         elif len(clean_row) >= 4:
             # Check for 4-column CSV format: [Date, Amount, Type, Description]
             if (is_date(clean_row[0]) and 
                 is_amount(clean_row[1]) and 
                 clean_row[2].lower() in ['credit', 'debit']):
-                print("Detected 4-column CSV format: [Date, Amount, Type, Description]")
+                if trace:
+                    log.debug("Detected 4-column CSV format: [Date, Amount, Type, Description]")
                 return parse_4_column_csv_format(clean_row)
             else:
-                print("Unknown 4-column format")
+                if trace:
+                    log.debug("Unknown 4-column format")
                 return None
         else:
-            print(f"Unknown format - insufficient columns ({len(clean_row)})")
+            if trace:
+                log.debug("Unknown format - insufficient columns (%s)", len(clean_row))
             return None
         
     except Exception as e:
-        print(f"Error parsing transaction row: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error parsing transaction row: %s", e)
         return None
 
 def parse_indian_bank_6_column_format(clean_row):
     """Parse the 6-column Indian Bank statement format"""
+    # Per-row diagnostics, sampled by LOG_DEBUG_SAMPLE
+    trace = debug_sampled(log)
     try:
-        print(f"INDIAN BANK 6-COL: Parsing row with {len(clean_row)} columns: {clean_row}")
+        if trace:
+            log.debug("INDIAN BANK 6-COL: Parsing row with %s columns: %s", len(clean_row), clean_row)
         
         # Format: [Value Date, Post Date, Credit Amount, Debit Amount, Closing Balance, Description]
         # Index:     0          1          2             3             4               5
@@ -247,7 +336,8 @@ def parse_indian_bank_6_column_format(clean_row):
         # Extract date from Value Date (first column)
         date_str = clean_row[0]
         if not is_date(date_str):
-            print(f"INDIAN BANK 6-COL: Date validation failed for: {date_str}")
+            if trace:
+                log.debug("INDIAN BANK 6-COL: Date validation failed for: %s", date_str)
             return None
         
         # Extract amounts - Credit Amount (index 2) and Debit Amount (index 3)
@@ -256,11 +346,13 @@ def parse_indian_bank_6_column_format(clean_row):
         
         if len(clean_row) > 2 and clean_row[2] and is_amount(clean_row[2]):
             credit_amount = float(clean_amount(clean_row[2]))
-            print(f"INDIAN BANK 6-COL: Found credit amount: {credit_amount}")
+            if trace:
+                log.debug("INDIAN BANK 6-COL: Found credit amount: %s", credit_amount)
         
         if len(clean_row) > 3 and clean_row[3] and is_amount(clean_row[3]):
             debit_amount = float(clean_amount(clean_row[3]))
-            print(f"INDIAN BANK 6-COL: Found debit amount: {debit_amount}")
+            if trace:
+                log.debug("INDIAN BANK 6-COL: Found debit amount: %s", debit_amount)
         
         # Determine transaction type and amount
         if credit_amount > 0:
@@ -270,7 +362,8 @@ def parse_indian_bank_6_column_format(clean_row):
             amount = debit_amount
             amount_type = 'debit'
         else:
-            print(f"INDIAN BANK 6-COL: No valid amount found in row")
+            if trace:
+                log.debug("INDIAN BANK 6-COL: No valid amount found in row")
             return None
         
         # Extract description (last column - index 5)
@@ -293,24 +386,27 @@ def parse_indian_bank_6_column_format(clean_row):
             'frequency': 'irregular'
         }
         
-        print(f"INDIAN BANK 6-COL: Successfully extracted transaction: {transaction}")
+        if trace:
+            log.debug("INDIAN BANK 6-COL: Successfully extracted transaction: %s", transaction)
         return transaction
         
     except Exception as e:
-        print(f"INDIAN BANK 6-COL: Error parsing: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("INDIAN BANK 6-COL: Error parsing: %s", e)
         return None
 
 def parse_new_bank_format(clean_row):
     """Parse the new bank statement format"""
+    # Per-row diagnostics, sampled by LOG_DEBUG_SAMPLE
+    trace = debug_sampled(log)
     try:
-        print(f"NEW FORMAT: Parsing row with {len(clean_row)} columns: {clean_row}")
+        if trace:
+            log.debug("NEW FORMAT: Parsing row with %s columns: %s", len(clean_row), clean_row)
         
         # Extract date (first column)
         date_str = clean_row[0]
         if not is_date(date_str):
-            print(f"NEW FORMAT: Date validation failed for: {date_str}")
+            if trace:
+                log.debug("NEW FORMAT: Date validation failed for: %s", date_str)
             return None
         
         # Extract description from Remarks column (index 1)
@@ -322,11 +418,13 @@ def parse_new_bank_format(clean_row):
         
         if len(clean_row) > 5 and clean_row[5] and is_amount(clean_row[5]):
             withdrawal_amount = float(clean_amount(clean_row[5]))
-            print(f"NEW FORMAT: Found withdrawal amount: {withdrawal_amount}")
+            if trace:
+                log.debug("NEW FORMAT: Found withdrawal amount: %s", withdrawal_amount)
         
         if len(clean_row) > 6 and clean_row[6] and is_amount(clean_row[6]):
             deposit_amount = float(clean_amount(clean_row[6]))
-            print(f"NEW FORMAT: Found deposit amount: {deposit_amount}")
+            if trace:
+                log.debug("NEW FORMAT: Found deposit amount: %s", deposit_amount)
         
         # Determine transaction type and amount
         if deposit_amount > 0:
@@ -336,7 +434,8 @@ def parse_new_bank_format(clean_row):
             amount = withdrawal_amount
             amount_type = 'debit'
         else:
-            print(f"NEW FORMAT: No valid amount found in row")
+            if trace:
+                log.debug("NEW FORMAT: No valid amount found in row")
             return None
         
         # Clean up description
@@ -354,17 +453,18 @@ def parse_new_bank_format(clean_row):
             'frequency': 'irregular'
         }
         
-        print(f"NEW FORMAT: Successfully extracted transaction: {transaction}")
+        if trace:
+            log.debug("NEW FORMAT: Successfully extracted transaction: %s", transaction)
         return transaction
         
     except Exception as e:
-        print(f"NEW FORMAT: Error parsing: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("NEW FORMAT: Error parsing: %s", e)
         return None
 
 def parse_indian_bank_format(clean_row):
     """Parse the previous Indian Bank format"""
+    # Per-row diagnostics, sampled by LOG_DEBUG_SAMPLE
+    trace = debug_sampled(log)
     try:
         # Extract date (first column)
         date_str = clean_row[0] if clean_row[0] else clean_row[1]
@@ -415,15 +515,18 @@ def parse_indian_bank_format(clean_row):
             'frequency': 'irregular'
         }
         
-        print(f"Extracted INDIAN BANK transaction: {transaction}")
+        if trace:
+            log.debug("Extracted INDIAN BANK transaction: %s", transaction)
         return transaction
         
     except Exception as e:
-        print(f"Error parsing Indian Bank format: {e}")
+        log.error("Error parsing Indian Bank format: %s", e)
         return None
 
 def parse_csv_format(clean_row):
     """Parse CSV format: [Date, Description, Amount, Type, Category]"""
+    # Per-row diagnostics, sampled by LOG_DEBUG_SAMPLE
+    trace = debug_sampled(log)
     try:
         # Extract date (first column)
         date_str = clean_row[0]
@@ -471,17 +574,18 @@ def parse_csv_format(clean_row):
             'frequency': 'irregular'
         }
         
-        print(f"Extracted CSV transaction: {transaction}")
+        if trace:
+            log.debug("Extracted CSV transaction: %s", transaction)
         return transaction
         
     except Exception as e:
-        print(f"Error parsing CSV format: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error parsing CSV format: %s", e)
         return None
 
 def parse_4_column_csv_format(clean_row):
     """Parse 4-column CSV format: [Date, Amount, Type, Description]"""
+    # Per-row diagnostics, sampled by LOG_DEBUG_SAMPLE
+    trace = debug_sampled(log)
     try:
         # Extract date (first column)
         date_str = clean_row[0]
@@ -529,15 +633,23 @@ def parse_4_column_csv_format(clean_row):
             'frequency': 'irregular'
         }
         
-        print(f"Extracted 4-column CSV transaction: {transaction}")
+        if trace:
+            log.debug("Extracted 4-column CSV transaction: %s", transaction)
         return transaction
         
     except Exception as e:
-        print(f"Error parsing 4-column CSV format: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error parsing 4-column CSV format: %s", e)
         return None
 
+# Row parser for each layout table_layouts can detect
+ROW_PARSERS = {
+    table_layouts.NEW_BANK: parse_new_bank_format,
+    table_layouts.INDIAN_BANK_6: parse_indian_bank_6_column_format,
+    table_layouts.INDIAN_BANK: parse_indian_bank_format,
+    table_layouts.CSV_5: parse_csv_format,
+    table_layouts.CSV_4: parse_4_column_csv_format,
+}
+
 def extract_from_text_patterns(text, page_num):
     """
     Extract transactions from raw text using regex patterns
@@ -545,17 +657,12 @@ def extract_from_text_patterns(text, page_num):
     transactions = []
     lines = text.split('\n')
     
-    print(f"Trying text-based extraction on page {page_num}")
+    log.debug("Trying text-based extraction on page %s", page_num)
     
     for line_num, line in enumerate(lines):
         # Pattern for Indian Bank: Date Description Amount
-        patterns = [
-            r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\s+(.+?)\s+(\d+(?:,\d{3})*\.?\d*)',
-            r'(\d{1,2}\s+\w{3}\s+\d{4})\s+(.+?)\s+(\d+(?:,\d{3})*\.?\d*)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, line.strip())
+        for pattern in cell_classifiers.STATEMENT_LINE_PATTERNS:
+            match = pattern.search(line.strip())
             if match:
                 date_str, description, amount_str = match.groups()
                 
@@ -570,158 +677,98 @@ def extract_from_text_patterns(text, page_num):
                 }
                 
                 transactions.append(transaction)
-                print(f"Text extracted: {transaction}")
+                if debug_sampled(log):
+                    log.debug("Text extracted: %s", transaction)
                 break
     
     return transactions
 
 def is_date(text):
     """Check if text looks like a date (with or without timestamp)"""
-    if not text:
-        return False
-    
-    # Clean the text - remove newlines, extra spaces, and normalize spaces
-    cleaned_text = text.replace('\n', '').strip()
-    # Remove multiple spaces and replace with single space, then remove spaces around slashes
-    cleaned_text = re.sub(r'\s+', ' ', cleaned_text)  # Multiple spaces -> single space
-    cleaned_text = re.sub(r'\s*/\s*', '/', cleaned_text)  # Remove spaces around slashes
-    cleaned_text = re.sub(r'\s*-\s*', '-', cleaned_text)  # Remove spaces around dashes
-    
-    date_patterns = [
-        r'^\d{1,2}/\d{1,2}/\d{2,4}$',              # DD/MM/YYYY
-        r'^\d{1,2}-\d{1,2}-\d{2,4}$',              # DD-MM-YYYY  
-        r'^\d{1,2}/\d{1,2}/\d{2,4}\s+\d{1,2}:\d{2}(:\d{2})?$',  # DD/MM/YYYY HH:MM:SS or DD/MM/YYYY HH:MM
-        r'^\d{1,2}-\d{1,2}-\d{2,4}\s+\d{1,2}:\d{2}(:\d{2})?$',  # DD-MM-YYYY HH:MM:SS
-        r'^\d{1,2}\w{3}\d{4}$',                    # DDMMMYYYY (no spaces)
-        r'^\d{1,2}\s+\w{3}\s+\d{4}$',             # DD MMM YYYY (with spaces)
-        r'^\d{4}/\d{1,2}/\d{1,2}$',               # YYYY/MM/DD
-        r'^\d{4}-\d{1,2}-\d{1,2}$',               # YYYY-MM-DD
-        r'^\d{4}/\d{1,2}/\d{1,2}\s+\d{1,2}:\d{2}(:\d{2})?$',  # YYYY/MM/DD HH:MM:SS
-        r'^\d{4}-\d{1,2}-\d{1,2}\s+\d{1,2}:\d{2}(:\d{2})?$',  # YYYY-MM-DD HH:MM:SS
-    ]
-    
-    result = any(re.match(pattern, cleaned_text) for pattern in date_patterns)
-    print(f"IS_DATE: '{text}' -> '{cleaned_text}' -> {result}")
+    result = cell_classifiers.is_date(text)
+    if debug_sampled(log):
+        log.debug("IS_DATE: '%s' -> %s", text, result)
     return result
 
 def is_amount(text):
     """Check if text looks like an amount"""
-    if not text:
-        return False
-    
-    # Remove currency symbols and commas
-    cleaned = re.sub(r'[₹,\s]', '', text.strip())
-    
-    try:
-        float(cleaned)
-        return len(cleaned) > 0
-    except ValueError:
-        return False
+    return cell_classifiers.is_amount(text)
 
 def clean_amount(text):
     """Clean amount string for parsing"""
-    return re.sub(r'[₹,\s]', '', text.strip())
+    return cell_classifiers.clean_amount(text)
 
 def format_date(date_str):
     """Format date string to YYYY-MM-DD (strip time if present)"""
-    try:
-        # Clean the date string - remove newlines, extra spaces, and normalize
-        cleaned_date = date_str.replace('\n', ' ').strip()
-        # Remove multiple spaces and replace with single space
-        cleaned_date = re.sub(r'\s+', ' ', cleaned_date)
-        # Remove spaces around slashes and dashes
-        cleaned_date = re.sub(r'\s*/\s*', '/', cleaned_date)
-        cleaned_date = re.sub(r'\s*-\s*', '-', cleaned_date)
-        
-        # Extract just the date part if there's a timestamp
-        # Look for patterns like "DD/MM/YYYY HH:MM:SS" and extract "DD/MM/YYYY"
-        date_match = re.match(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', cleaned_date)
-        if date_match:
-            date_part = date_match.group(1)
-        else:
-            date_part = cleaned_date
-        
-        print(f"FORMAT_DATE: Input='{date_str}' -> Cleaned='{cleaned_date}' -> DatePart='{date_part}'")
-        
-        # Handle DD/MM/YYYY or DD-MM-YYYY
-        if re.match(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', date_part):
-            if '/' in date_part:
-                parts = date_part.split('/')
-            else:
-                parts = date_part.split('-')
-            
-            day, month, year = parts
-            
-            if len(year) == 2:
-                year = '20' + year
-            
-            # Ensure proper padding
-            day = day.zfill(2)
-            month = month.zfill(2)
-            
-            formatted_date = f"{year}-{month}-{day}"
-            print(f"FORMAT_DATE: Formatted as: {formatted_date}")
-            return formatted_date
-        
-        # Handle DD MMM YYYY
-        elif re.match(r'\d{1,2}\s*\w{3}\s*\d{4}', date_part):
-            # Handle possible spaces or lack thereof
-            parts = re.split(r'\s+', date_part.replace('\n', ' ').strip())
-            if len(parts) >= 3:
-                day, month_str, year = parts[0], parts[1], parts[2]
-                
-                month_map = {
-                    'jan': '01', 'feb': '02', 'mar': '03', 'apr': '04',
-                    'may': '05', 'jun': '06', 'jul': '07', 'aug': '08',
-                    'sep': '09', 'oct': '10', 'nov': '11', 'dec': '12'
-                }
-                
-                month = month_map.get(month_str.lower()[:3], '01')
-                return f"{year}-{month}-{day.zfill(2)}"
-        
-        return datetime.now().strftime('%Y-%m-%d')
-        
-    except Exception as e:
-        print(f"Error formatting date '{date_str}': {e}")
+    formatted_date = cell_classifiers.normalize_date(date_str)
+    if formatted_date is None:
+        if debug_sampled(log):
+            log.debug("Could not format date '%s', using today", date_str)
         return datetime.now().strftime('%Y-%m-%d')
+    
+    if debug_sampled(log):
+        log.debug("FORMAT_DATE: Input='%s' -> Formatted as: %s", date_str, formatted_date)
+    return formatted_date
 
 def detect_category(description):
     """Auto-detect transaction category"""
-    desc_lower = description.lower()
-    
-    if any(word in desc_lower for word in ['upi', 'gpay', 'paytm', 'phonepe', 'bhim']):
-        return 'Digital Payment'
-    elif any(word in desc_lower for word in ['atm', 'cash withdrawal', 'cwd']):
-        return 'Cash Withdrawal'
-    elif any(word in desc_lower for word in ['salary', 'sal']):
-        return 'Salary'
-    elif any(word in desc_lower for word in ['interest', 'int']):
-        return 'Interest'
-    else:
-        return 'Others'
+    return table_categorizer.categorize(description)
 
-def remove_duplicates(transactions):
-    """Remove duplicate transactions"""
+def iter_unique_transactions(transactions):
+    """Streaming stage: drop duplicate transactions and assign sequential IDs"""
     seen = set()
-    unique = []
     
     for trans in transactions:
         key = (trans['date'], trans['amount'], trans['description'][:20])
         if key not in seen:
             seen.add(key)
-            trans['id'] = len(unique) + 1
-            unique.append(trans)
-    
-    return unique
+            trans['id'] = len(seen)
+            yield trans
+
+def remove_duplicates(transactions):
+    """Remove duplicate transactions"""
+    return list(iter_unique_transactions(transactions))
 
 @app.route("/api/health", methods=["GET"])
 def health_check():
     return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
 
+@app.route("/api/stats", methods=["GET"])
+def parser_stats():
+    return jsonify({'date_cache': cell_classifiers.date_cache_stats(),
+                    'parse_cache': parse_cache.stats(),
+                    'model_cache': model_cache.stats(),
+                    'upload_jobs': upload_jobs.stats()})
+
 @app.route("/api/test", methods=["GET"])
 def test_endpoint():
     return jsonify({'message': 'Flask backend is working!', 'timestamp': datetime.now().isoformat()})
 
+def transactions_page_response(user_id):
+    """
+    JSON list of one page of the user's transactions, with X-Next-Cursor if
+    more follow. Tagged with the user's data version and the query, so an
+    unchanged page is a 304 without reading it.
+    """
+    try:
+        user_id = int(user_id)
+        query = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    etag = strong_etag('transactions', user_id, transaction_store.data_version(user_id),
+                       sorted(request.args.items(multi=True)))
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    
+    transactions, next_key = transaction_store.page(user_id, **query)
+    response = jsonify(transactions)
+    response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor'
+    if next_key is not None:
+        response.headers['X-Next-Cursor'] = encode_cursor(*next_key)
+    return tag(response, etag)
+
 @app.route("/api/transactions", methods=["GET"])
 def get_transactions():
     """
@@ -732,24 +779,26 @@ def get_transactions():
         if not user_id:
             return jsonify({'error': 'User ID is required'}), 400
         
-        # This would typically query the database for user-specific transactions
-        # For now, return empty array - you can connect to your actual database
-        return jsonify([])
+        return transactions_page_response(user_id)
     except Exception as e:
-        print(f"Error fetching transactions: {e}")
+        log.error("Error fetching transactions: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route("/api/transactions/<user_id>", methods=["GET"])
 def get_user_transactions(user_id):
     """
-    Get all transactions for a specific user
+    Get transactions for a specific user, ordered by date.
+    
+    Without ?limit the whole history comes back. With ?limit=N the list is
+    one page, and the X-Next-Cursor header (absent on the last page) is sent
+    back as ?cursor= for the next one. Filters: date_from and date_to
+    (YYYY-MM-DD, inclusive), type, category, frequency; ?order=desc for
+    newest first.
     """
     try:
-        # This would typically query the database for user-specific transactions
-        # For now, return empty array - you can connect to your actual database
-        return jsonify([])
+        return transactions_page_response(user_id)
     except Exception as e:
-        print(f"Error fetching user transactions: {e}")
+        log.error("Error fetching user transactions: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route("/api/transactions", methods=["POST"])
@@ -759,35 +808,31 @@ def save_transaction():
     """
     try:
         transaction_data = request.json
-        print(f"Saving transaction: {transaction_data}")
+        log.debug("Saving transaction: %s", transaction_data)
         
         if not transaction_data:
             return jsonify({'error': 'No transaction data provided'}), 400
         
         # Validate required fields
-        required_fields = ['user_id', 'date', 'description', 'amount', 'type', 'frequency']
-        for field in required_fields:
-            if field not in transaction_data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        field = missing_field(transaction_data)
+        if field:
+            return jsonify({'error': f'Missing required field: {field}'}), 400
+        problem = invalid_value(transaction_data)
+        if problem:
+            return jsonify({'error': problem}), 400
         
-        # Here you would typically save to your database
-        # For now, we'll simulate success
-        print(f"Transaction would be saved: {transaction_data}")
+        saved_transaction = transaction_store.insert(transaction_data)
+        log.debug("Transaction saved: %s", saved_transaction)
         
-        # Return success response with a mock ID
         response_data = {
             'success': True,
-            'transaction': {
-                **transaction_data,
-                'id': len(str(transaction_data)) + 1,  # Mock ID
-                'created_at': datetime.now().isoformat()
-            }
+            'transaction': saved_transaction
         }
         
         return jsonify(response_data)
     
     except Exception as e:
-        print(f"Error saving transaction: {e}")
+        log.error("Error saving transaction: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route("/api/transactions/batch", methods=["POST"])
@@ -797,29 +842,24 @@ def save_transactions_batch():
     """
     try:
         transactions_data = request.json.get('transactions', [])
-        print(f"Saving {len(transactions_data)} transactions in batch")
+        log.info("Saving %s transactions in batch", len(transactions_data))
         
         if not transactions_data:
             return jsonify({'error': 'No transactions provided'}), 400
         
-        # Process each transaction
-        saved_transactions = []
+        # Validate every transaction before anything is written
         for i, transaction_data in enumerate(transactions_data):
-            # Validate required fields
-            required_fields = ['user_id', 'date', 'description', 'amount', 'type', 'frequency']
-            for field in required_fields:
-                if field not in transaction_data:
-                    return jsonify({'error': f'Missing required field "{field}" in transaction {i+1}'}), 400
-            
-            # Here you would typically save to your database
-            saved_transaction = {
-                **transaction_data,
-                'id': i + 1000,  # Mock ID
-                'created_at': datetime.now().isoformat()
-            }
-            saved_transactions.append(saved_transaction)
+            field = missing_field(transaction_data)
+            if field:
+                return jsonify({'error': f'Missing required field "{field}" in transaction {i+1}'}), 400
+            problem = invalid_value(transaction_data)
+            if problem:
+                return jsonify({'error': f'{problem} (transaction {i+1})'}), 400
+        
+        # One database transaction for the whole batch
+        saved_transactions = transaction_store.insert_many(transactions_data)
         
-        print(f"Successfully processed {len(saved_transactions)} transactions")
+        log.info("Successfully processed %s transactions", len(saved_transactions))
         
         return jsonify({
             'success': True,
@@ -828,95 +868,293 @@ def save_transactions_batch():
         })
     
     except Exception as e:
-        print(f"Error saving transactions batch: {e}")
+        log.error("Error saving transactions batch: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route("/api/transactions/import", methods=["POST"])
+def import_transactions():
+    """
+    Idempotent bulk import of a statement's transactions for one user.
+    Rows already stored (same date, amount and description) are skipped, so
+    overlapping statements can be imported again safely.
+    """
+    try:
+        data = request.json or {}
+        user_id = data.get('user_id')
+        transactions_data = data.get('transactions', [])
+        
+        if user_id is None:
+            return jsonify({'error': 'User ID is required'}), 400
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'User ID must be an integer'}), 400
+        if not transactions_data:
+            return jsonify({'error': 'No transactions provided'}), 400
+        
+        for i, transaction_data in enumerate(transactions_data):
+            field = missing_field({**transaction_data, 'user_id': user_id})
+            if field:
+                return jsonify({'error': f'Missing required field "{field}" in transaction {i+1}'}), 400
+            problem = invalid_value({**transaction_data, 'user_id': user_id})
+            if problem:
+                return jsonify({'error': f'{problem} (transaction {i+1})'}), 400
+        
+        result = transaction_store.import_transactions(user_id, transactions_data)
+        log.info("Imported %s transactions for user %s: %s inserted, %s skipped, %s conflicting",
+                 len(transactions_data), user_id, result['inserted'], result['skipped'], result['conflicting'])
+        
+        return jsonify({'success': True, **result})
+    
+    except Exception as e:
+        log.error("Error importing transactions: %s", e)
         return jsonify({'error': str(e)}), 500
 
+def upload_batches(filepath, filename_lower, layout_report, on_progress=None):
+    """
+    (transactions, progress) batches of an uploaded file: one per PDF page, or chunks of sheet rows;
+    on_progress is passed on to iter_page_batches
+    """
+    def produce(on_page):
+        if filename_lower.endswith('.pdf'):
+            return iter_unique_transactions(
+                iter_transactions_from_pdf(filepath, on_page=on_page, layout_report=layout_report))
+        return extract_transactions_from_excel(filepath, layout_report)
+    
+    return iter_page_batches(produce, on_progress=on_progress)
+
+def upload_path(filename):
+    """
+    Where an upload is saved: a name of its own, so concurrent uploads of files
+    with the same name don't collide; the extension stays, as the readers go by it
+    """
+    return os.path.join(UPLOAD_FOLDER, uuid.uuid4().hex + os.path.splitext(filename)[1].lower())
+
+def remove_upload(filepath):
+    """Delete an uploaded file once it has been parsed (one already gone is fine)"""
+    try:
+        os.remove(filepath)
+        log.debug("Temporary file cleaned up")
+    except OSError as e:
+        log.warning("Could not delete temporary file %s: %s", filepath, e)
+
+def stream_upload(filepath, filename_lower):
+    """
+    NDJSON body for a streamed upload: transaction chunks as pages finish, then
+    a summary. The caller removes the file once the response is closed.
+    """
+    layout_report = table_layouts.LayoutReport()
+    
+    yield from iter_ndjson_upload(upload_batches(filepath, filename_lower, layout_report),
+                                  lambda: {'layout': layout_report.as_dict()})
+
+def run_upload_job(job, filepath, filename_lower, cache_key):
+    """
+    Body of a background upload job: the /api/upload result, with progress
+    reported to the job page by page
+    """
+    cached = parse_cache.get(cache_key)
+    if cached is not None:
+        job.report(len(cached['transactions']), {})
+        return {'success': True, 'transactions': cached['transactions'], 'count': len(cached['transactions']),
+                'layout': cached['layout'], 'cache': 'hit'}
+    
+    layout_report = table_layouts.LayoutReport()
+    transactions = []
+    # Closed on cancellation too, which stops the page extraction
+    # Progress (and the cancel check) comes in per page, including pages without transactions
+    with closing(upload_batches(filepath, filename_lower, layout_report,
+                                lambda progress: job.report(0, progress))) as batches:
+        for batch, progress in batches:
+            transactions.extend(batch)
+            job.report(len(batch), progress)
+    
+    if transactions:
+        parse_cache.put(cache_key, {'transactions': transactions, 'layout': layout_report.as_dict()})
+    return {'success': True, 'transactions': transactions, 'count': len(transactions),
+            'layout': layout_report.as_dict(), 'cache': 'miss'}
+
 @app.route("/api/upload", methods=["POST"])
 def upload_and_process():
     try:
-        print("=== UPLOAD REQUEST RECEIVED ===")
-        print(f"Request method: {request.method}")
-        print(f"Request files: {request.files}")
-        print(f"Request form: {request.form}")
+        log.info("=== UPLOAD REQUEST RECEIVED ===")
+        log.debug("Request method: %s", request.method)
+        log.debug("Request files: %s", request.files)
+        log.debug("Request form: %s", request.form)
         
         if 'file' not in request.files:
-            print("ERROR: No 'file' key in request.files")
+            log.warning("No 'file' key in request.files")
             return jsonify({'error': 'No file provided'}), 400
         
         file = request.files['file']
-        print(f"File object: {file}")
-        print(f"Filename: {file.filename}")
+        log.debug("File object: %s", file)
+        log.debug("Filename: %s", file.filename)
         
         if file.filename == '':
-            print("ERROR: Empty filename")
+            log.warning("Empty filename")
             return jsonify({'error': 'No file selected'}), 400
         
         # Check file extension
         filename_lower = file.filename.lower()
         supported_extensions = ['.pdf', '.xlsx', '.xls', '.csv']
         if not any(filename_lower.endswith(ext) for ext in supported_extensions):
-            print(f"ERROR: Invalid file type: {file.filename}")
+            log.warning("Invalid file type: %s", file.filename)
             return jsonify({'error': 'Supported file types: PDF, Excel (.xlsx, .xls), CSV'}), 400
         
+        # A file that has been parsed before is answered without touching the disk
+        if not wants_stream(request):
+            # JSON, or columnar MessagePack for clients that Accept it
+            mimetype = response_mimetype(request)
+            if mimetype is None:
+                return jsonify({'error': not_acceptable_message()}), 406
+            
+            cache_key = upload_key(file, parse_cache_version())
+            cached = parse_cache.get(cache_key)
+            if cached is not None:
+                log.info("=== PARSE CACHE HIT: %s transactions ===", len(cached['transactions']))
+                return encode_response({
+                    'success': True,
+                    'transactions': cached['transactions'],
+                    'count': len(cached['transactions']),
+                    'layout': cached['layout'],
+                    'cache': 'hit'
+                }, mimetype)
+        
         # Save the uploaded file
-        filename = file.filename
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        print(f"Saving file to: {filepath}")
+        filepath = upload_path(file.filename)
+        log.debug("Saving file to: %s", filepath)
         file.save(filepath)
-        print(f"File saved successfully: {filepath}")
+        log.debug("File saved successfully: %s", filepath)
         
         # Check file size
         file_size = os.path.getsize(filepath)
-        print(f"File size: {file_size} bytes")
+        log.debug("File size: %s bytes", file_size)
         
         # Determine file type and process accordingly
         filename_lower = file.filename.lower()
+        
+        # ?stream=1 or Accept: application/x-ndjson sends rows as pages finish
+        if wants_stream(request):
+            log.info("=== STREAMING UPLOAD RESPONSE ===")
+            response = Response(stream_upload(filepath, filename_lower), mimetype=NDJSON_MIMETYPE,
+                                headers={'X-Accel-Buffering': 'no'})
+            # Runs once the server is done with the body, even if it was never read
+            response.call_on_close(lambda: remove_upload(filepath))
+            return response
+        
+        # Which layout(s) the rows were parsed with, for the response
+        layout_report = table_layouts.LayoutReport()
+        
         if filename_lower.endswith('.pdf'):
-            print("=== STARTING PDF PROCESSING ===")
-            transactions = extract_transactions_from_pdf(filepath)
-            print(f"=== PDF PROCESSING COMPLETE: {len(transactions)} transactions ===")
+            log.info("=== STARTING PDF PROCESSING ===")
+            transactions = extract_transactions_from_pdf(filepath, layout_report)
+            log.info("=== PDF PROCESSING COMPLETE: %s transactions ===", len(transactions))
         elif filename_lower.endswith(('.xlsx', '.xls', '.csv')):
-            print("=== STARTING EXCEL/CSV PROCESSING ===")
-            transactions = extract_transactions_from_excel(filepath)
-            print(f"=== EXCEL/CSV PROCESSING COMPLETE: {len(transactions)} transactions ===")
+            log.info("=== STARTING EXCEL/CSV PROCESSING ===")
+            transactions = extract_transactions_from_excel(filepath, layout_report)
+            log.info("=== EXCEL/CSV PROCESSING COMPLETE: %s transactions ===", len(transactions))
         else:
-            print(f"ERROR: Unsupported file type: {file.filename}")
-            os.remove(filepath)
+            log.warning("Unsupported file type: %s", file.filename)
+            remove_upload(filepath)
             return jsonify({'error': 'Unsupported file type'}), 400
         
         # Clean up the uploaded file
-        try:
-            os.remove(filepath)
-            print("Temporary file cleaned up")
-        except PermissionError as pe:
-            print(f"Warning: Could not delete temporary file {filepath}: {pe}")
-            # File is still in use, but processing completed successfully
-            pass
+        remove_upload(filepath)
         
-        return jsonify({
+        # Empty results are left out, so a failed parse is retried next time
+        if transactions:
+            parse_cache.put(cache_key, {'transactions': transactions, 'layout': layout_report.as_dict()})
+        
+        return encode_response({
             'success': True,
             'transactions': transactions,
-            'count': len(transactions)
-        })
+            'count': len(transactions),
+            'layout': layout_report.as_dict(),
+            'cache': 'miss'
+        }, mimetype)
+        
+    except Exception as e:
+        log.exception("Error in upload_and_process: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route("/api/upload/jobs", methods=["POST"])
+def submit_upload_job():
+    """
+    Queue a statement for parsing in the background (see upload_jobs).
+    Answers 202 straight away with the job id; poll GET /api/upload/jobs/<id>
+    for progress and the result, or DELETE it to cancel.
+    """
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        filename_lower = file.filename.lower()
+        if not filename_lower.endswith(('.pdf', '.xlsx', '.xls', '.csv')):
+            return jsonify({'error': 'Supported file types: PDF, Excel (.xlsx, .xls), CSV'}), 400
+        
+        cache_key = upload_key(file, parse_cache_version())
+        filepath = upload_path(file.filename)
+        file.save(filepath)
         
+        try:
+            job = upload_jobs.submit(file.filename,
+                                     lambda job: run_upload_job(job, filepath, filename_lower, cache_key),
+                                     cleanup=lambda: remove_upload(filepath))
+        except QueueFull as e:
+            remove_upload(filepath)
+            return jsonify({'error': str(e)}), 503
+        
+        status_url = f'/api/upload/jobs/{job.id}'
+        response = jsonify({'success': True, **job.as_dict(), 'status_url': status_url})
+        response.status_code = 202
+        response.headers['Location'] = status_url
+        return response
+    
     except Exception as e:
-        print(f"ERROR in upload_and_process: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error queueing upload job: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route("/api/upload/jobs/<job_id>", methods=["GET"])
+def get_upload_job(job_id):
+    """
+    Progress of an upload job: status (queued, running, done, failed,
+    cancelled), pages_done / page_count for PDFs and the transactions found
+    so far; a done job also carries the /api/upload result
+    """
+    mimetype = response_mimetype(request)
+    if mimetype is None:
+        return jsonify({'error': not_acceptable_message()}), 406
+    
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown upload job'}), 404
+    return encode_response(job.as_dict(), mimetype)
+
+@app.route("/api/upload/jobs/<job_id>", methods=["DELETE"])
+def cancel_upload_job(job_id):
+    """Cancel an upload job; a running one stops at its next page"""
+    job = upload_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown upload job'}), 404
+    return jsonify(job.as_dict(include_result=False)), 202
+
 def prepare_transaction_data_for_ml(transactions_data):
     """
     Prepare transaction data for machine learning prediction
     """
     try:
-        print(f"Preparing ML data for {len(transactions_data)} transactions")
-        
         if not transactions_data:
             return None, None
             
-        # Convert to DataFrame
+        # Convert to DataFrame (from rows, or from columns posted as in wire_format)
         df = pd.DataFrame(transactions_data)
+        log.debug("Preparing ML data for %s transactions", len(df))
+        if df.empty:
+            return None, None
         
         # Convert date to datetime
         df['date'] = pd.to_datetime(df['date'])
@@ -925,76 +1163,53 @@ def prepare_transaction_data_for_ml(transactions_data):
         df['type'] = df['type'].str.lower()
         df['frequency'] = df['frequency'].str.lower()
         
-        print(f"Transaction types found: {df['type'].unique()}")
-        print(f"Transaction frequencies found: {df['frequency'].unique()}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Transaction types found: %s", df['type'].unique())
+            log.debug("Transaction frequencies found: %s", df['frequency'].unique())
         
         # Extract year-month for grouping
         df['year_month'] = df['date'].dt.to_period('M')
         
-        # Separate all transactions by type
-        income_df = df[df['type'] == 'credit'].copy()
-        expense_df = df[df['type'] == 'debit'].copy()
-        
-        # Separate regular transactions (frequency == 'regular')
-        regular_income_df = income_df[income_df['frequency'] == 'regular'].copy()
-        regular_expense_df = expense_df[expense_df['frequency'] == 'regular'].copy()
+        if log.isEnabledFor(logging.DEBUG):
+            counts = df.groupby(['type', 'frequency']).size()
+            log.debug("Transactions by type and frequency: %s", counts.to_dict())
         
-        print(f"Regular income transactions: {len(regular_income_df)}")
-        print(f"Regular expense transactions: {len(regular_expense_df)}")
-        print(f"Total income transactions: {len(income_df)}")
-        print(f"Total expense transactions: {len(expense_df)}")
+        # Monthly totals, all transactions and regular (frequency == 'regular') only
+        monthly_df, regular_monthly_df = monthly_frames(df)
         
-        # Group by month and calculate totals
-        monthly_data = []
-        regular_monthly_data = []
+        if log.isEnabledFor(logging.DEBUG):
+            for month in regular_monthly_df.itertuples():
+                log.debug("Month %s: Regular Income=%s, Regular Expense=%s, Regular Savings=%s", month.year_month, month.income, month.expense, month.savings)
         
-        # Get all unique months
-        all_months = df['year_month'].unique()
-        
-        for month in all_months:
-            # All transactions
-            month_income = income_df[income_df['year_month'] == month]['amount'].sum()
-            month_expense = expense_df[expense_df['year_month'] == month]['amount'].sum()
-            month_savings = month_income - month_expense
-            
-            # Regular transactions only
-            regular_month_income = regular_income_df[regular_income_df['year_month'] == month]['amount'].sum()
-            regular_month_expense = regular_expense_df[regular_expense_df['year_month'] == month]['amount'].sum()
-            regular_month_savings = regular_month_income - regular_month_expense
-            
-            print(f"Month {month}: Regular Income={regular_month_income}, Regular Expense={regular_month_expense}, Regular Savings={regular_month_savings}")
-            
-            monthly_data.append({
-                'year_month': month,
-                'income': month_income,
-                'expense': month_expense,
-                'savings': month_savings,
-                'month_numeric': month.month,
-                'year': month.year
-            })
-            
-            regular_monthly_data.append({
-                'year_month': month,
-                'income': regular_month_income,
-                'expense': regular_month_expense,
-                'savings': regular_month_savings,
-                'month_numeric': month.month,
-                'year': month.year
-            })
+        log.info("Prepared %s monthly data points for ML", len(monthly_df))
+        log.info("Prepared %s regular monthly data points for ML", len(regular_monthly_df))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Regular monthly data sample: %s", regular_monthly_df.head() if len(regular_monthly_df) > 0 else 'No regular data')
+        return monthly_df, regular_monthly_df
         
-        monthly_df = pd.DataFrame(monthly_data)
-        monthly_df = monthly_df.sort_values('year_month')
+    except Exception as e:
+        log.error("Error preparing ML data: %s", e)
+        return None, None
+
+def prepare_monthly_data_from_store(user_id):
+    """
+    The frames prepare_transaction_data_for_ml builds, read from the stored
+    monthly_aggregates rollup instead of a posted transaction list
+    """
+    try:
+        _, totals = next(monthly_histories(transaction_store.monthly_history([user_id])), (None, None))
+        if totals is None:
+            return None, None
         
-        regular_monthly_df = pd.DataFrame(regular_monthly_data)
-        regular_monthly_df = regular_monthly_df.sort_values('year_month')
+        year_month = pd.PeriodIndex(totals.year_month, freq='M')
+        monthly_df = monthly_frame(year_month, totals.income, totals.expense)
+        regular_monthly_df = monthly_frame(year_month, totals.regular_income, totals.regular_expense)
         
-        print(f"Prepared {len(monthly_df)} monthly data points for ML")
-        print(f"Prepared {len(regular_monthly_df)} regular monthly data points for ML")
-        print(f"Regular monthly data sample: {regular_monthly_df.head() if len(regular_monthly_df) > 0 else 'No regular data'}")
+        log.info("Read %s monthly data points for user %s from the rollup", len(monthly_df), user_id)
         return monthly_df, regular_monthly_df
         
     except Exception as e:
-        print(f"Error preparing ML data: {e}")
+        log.error("Error reading monthly totals: %s", e)
         return None, None
 
 def create_ml_features(monthly_df):
@@ -1003,146 +1218,90 @@ def create_ml_features(monthly_df):
     """
     try:
         if len(monthly_df) < 3:
-            print("Insufficient data for ML (need at least 3 months)")
+            log.warning("Insufficient data for ML (need at least 3 months)")
             return None, None
             
-        # Create features (X) and targets (y)
-        features = []
-        targets = {'income': [], 'expense': [], 'savings': []}
+        # Features: [month_sequence, month_of_year, recent_income_trend, recent_expense_trend]
+        # where the trends average the two months before (the months so far, for the first two)
+        X = feature_matrix(monthly_df)
+        y = target_arrays(monthly_df)
         
-        # Use sequential month numbers as primary feature
-        monthly_df = monthly_df.reset_index(drop=True)
-        
-        for i in range(len(monthly_df)):
-            # Features: [month_sequence, month_of_year, recent_trend]
-            month_sequence = i + 1
-            month_of_year = monthly_df.iloc[i]['month_numeric']
-            
-            # Calculate recent trend (average of last 2-3 months)
-            if i >= 2:
-                recent_income_trend = monthly_df.iloc[max(0, i-2):i]['income'].mean()
-                recent_expense_trend = monthly_df.iloc[max(0, i-2):i]['expense'].mean()
-            else:
-                recent_income_trend = monthly_df.iloc[:i+1]['income'].mean()
-                recent_expense_trend = monthly_df.iloc[:i+1]['expense'].mean()
-            
-            features.append([
-                month_sequence,
-                month_of_year,
-                recent_income_trend,
-                recent_expense_trend
-            ])
-            
-            targets['income'].append(monthly_df.iloc[i]['income'])
-            targets['expense'].append(monthly_df.iloc[i]['expense'])
-            targets['savings'].append(monthly_df.iloc[i]['savings'])
-        
-        X = np.array(features)
-        y = {
-            'income': np.array(targets['income']),
-            'expense': np.array(targets['expense']),
-            'savings': np.array(targets['savings'])
-        }
-        
-        print(f"Created features: {X.shape}, targets: {len(y)}")
+        log.info("Created features: %s, targets: %s", X.shape, len(y))
         return X, y
         
     except Exception as e:
-        print(f"Error creating ML features: {e}")
+        log.error("Error creating ML features: %s", e)
         return None, None
 
 def train_prediction_models(X, y):
     """
-    Train machine learning models for income, expense, and savings prediction
+    Train the income and expense regression in one least-squares solve;
+    savings is predicted as income minus expense
     """
     try:
-        models = {}
-        scalers = {}
-        
         # Scale features
-        scaler = StandardScaler()
+        scaler = FeatureScaler()
         X_scaled = scaler.fit_transform(X)
         
-        # Train separate models for income, expense, and savings
-        for target_type in ['income', 'expense', 'savings']:
-            model = LinearRegression()
-            model.fit(X_scaled, y[target_type])
-            models[target_type] = model
-            
-            print(f"Trained {target_type} model, score: {model.score(X_scaled, y[target_type]):.3f}")
+        # Income and expense are fitted together. Savings is income - expense in
+        # every month, so its own fit would just be the difference of the two
+        model = LinearModel().fit(X_scaled, np.column_stack([y['income'], y['expense']]))
         
-        scalers['feature_scaler'] = scaler
+        if log.isEnabledFor(logging.INFO):
+            predicted = model.predict(X_scaled)
+            predicted = np.column_stack([predicted, predicted[:, 0] - predicted[:, 1]])
+            scores = r2_score(np.column_stack([y[target] for target in TARGETS]).astype(float), predicted)
+            for target_type, score in zip(TARGETS, scores):
+                log.info("Trained %s model, score: %.3f", target_type, score)
         
-        return models, scalers
+        return model, scaler
         
     except Exception as e:
-        print(f"Error training ML models: {e}")
+        log.error("Error training ML models: %s", e)
         return None, None
 
-def predict_future_values(models, scalers, last_month_data, months_ahead=6):
+def predict_future_values(model, scaler, last_month_data, months_ahead=6):
     """
     Predict future income, expense, and savings for the next N months
     """
     try:
-        print(f"=== PREDICTING FUTURE VALUES ===")
-        print(f"Models available: {list(models.keys()) if models else 'None'}")
-        print(f"Last month data shape: {last_month_data.shape if last_month_data is not None else 'None'}")
-        print(f"Last month data sample:\n{last_month_data.tail(2) if last_month_data is not None and len(last_month_data) > 0 else 'No data'}")
+        log.debug("=== PREDICTING FUTURE VALUES ===")
+        log.debug("Model available: %s", model is not None)
+        log.debug("Last month data shape: %s", last_month_data.shape if last_month_data is not None else 'None')
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Last month data sample:\n%s", last_month_data.tail(2) if last_month_data is not None and len(last_month_data) > 0 else 'No data')
         
         predictions = []
         
-        # Get the last month info
-        last_sequence = len(last_month_data)
-        current_date = datetime.now()
-        
-        for i in range(1, months_ahead + 1):
-            # Calculate future date
-            future_date = current_date + timedelta(days=30 * i)
-            future_month = future_date.month
-            future_year = future_date.year
-            
-            # Calculate recent trends (use last available data)
-            recent_income_trend = last_month_data['income'].tail(3).mean()
-            recent_expense_trend = last_month_data['expense'].tail(3).mean()
-            
-            # Create features for prediction
-            future_features = np.array([[
-                last_sequence + i,
-                future_month,
-                recent_income_trend,
-                recent_expense_trend
-            ]])
-            
-            # Scale features
-            future_features_scaled = scalers['feature_scaler'].transform(future_features)
-            
-            # Make predictions
-            print(f"Making prediction for month {i}, future_features: {future_features}")
-            print(f"future_features_scaled: {future_features_scaled}")
-            predicted_income = max(0, models['income'].predict(future_features_scaled)[0])
-            predicted_expense = max(0, models['expense'].predict(future_features_scaled)[0])
-            predicted_savings = predicted_income - predicted_expense
-            
-            print(f"RAW predictions - Income: {models['income'].predict(future_features_scaled)[0]}, Expense: {models['expense'].predict(future_features_scaled)[0]}")
-            print(f"FINAL predictions - Income: {predicted_income}, Expense: {predicted_expense}, Savings: {predicted_savings}")
-            
+        # Feature rows for the whole horizon, scored in one call
+        future_dates = horizon_dates(datetime.now(), months_ahead)
+        raw_predictions = predict_horizon(model, scaler, last_month_data, future_dates)
+        predicted = clip_forecast(raw_predictions)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("future_features:\n%s", horizon_features(last_month_data, future_dates))
+            log.debug("RAW predictions (income, expense):\n%s", raw_predictions)
+            log.debug("FINAL predictions (income, expense, savings):\n%s", predicted)
+        
+        # Rounded all at once, the same as round(value, 2) on each numpy value
+        for future_date, (income, expense, savings) in zip(future_dates, np.round(predicted, 2).tolist()):
+            month_name = future_date.strftime('%B')
             predictions.append({
-                'future_date': f"{future_date.strftime('%B')} {future_year}",
-                'month': future_date.strftime('%B'),
-                'year': future_year,
-                'income_expected': round(predicted_income, 2),
-                'expense_expected': round(predicted_expense, 2),
-                'savings_expected': round(predicted_savings, 2)
+                'future_date': f"{month_name} {future_date.year}",
+                'month': month_name,
+                'year': future_date.year,
+                'income_expected': income,
+                'expense_expected': expense,
+                'savings_expected': savings
             })
         
-        print(f"Generated {len(predictions)} future predictions")
+        log.info("Generated %s future predictions", len(predictions))
         return predictions
         
     except Exception as e:
-        print(f"Error making predictions: {e}")
+        log.error("Error making predictions: %s", e)
         return []
 
-def predict_regular_future_values(models, scalers, last_month_data, months_ahead=6):
+def predict_regular_future_values(model, scaler, last_month_data, months_ahead=6):
     """
     Predict future regular income, expense, and savings for the next N months
     Using complex ML models with fallback to simple trend analysis
@@ -1150,71 +1309,49 @@ def predict_regular_future_values(models, scalers, last_month_data, months_ahead
     try:
         predictions = []
         
-        # Get the last month info
-        last_sequence = len(last_month_data)
         current_date = datetime.now()
+        future_dates = horizon_dates(current_date, months_ahead)
         
         # Check if we have enough data and the ML model is producing reasonable results
         use_ml_model = True
         
-        for i in range(1, months_ahead + 1):
-            # Calculate future date
-            future_date = current_date + timedelta(days=30 * i)
-            future_month = future_date.month
-            future_year = future_date.year
+        try:
+            # Feature rows for the whole horizon, scored in one call
+            raw_predictions = predict_horizon(model, scaler, last_month_data, future_dates)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("ML Features:\n%s", horizon_features(last_month_data, future_dates))
             
-            if use_ml_model:
-                try:
-                    # Calculate recent trends (use last available data)
-                    recent_income_trend = last_month_data['income'].tail(3).mean()
-                    recent_expense_trend = last_month_data['expense'].tail(3).mean()
-                    
-                    # Create features for prediction
-                    future_features = np.array([[
-                        last_sequence + i,
-                        future_month,
-                        recent_income_trend,
-                        recent_expense_trend
-                    ]])
-                    
-                    print(f"ML Features for month {i}: {future_features}")
-                    
-                    # Scale features
-                    future_features_scaled = scalers['feature_scaler'].transform(future_features)
-                    print(f"Scaled features: {future_features_scaled}")
-                    
-                    # Make predictions using complex ML models
-                    predicted_income = max(0, models['income'].predict(future_features_scaled)[0])
-                    predicted_expense = max(0, models['expense'].predict(future_features_scaled)[0])
-                    
-                    # Check if ML predictions are reasonable (not zero income and reasonable expense)
-                    if predicted_income < 100 or predicted_expense > predicted_income * 2:
-                        print(f"ML predictions seem unreasonable for regular transactions, falling back to trend analysis")
-                        use_ml_model = False
-                        # Fall back to trend analysis for this and remaining predictions
-                        break
-                    
-                    predicted_savings = predicted_income - predicted_expense
-                    
-                    print(f"ML Predictions for month {i}: Income={predicted_income:.2f}, Expense={predicted_expense:.2f}, Savings={predicted_savings:.2f}")
-                    
-                    predictions.append({
-                        'future_date': f"{future_date.strftime('%B')} {future_year}",
-                        'month': future_date.strftime('%B'),
-                        'year': future_year,
-                        'predicted_income': round(predicted_income, 2),
-                        'predicted_expense': round(predicted_expense, 2),
-                        'predicted_savings': round(predicted_savings, 2)
-                    })
-                    
-                except Exception as e:
-                    print(f"ML prediction failed for month {i}: {e}")
-                    use_ml_model = False
-                    break
+            predicted = clip_forecast(raw_predictions)
+            
+            # Check if ML predictions are reasonable (not zero income and reasonable expense);
+            # one unreasonable month sends the whole horizon to trend analysis
+            unreasonable = (predicted[:, 0] < 100) | (predicted[:, 1] > predicted[:, 0] * 2)
+            if unreasonable.any():
+                log.warning("ML predictions seem unreasonable for regular transactions (month %s), falling back to trend analysis", int(unreasonable.argmax()) + 1)
+                use_ml_model = False
+            
+        except Exception as e:
+            log.warning("ML prediction failed: %s", e)
+            use_ml_model = False
+        
+        if use_ml_model:
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("ML Predictions (income, expense, savings):\n%s", predicted)
+            
+            for future_date, (income, expense, savings) in zip(future_dates, np.round(predicted, 2).tolist()):
+                month_name = future_date.strftime('%B')
+                predictions.append({
+                    'future_date': f"{month_name} {future_date.year}",
+                    'month': month_name,
+                    'year': future_date.year,
+                    'predicted_income': income,
+                    'predicted_expense': expense,
+                    'predicted_savings': savings
+                })
         
         # If ML model failed or produced unreasonable results, use trend analysis
         if not use_ml_model:
-            print("Falling back to trend-based analysis for regular predictions")
+            log.info("Falling back to trend-based analysis for regular predictions")
             
             # Clear previous predictions if any
             predictions = []
@@ -1239,8 +1376,8 @@ def predict_regular_future_values(models, scalers, last_month_data, months_ahead
                 income_trend = 0
                 expense_trend = 0
             
-            print(f"Trend Analysis - Average income: {avg_income}, Average expense: {avg_expense}")
-            print(f"Income trend: {income_trend}, Expense trend: {expense_trend}")
+            log.debug("Trend Analysis - Average income: %s, Average expense: %s", avg_income, avg_expense)
+            log.debug("Income trend: %s, Expense trend: %s", income_trend, expense_trend)
             
             for i in range(1, months_ahead + 1):
                 future_date = current_date + timedelta(days=30 * i)
@@ -1251,7 +1388,7 @@ def predict_regular_future_values(models, scalers, last_month_data, months_ahead
                 predicted_expense = max(0, avg_expense + (expense_trend * i))
                 predicted_savings = predicted_income - predicted_expense
                 
-                print(f"Trend Prediction for month {i}: Income={predicted_income:.2f}, Expense={predicted_expense:.2f}, Savings={predicted_savings:.2f}")
+                log.debug("Trend Prediction for month %s: Income=%.2f, Expense=%.2f, Savings=%.2f", i, predicted_income, predicted_expense, predicted_savings)
                 
                 predictions.append({
                     'future_date': f"{future_date.strftime('%B')} {future_year}",
@@ -1262,45 +1399,94 @@ def predict_regular_future_values(models, scalers, last_month_data, months_ahead
                     'predicted_savings': round(predicted_savings, 2)
                 })
         
-        print(f"Generated {len(predictions)} regular future predictions using {'complex ML models' if use_ml_model else 'trend analysis'}")
+        log.info("Generated %s regular future predictions using %s", len(predictions), 'complex ML models' if use_ml_model else 'trend analysis')
         return predictions
         
     except Exception as e:
-        print(f"Error making regular predictions: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error making regular predictions: %s", e)
         return []
 
 @app.route('/api/test-connection', methods=['GET'])
 def test_connection():
-    print("=== TEST CONNECTION CALLED ===")
+    log.info("=== TEST CONNECTION CALLED ===")
     return jsonify({'message': 'Flask server is working', 'port': 5001})
 
-@app.route('/api/predict-future', methods=['POST'])
+@app.route('/api/predict-future', methods=['GET', 'POST'])
 def predict_future_financial_values():
     """
-    API endpoint to predict future income, expenses, and savings
+    API endpoint to predict future income, expenses, and savings.
+    GET ?user_id=&months_ahead= forecasts a stored user, like a POSTed user_id.
+    Only the GET forecast carries an ETag (the user's data version plus
+    horizon, day and format), checked before any frame is built:
+    If-None-Match with it gets a 304 without training anything. A POST can't
+    be answered with a 304, so clients that revalidate use the GET.
     """
     try:
-        print("=== FUTURE PREDICTION REQUEST RECEIVED ===")
-        print("Endpoint /api/predict-future called")
-        
-        # Get transaction data from request
-        request_data = request.get_json()
+        log.info("=== FUTURE PREDICTION REQUEST RECEIVED ===")
+        log.debug("Endpoint /api/predict-future called")
+        
+        # JSON, or MessagePack for clients that Accept it
+        mimetype = response_mimetype(request)
+        if mimetype is None:
+            return jsonify({'success': False, 'error': not_acceptable_message()}), 406
+        
+        # Get transaction data from request: the transactions themselves, or a
+        # user_id whose stored history is read from the monthly rollup. The body
+        # may be MessagePack, and the transactions rows or columns (see wire_format)
+        if request.method == 'GET':
+            request_data = request.args.to_dict()
+            if 'months_ahead' in request_data:
+                request_data['months_ahead'] = request.args.get('months_ahead', type=int)
+        else:
+            try:
+                request_data = read_payload(request)
+            except PayloadError as e:
+                return jsonify({'success': False, 'error': str(e)}), e.status
         
-        if not request_data or 'transactions' not in request_data:
+        if not request_data or ('transactions' not in request_data and 'user_id' not in request_data):
             return jsonify({
                 'success': False,
-                'error': 'Transaction data required for prediction'
+                'error': 'Transaction data or user_id required for prediction'
             }), 400
         
-        transactions = request_data['transactions']
         months_ahead = request_data.get('months_ahead', 6)  # Default to 6 months
-        
-        print(f"Received {len(transactions)} transactions for prediction")
+        if not valid_months_ahead(months_ahead):
+            return jsonify({
+                'success': False,
+                'error': f'months_ahead must be a whole number from 1 to {MAX_MONTHS_AHEAD}'
+            }), 400
+
+        # Predicted months count from today, so the day is part of every forecast's identity
+        today = datetime.now().date().isoformat()
+        etag = None
         
         # Prepare data for ML (both all transactions and regular only)
-        monthly_df, regular_monthly_df = prepare_transaction_data_for_ml(transactions)
+        if 'transactions' in request_data:
+            transactions = request_data['transactions']
+            if isinstance(transactions, dict):
+                try:
+                    transactions = decode_columns(transactions)
+                except ValueError as e:
+                    return jsonify({'success': False, 'error': f'transactions: {e}'}), 400
+                log.info("Received %s transactions (columns) for prediction", column_length(transactions))
+            else:
+                log.info("Received %s transactions for prediction", len(transactions))
+            monthly_df, regular_monthly_df = prepare_transaction_data_for_ml(transactions)
+        else:
+            # Numbers, or digit strings from a query; not bools, as in the batch route
+            user_id = request_data['user_id']
+            try:
+                user_id = int(None if isinstance(user_id, bool) else user_id)
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'error': 'user_id must be an integer'}), 400
+            log.info("Predicting from stored monthly totals for user %s", user_id)
+            if request.method == 'GET':
+                etag = strong_etag('forecast', user_id, transaction_store.data_version(user_id), months_ahead,
+                                   MODEL_VERSION, today, mimetype)
+                unchanged = not_modified(request, etag, ('Accept',))
+                if unchanged is not None:
+                    return unchanged
+            monthly_df, regular_monthly_df = prepare_monthly_data_from_store(user_id)
         if monthly_df is None or len(monthly_df) < 3:
             return jsonify({
                 'success': False,
@@ -1309,6 +1495,14 @@ def predict_future_financial_values():
                 'regular_predictions': []
             }), 400
         
+        # Same totals, horizon and day: reuse the forecast
+        cache_key = forecast_key(frames_fingerprint((monthly_df, regular_monthly_df)), months_ahead,
+                                 MODEL_VERSION, today)
+        cached = model_cache.get(cache_key)
+        if cached is not None:
+            log.info("Serving forecast from the model cache")
+            return tagged(encode_response({'success': True, **cached, 'cache': 'hit'}, mimetype), etag)
+        
         # Create ML features for all transactions
         X, y = create_ml_features(monthly_df)
         if X is None:
@@ -1320,8 +1514,8 @@ def predict_future_financial_values():
             }), 400
         
         # Train models for all transactions
-        models, scalers = train_prediction_models(X, y)
-        if models is None:
+        model, scaler = train_prediction_models(X, y)
+        if model is None:
             return jsonify({
                 'success': False,
                 'error': 'Unable to train prediction models',
@@ -1330,7 +1524,7 @@ def predict_future_financial_values():
             }), 400
         
         # Make predictions for all transactions using complex ML models
-        predictions = predict_future_values(models, scalers, monthly_df, months_ahead)
+        predictions = predict_future_values(model, scaler, monthly_df, months_ahead)
         
         # Convert field names from main predictions format to expected format
         main_predictions = []
@@ -1353,10 +1547,10 @@ def predict_future_financial_values():
             X_regular, y_regular = create_ml_features(regular_monthly_df)
             if X_regular is not None:
                 # Train models for regular transactions
-                regular_models, regular_scalers = train_prediction_models(X_regular, y_regular)
-                if regular_models is not None:
+                regular_model, regular_scaler = train_prediction_models(X_regular, y_regular)
+                if regular_model is not None:
                     # Make predictions for regular transactions
-                    regular_predictions = predict_regular_future_values(regular_models, regular_scalers, regular_monthly_df, months_ahead)
+                    regular_predictions = predict_regular_future_values(regular_model, regular_scaler, regular_monthly_df, months_ahead)
         
         # Calculate model accuracy info
         model_info = {
@@ -1369,23 +1563,64 @@ def predict_future_financial_values():
             }
         }
         
-        return jsonify({
-            'success': True,
+        forecast = {
             'predictions': predictions,
             'regular_predictions': regular_predictions,
             'model_info': model_info
-        })
+        }
+        model_cache.put(cache_key, forecast)
+        
+        return tagged(encode_response({'success': True, **forecast, 'cache': 'miss'}, mimetype), etag)
         
     except Exception as e:
-        print(f"Error in prediction endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error in prediction endpoint: %s", e)
         return jsonify({
             'success': False,
             'error': str(e),
             'predictions': []
         }), 500
 
+@app.route('/api/predict-future/batch', methods=['POST'])
+def predict_future_batch():
+    """
+    Forecasts for many users in one request, for nightly projection jobs.
+    Body: {"user_ids": [...]} to forecast stored users from the monthly rollup,
+    or {"users": [{"user_id", "year_month": [...], "income": [...], "expense": [...],
+    "regular_income": [...], "regular_expense": [...]}]} with the monthly totals
+    inline; optional "months_ahead". Streams one NDJSON record per user, in the
+    /api/predict-future response shape, or CSV rows with ?format=csv.
+    """
+    request_data = request.get_json(silent=True) or {}
+    months_ahead = request_data.get('months_ahead', 6)
+    if not valid_months_ahead(months_ahead):
+        return jsonify({'success': False,
+                        'error': f'months_ahead must be a whole number from 1 to {MAX_MONTHS_AHEAD}'}), 400
+    
+    output = request.args.get('format', 'ndjson')
+    if output not in ('ndjson', 'csv'):
+        return jsonify({'success': False, 'error': 'format must be ndjson or csv'}), 400
+    
+    if isinstance(request_data.get('users'), list):
+        try:
+            histories = histories_from_json(request_data['users'])
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+    elif isinstance(request_data.get('user_ids'), list):
+        user_ids = request_data['user_ids']
+        if not all(isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in user_ids):
+            return jsonify({'success': False, 'error': 'user_ids must be a list of integers'}), 400
+        stored = dict(histories_from_store(transaction_store, user_ids))
+        # Users without stored months still get a record, reporting too little history
+        histories = [(user_id, stored.get(user_id, MonthlyTotals([], [], []))) for user_id in user_ids]
+    else:
+        return jsonify({'success': False, 'error': 'users or user_ids required'}), 400
+    
+    dates, forecasts = forecast_histories(histories, months_ahead)
+    log.info("Batch forecast for %s users, %s months ahead", len(forecasts), months_ahead)
+    if output == 'csv':
+        return Response(iter_csv(forecasts, dates), mimetype='text/csv')
+    return Response(iter_ndjson(forecasts, dates), mimetype=NDJSON_MIMETYPE)
+
 if __name__ == "__main__":
-    print("Starting minimal Flask app...")
+    log.info("Starting minimal Flask app...")
     app.run(debug=True, port=5001)
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Background upload jobs: statements parsed on a local worker pool instead of
+in the request thread.
+
+POST /api/upload/jobs saves the file and answers 202 with a job id at once.
+GET /api/upload/jobs/<id> reports progress (pages done, transactions found
+so far) and, once the job is done, the same result /api/upload returns.
+DELETE /api/upload/jobs/<id> cancels it: a queued job never starts, a
+running one stops at its next page (or chunk of sheet rows).
+
+At most UPLOAD_JOB_WORKERS statements parse at a time; the rest wait their
+turn. Each worker is a thread, and PDF pages are still extracted in the
+process pool pdf_extraction uses, so parsing doesn't hold up the request
+threads. Finished jobs are kept for UPLOAD_JOB_TTL seconds, then forgotten.
+
+  UPLOAD_JOB_WORKERS=2         statements parsed at once
+  UPLOAD_JOB_MAX_PENDING=32    queued + running jobs accepted (more are refused)
+  UPLOAD_JOB_TTL=3600          seconds a finished job and its result are kept
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app_logging import get_logger
+
+log = get_logger('upload_jobs')
+
+WORKERS_ENV = 'UPLOAD_JOB_WORKERS'
+MAX_PENDING_ENV = 'UPLOAD_JOB_MAX_PENDING'
+TTL_ENV = 'UPLOAD_JOB_TTL'
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 32
+DEFAULT_TTL = 3600.0
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's run function once the job has been cancelled"""
+
+
+class QueueFull(Exception):
+    """Raised by submit() when UPLOAD_JOB_MAX_PENDING jobs are already queued or running"""
+
+
+class UploadJob:
+    """State of one upload job; updated by its worker, read by the polling requests"""
+
+    def __init__(self, job_id: str, filename: str):
+        self.id = job_id
+        self.filename = filename
+        self.status = QUEUED
+        self.pages_done = 0
+        self.page_count: Optional[int] = None
+        self.count = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancel_requested = threading.Event()
+
+    def report(self, transactions: int, progress: Dict[str, Any]) -> None:
+        """
+        Record a finished batch of transactions and its progress record
+        (upload_stream.iter_page_batches); raises JobCancelled once the job
+        has been cancelled, so the run function stops there
+        """
+        self.count += transactions
+        if 'pages_done' in progress:
+            self.pages_done = progress['pages_done']
+            self.page_count = progress['page_count']
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+
+    def finish(self, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        self.result = result
+        self.error = error
+        self.finished = time.time()
+        self.status = status
+
+    def as_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        """The job as GET /api/upload/jobs/<id> reports it; a done job's result keys are merged in"""
+        now = time.time()
+        job = {
+            'job_id': self.id,
+            'status': self.status,
+            'filename': self.filename,
+            'pages_done': self.pages_done,
+            'page_count': self.page_count,
+            'count': self.count,
+            'queued_seconds': round((self.started or self.finished or now) - self.created, 3),
+            'elapsed_seconds': round((self.finished or now) - self.started, 3) if self.started else None,
+        }
+        if self.error is not None:
+            job['error'] = self.error
+        if include_result and self.result is not None:
+            job.update(self.result)
+        return job
+
+
+class UploadJobQueue:
+    """Upload jobs run on a bounded thread pool, looked up by id"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_pending: int = DEFAULT_MAX_PENDING,
+                 ttl: float = DEFAULT_TTL):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload-job')
+        self._jobs: 'OrderedDict[str, UploadJob]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, filename: str, run: Callable[[UploadJob], Dict[str, Any]],
+               cleanup: Optional[Callable[[], None]] = None) -> UploadJob:
+        """
+        Queue run(job), which returns the job's result and calls job.report()
+        as it goes. cleanup() runs afterwards however the job ends, even if it
+        was cancelled before it started. Raises QueueFull.
+        """
+        with self._lock:
+            self._prune(time.time())
+            if self._pending() >= self.max_pending:
+                raise QueueFull(f'{self.max_pending} upload jobs are already queued or running')
+            job = UploadJob(uuid.uuid4().hex, filename)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, run, cleanup)
+        log.info("Upload job %s queued: %s", job.id, filename)
+        return job
+
+    def _run(self, job: UploadJob, run: Callable[[UploadJob], Dict[str, Any]],
+             cleanup: Optional[Callable[[], None]]) -> None:
+        try:
+            with self._lock:
+                # Cancelled while it was waiting: cancel() has already finished it
+                if job.status != QUEUED:
+                    return
+                job.started = time.time()
+                job.status = RUNNING
+            result = run(job)
+            if job.cancel_requested.is_set():
+                raise JobCancelled()
+            job.finish(DONE, result=result)
+            log.info("Upload job %s done: %s transactions in %.1fs", job.id, job.count,
+                     job.finished - job.started)
+        except JobCancelled:
+            job.finish(CANCELLED)
+            log.info("Upload job %s cancelled", job.id)
+        except Exception as e:
+            log.exception("Upload job %s failed: %s", job.id, e)
+            job.finish(FAILED, error=str(e))
+        finally:
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except OSError as e:
+                    log.warning("Upload job %s cleanup failed: %s", job.id, e)
+
+    def get(self, job_id: str) -> Optional[UploadJob]:
+        with self._lock:
+            self._prune(time.time())
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[UploadJob]:
+        """
+        Cancel a job: a queued one at once, a running one once its run function
+        next reports. None if there is no such job; finished jobs are left as they are.
+        """
+        with self._lock:
+            self._prune(time.time())
+            job = self._jobs.get(job_id)
+            if job is not None and job.status not in FINISHED:
+                job.cancel_requested.set()
+                if job.status == QUEUED:
+                    job.finish(CANCELLED)
+                    log.info("Upload job %s cancelled before it started", job.id)
+        return job
+
+    def _pending(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status not in FINISHED)
+
+    def _prune(self, now: float) -> None:
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished is not None and job.finished + self.ttl <= now]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            **{status: statuses.count(status) for status in (QUEUED, RUNNING) + FINISHED},
+        }
+
+    def shutdown(self, cancel: bool = True) -> None:
+        """Stop the workers, cancelling outstanding jobs first if asked to"""
+        if cancel:
+            for job_id in list(self._jobs):
+                self.cancel(job_id)
+        self._executor.shutdown(wait=True)
+
+
+def upload_job_queue_from_env() -> UploadJobQueue:
+    """UploadJobQueue configured by UPLOAD_JOB_WORKERS / UPLOAD_JOB_MAX_PENDING / UPLOAD_JOB_TTL"""
+    return UploadJobQueue(int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS)),
+                          int(os.environ.get(MAX_PENDING_ENV, DEFAULT_MAX_PENDING)),
+                          float(os.environ.get(TTL_ENV, DEFAULT_TTL)))
@@ -0,0 +1,105 @@
+"""
+Newline-delimited JSON (NDJSON) streaming for the upload endpoints
+"""
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app_logging import get_logger
+
+log = get_logger('upload_stream')
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Transactions per chunk for sources without page boundaries (Excel/CSV)
+ROWS_PER_CHUNK = 500
+
+T_batch = Tuple[List[Dict[str, Any]], Dict[str, Any]]
+
+
+def wants_stream(request) -> bool:
+    """True for ?stream=1 or an Accept header asking for NDJSON"""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return NDJSON_MIMETYPE in request.headers.get('Accept', '')
+
+
+def ndjson_record(record: Dict[str, Any]) -> str:
+    return json.dumps(record, default=str) + '\n'
+
+
+def iter_page_batches(produce: Callable[[Callable[[int, int], None]], Iterable[Dict[str, Any]]],
+                      rows_per_chunk: int = ROWS_PER_CHUNK,
+                      on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[T_batch]:
+    """
+    Group the transactions yielded by produce(on_page) by the page they came from.
+
+    produce() passes on_page down to pdf_extraction.iter_pages, which calls it
+    when the parser moves past a page; everything yielded before that belongs
+    to the finished page. Sources that never call on_page (Excel/CSV) are cut
+    into chunks of rows_per_chunk instead.
+
+    A batch only goes out once the next transaction arrives, so pages without
+    any are silent; on_progress(progress) is called as soon as each page is
+    finished, whether or not it had transactions (an exception it raises
+    stops produce() there).
+    """
+    finished = []
+    batch = []
+
+    def on_page(page_number: int, page_count: int) -> None:
+        progress = {'pages_done': page_number, 'page_count': page_count}
+        finished.append(progress)
+        if on_progress:
+            on_progress(progress)
+
+    for transaction in produce(on_page):
+        if finished:
+            yield batch, finished[-1]
+            batch = []
+            finished.clear()
+        batch.append(transaction)
+        if len(batch) >= rows_per_chunk:
+            yield batch, {}
+            batch = []
+
+    if batch or finished:
+        yield batch, finished[-1] if finished else {}
+
+
+def iter_ndjson_upload(batches: Iterable[T_batch],
+                       summary: Optional[Callable[[], Dict[str, Any]]] = None) -> Iterator[str]:
+    """
+    Serialise transaction batches as NDJSON chunks, then one summary record.
+
+    Chunk:   {"type": "transactions", "pages_done": 3, "page_count": 80, "transactions": [...]}
+    Summary: {"type": "summary", "success": true, "count": 412, "timings": {...}}
+    A failure part-way through ends the stream with {"type": "error", "error": "..."}.
+    """
+    started = time.perf_counter()
+    first_chunk_ms = None
+    count = 0
+
+    try:
+        for transactions, progress in batches:
+            if transactions and first_chunk_ms is None:
+                first_chunk_ms = round((time.perf_counter() - started) * 1000, 1)
+            count += len(transactions)
+            yield ndjson_record({'type': 'transactions', **progress, 'transactions': transactions})
+    except Exception as e:
+        log.exception("Error while streaming upload: %s", e)
+        yield ndjson_record({'type': 'error', 'success': False, 'error': str(e), 'count': count})
+        return
+
+    record = {
+        'type': 'summary',
+        'success': True,
+        'count': count,
+        'timings': {
+            'first_chunk_ms': first_chunk_ms,
+            'total_ms': round((time.perf_counter() - started) * 1000, 1),
+        },
+    }
+    if summary:
+        record.update(summary())
+    yield ndjson_record(record)
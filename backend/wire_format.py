@@ -0,0 +1,176 @@
+"""
+Columnar MessagePack as an alternative to JSON for transaction lists.
+
+A JSON transaction list repeats every key (and values such as
+'actions': 'edit,delete') on every row. Clients that send
+Accept: application/x-msgpack get the same response as MessagePack instead,
+with each transaction list turned into column arrays:
+
+  {"success": true, "count": 2, "transactions": {
+      "date": ["2024-01-05", "2024-01-06"], "amount": [120.0, 45.5],
+      "type": {"dictionary": ["debit"], "codes": [0, 0]}, ...}}
+
+A column of strings with many repeats (type, frequency, category, actions,
+usually dates) is sent as a dictionary plus one integer code per row. Request
+bodies may be MessagePack too (Content-Type: application/x-msgpack), with the
+transactions either as rows or as columns in the same shape; JSON bodies may
+use the column shape as well.
+
+JSON stays the default, and error responses are always JSON. MessagePack
+needs the msgpack package: without it the format is simply not offered, and
+clients that accept nothing else get 406 (415 for a MessagePack body).
+"""
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from flask import Response, jsonify
+
+try:
+    import msgpack
+except ImportError:  # optional: without it only JSON is served
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+# Also read and matched in Accept; responses always use MSGPACK_MIMETYPE
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/msgpack', 'application/vnd.msgpack')
+
+# Response keys holding transaction lists, sent as columns
+COLUMNAR_KEYS = ('transactions',)
+
+# A string column is dictionary-encoded when at most this share of its values are distinct
+MAX_DICTIONARY_RATIO = 0.5
+
+
+class PayloadError(ValueError):
+    """A request body that can't be read; status is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def response_mimetype(request) -> Optional[str]:
+    """
+    JSON_MIMETYPE or MSGPACK_MIMETYPE, whichever the Accept header prefers
+    (JSON on a tie or without the header); None if neither is acceptable
+    """
+    accept = request.accept_mimetypes
+    if not accept:
+        return JSON_MIMETYPE
+    offered = (JSON_MIMETYPE,) + (MSGPACK_MIMETYPES if msgpack_available() else ())
+    best = accept.best_match(offered)
+    if best is None:
+        return None
+    return MSGPACK_MIMETYPE if best in MSGPACK_MIMETYPES else JSON_MIMETYPE
+
+
+def not_acceptable_message() -> str:
+    formats = 'application/json' + (' or ' + MSGPACK_MIMETYPE if msgpack_available() else '')
+    return f'Responses are available as {formats}'
+
+
+def _pack_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def encode_column(values: Sequence[Any]) -> Any:
+    """A column as a list, or {"dictionary", "codes"} if it is strings with many repeats"""
+    values = np.asarray(values, dtype=object)
+    if len(values) < 2 or pd.api.types.infer_dtype(values, skipna=True) != 'string':
+        return values.tolist()
+    # factorize would turn None into NaN; missing values get a None entry of their own
+    codes, dictionary = pd.factorize(values)
+    dictionary = dictionary.tolist()
+    if (codes < 0).any():
+        codes[codes < 0] = len(dictionary)
+        dictionary.append(None)
+    if len(dictionary) > MAX_DICTIONARY_RATIO * len(values):
+        return values.tolist()
+    return {'dictionary': dictionary, 'codes': codes.tolist()}
+
+
+def encode_columns(rows: Iterable[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Column arrays for a list of row dicts; a key missing from a row is None in its column"""
+    rows = list(rows)
+    names = list(dict.fromkeys(chain.from_iterable(rows)))
+    return {name: encode_column([row.get(name) for row in rows]) for name in names}
+
+
+def decode_columns(columns: Mapping[str, Any]) -> Dict[str, List[Any]]:
+    """Plain column lists from encode_columns output; raises ValueError on a malformed shape"""
+    decoded = {}
+    for name, column in columns.items():
+        if isinstance(column, Mapping):
+            try:
+                dictionary = np.asarray(column['dictionary'], dtype=object)
+                codes = np.asarray(column['codes'], dtype=np.int64)
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f'column {name!r} must be a list or a {{"dictionary", "codes"}} map')
+            if codes.ndim != 1 or (len(codes) and (codes.min() < 0 or codes.max() >= len(dictionary))):
+                raise ValueError(f'column {name!r} has codes outside its dictionary')
+            column = dictionary[codes].tolist()
+        elif not isinstance(column, list):
+            raise ValueError(f'column {name!r} must be a list or a {{"dictionary", "codes"}} map')
+        decoded[name] = column
+    if len({len(column) for column in decoded.values()}) > 1:
+        raise ValueError('columns must all have the same length')
+    return decoded
+
+
+def column_length(columns: Mapping[str, Sequence[Any]]) -> int:
+    return len(next(iter(columns.values()), ()))
+
+
+def rows_from_columns(columns: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """Row dicts back from (possibly encoded) columns"""
+    decoded = decode_columns(columns)
+    names = list(decoded)
+    return [dict(zip(names, values)) for values in zip(*decoded.values())]
+
+
+def pack(payload: Any) -> bytes:
+    """payload as MessagePack, with the COLUMNAR_KEYS lists turned into columns"""
+    if isinstance(payload, Mapping):
+        payload = {key: encode_columns(value) if key in COLUMNAR_KEYS and isinstance(value, list) else value
+                   for key, value in payload.items()}
+    return msgpack.packb(payload, use_bin_type=True, default=_pack_default)
+
+
+def unpack(data: bytes) -> Any:
+    """Decode a MessagePack body; raises ValueError if it isn't one"""
+    try:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    except (msgpack.UnpackException, ValueError) as e:
+        raise ValueError(f'Invalid MessagePack body: {str(e) or type(e).__name__}')
+
+
+def read_payload(request) -> Any:
+    """The request body, decoded by its Content-Type (MessagePack or JSON); raises PayloadError"""
+    if request.mimetype not in MSGPACK_MIMETYPES:
+        return request.get_json()
+    if not msgpack_available():
+        raise PayloadError('MessagePack bodies are not supported by this server', 415)
+    try:
+        return unpack(request.get_data(cache=False))
+    except ValueError as e:
+        raise PayloadError(str(e))
+
+
+def encode_response(payload: Any, mimetype: Optional[str] = JSON_MIMETYPE, status: int = 200) -> Response:
+    """payload as the negotiated format (see response_mimetype)"""
+    if mimetype == MSGPACK_MIMETYPE:
+        response = Response(pack(payload), status=status, mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = jsonify(payload)
+        response.status_code = status
+    response.vary.add('Accept')
+    return response